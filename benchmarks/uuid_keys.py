@@ -0,0 +1,82 @@
+"""
+This file benchmarks random (UUIDv4) against time-ordered (UUIDv7) primary keys on PostgreSQL.
+For each kind of key, it fills a scratch table shaped like `reviews` with synthetic rows and reports the
+insert throughput and the size of the primary key index. Run it from the project root, against a
+disposable database (the tables are created and dropped by the script):
+
+    python -m benchmarks.uuid_keys [--rows 1000000] [--batch-size 5000] [--url postgresql+asyncpg://...]
+"""
+
+import time  # Import time for measuring the insert throughput.
+import uuid  # Import the uuid module for the random keys.
+import random  # Import random for the synthetic ratings.
+import asyncio  # Import asyncio for running the asynchronous benchmark.
+import argparse  # Import argparse for parsing the command line.
+from datetime import datetime  # Import datetime for the synthetic timestamps.
+from sqlalchemy import text  # Import text for the raw SQL statements.
+from sqlalchemy.ext.asyncio import create_async_engine  # Import create_async_engine for connecting to the database.
+from src.config import Config  # Import the Config class for the default database URL.
+from src.db.ids import uuid7  # Import the time-ordered UUID generator under test.
+
+KEY_GENERATORS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+async def run_one(engine, name: str, generate, rows: int, batch_size: int) -> dict:
+    """ Fill a scratch table with `rows` rows keyed by `generate()` and measure it. """
+    table = f"bench_keys_{name}"
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        await conn.execute(text(
+            f"CREATE TABLE {table} (uid UUID PRIMARY KEY, rating INTEGER NOT NULL, review_text VARCHAR NOT NULL, created_at TIMESTAMP NOT NULL)"
+        ))
+    statement = text(f"INSERT INTO {table} (uid, rating, review_text, created_at) VALUES (:uid, :rating, :review_text, :created_at)")
+
+    started = time.perf_counter()
+    for offset in range(0, rows, batch_size):
+        batch = [
+            {"uid": generate(), "rating": random.randrange(5), "review_text": "Synthetic review " * 4, "created_at": datetime.now()}
+            for _ in range(min(batch_size, rows - offset))
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(statement, batch)
+    elapsed = time.perf_counter() - started
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"ANALYZE {table}"))
+        index_bytes = (await conn.execute(text(f"SELECT pg_relation_size('{table}_pkey')"))).scalar_one()
+        table_bytes = (await conn.execute(text(f"SELECT pg_relation_size('{table}')"))).scalar_one()
+        # Correlation between the key order and the physical order of the rows (1.0: every insert was appended).
+        correlation = (await conn.execute(text(
+            "SELECT correlation FROM pg_stats WHERE tablename = :table AND attname = 'uid'"
+        ), {"table": table})).scalar_one_or_none()
+        await conn.execute(text(f"DROP TABLE {table}"))
+    return {
+        "keys": name,
+        "rows_per_second": rows / elapsed,
+        "index_mb": index_bytes / 2**20,
+        "table_mb": table_bytes / 2**20,
+        "correlation": correlation,
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = create_async_engine(args.url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("This benchmark needs PostgreSQL (it reads the index sizes from its catalog).")
+    try:
+        print(f"{args.rows} rows per table, {args.batch_size} rows per INSERT")
+        print(f"{'keys':<6} {'rows/s':>10} {'pkey MB':>9} {'table MB':>9} {'correlation':>12}")
+        for name, generate in KEY_GENERATORS.items():
+            result = await run_one(engine, name, generate, args.rows, args.batch_size)
+            correlation = "n/a" if result["correlation"] is None else f"{result['correlation']:.3f}"
+            print(f"{result['keys']:<6} {result['rows_per_second']:>10.0f} {result['index_mb']:>9.1f} {result['table_mb']:>9.1f} {correlation:>12}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.uuid_keys", description="Compare UUIDv4 and UUIDv7 primary keys.")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows inserted per table.")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per INSERT and transaction.")
+    parser.add_argument("--url", default=Config.DATABASE_URL, help="Database URL (default: DATABASE_URL).")
+    asyncio.run(main(parser.parse_args()))
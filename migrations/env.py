@@ -38,6 +38,13 @@ target_metadata = SQLModel.metadata  # Set the target metadata for autogenerate
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Schema objects created outside of the models (see BOOK_SEARCH_VECTOR in src/db/models.py), which autogenerate must not drop
+UNMAPPED_OBJECTS = {("column", "search_vector"), ("index", "ix_book_search_vector")}
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """Leave the unmapped schema objects out of autogenerate."""
+    return (type_, name) not in UNMAPPED_OBJECTS
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -53,6 +60,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )  # Configure the context for offline mode.
@@ -62,7 +70,7 @@ def run_migrations_offline() -> None:
 
 def do_run_migrations(connection: Connection) -> None:
     """Run migrations using a connection."""
-    context.configure(connection=connection, target_metadata=target_metadata)  # Configure the context with the connection.
+    context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)  # Configure the context with the connection.
 
     with context.begin_transaction():
         context.run_migrations()  # Run the migrations.
@@ -0,0 +1,31 @@
+"""add book ranking scores
+
+Revision ID: 0b9e4d7a3c15
+Revises: f2c84d1e9b07
+Create Date: 2026-10-17 18:31:44.207356
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0b9e4d7a3c15'
+down_revision: Union[str, None] = 'f2c84d1e9b07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable without a default: no table rewrite. The scores are filled by the next run of the ranking job
+    # (or `python -m src.cli rank-books`).
+    op.add_column('book', sa.Column('rating_bayesian', postgresql.DOUBLE_PRECISION(), nullable=True))
+    op.add_column('book', sa.Column('rating_wilson', postgresql.DOUBLE_PRECISION(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('book', 'rating_wilson')
+    op.drop_column('book', 'rating_bayesian')
@@ -0,0 +1,42 @@
+"""add indexes for query shapes
+
+Revision ID: 4c8a2e91d7f3
+Revises: b37f0e6a2d18
+Create Date: 2026-10-17 15:42:08.113507
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '4c8a2e91d7f3'
+down_revision: Union[str, None] = 'b37f0e6a2d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Built with CREATE INDEX CONCURRENTLY, which cannot run inside a transaction, so that the tables stay
+# writable meanwhile. If a build fails (e.g. two emails differing only by case), PostgreSQL leaves an
+# INVALID index behind: fix the data, drop that index and run the upgrade again.
+INDEXES = (
+    ('ux_user_email_lower', 'user', [sa.text('lower(email)')], True),
+    ('ix_book_created_at_uid', 'book', [sa.text('created_at DESC'), sa.text('uid DESC')], False),
+    ('ix_book_user_uid_created_at', 'book', ['user_uid', sa.text('created_at DESC'), sa.text('uid DESC')], False),
+    ('ix_reviews_book_uid', 'reviews', ['book_uid'], False),
+    ('ix_reviews_user_uid', 'reviews', ['user_uid'], False),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,44 @@
+"""add book rating aggregates
+
+Revision ID: 5f2a9c4e7b13
+Revises: cd1ce242c386
+Create Date: 2026-10-17 10:12:40.118305
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2a9c4e7b13'
+down_revision: Union[str, None] = 'cd1ce242c386'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+AGGREGATE_COLUMNS = ['rating_count', 'rating_sum'] + [f'rating_hist_{rating}' for rating in range(5)]
+
+
+def upgrade() -> None:
+    for column in AGGREGATE_COLUMNS:
+        op.add_column('book', sa.Column(column, sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill the aggregates of the existing books from their reviews.
+    histogram = ',\n'.join(
+        f'rating_hist_{rating} = (SELECT count(*) FROM reviews WHERE reviews.book_uid = book.uid AND reviews.rating = {rating})'
+        for rating in range(5)
+    )
+    op.execute(f"""
+        UPDATE book SET
+            rating_count = (SELECT count(*) FROM reviews WHERE reviews.book_uid = book.uid),
+            rating_sum = (SELECT coalesce(sum(rating), 0) FROM reviews WHERE reviews.book_uid = book.uid),
+            {histogram}
+        WHERE EXISTS (SELECT 1 FROM reviews WHERE reviews.book_uid = book.uid)
+    """)
+
+
+def downgrade() -> None:
+    for column in reversed(AGGREGATE_COLUMNS):
+        op.drop_column('book', column)
@@ -0,0 +1,28 @@
+"""add review submitted_at
+
+Revision ID: 6d1f3b8a2e94
+Revises: 0b9e4d7a3c15
+Create Date: 2026-10-17 19:12:05.318442
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '6d1f3b8a2e94'
+down_revision: Union[str, None] = '0b9e4d7a3c15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable without a default: no table rewrite. The existing reviews fall back on their updated_at.
+    op.add_column('reviews', sa.Column('submitted_at', postgresql.TIMESTAMP(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('reviews', 'submitted_at')
@@ -0,0 +1,42 @@
+"""add book search vector
+
+Revision ID: 8e4d1b7a9c52
+Revises: 5f2a9c4e7b13
+Create Date: 2026-10-17 11:03:27.541902
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '8e4d1b7a9c52'
+down_revision: Union[str, None] = '5f2a9c4e7b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match SEARCH_CONFIG and SEARCH_FIELDS in src/books/search.py, and BOOK_SEARCH_VECTOR in src/db/models.py
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(publisher, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    # Adding a stored generated column rewrites the whole book table under an ACCESS EXCLUSIVE lock: reads and
+    # writes of the books wait until every row has its vector (roughly the time of a full copy of the table).
+    # Run it in a maintenance window on a large catalog.
+    op.add_column('book', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True), nullable=True))
+    # Built concurrently (outside of a transaction) so that books can still be written meanwhile.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_book_search_vector', 'book', ['search_vector'], unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_book_search_vector', table_name='book', postgresql_using='gin', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('book', 'search_vector')
@@ -0,0 +1,30 @@
+"""add user pagination index
+
+Revision ID: a9d3f6c21e85
+Revises: 4c8a2e91d7f3
+Create Date: 2026-10-17 16:20:37.902615
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3f6c21e85'
+down_revision: Union[str, None] = '4c8a2e91d7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently (outside of a transaction) so that signups are not blocked meanwhile.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_user_created_at_uid', 'user', [sa.text('created_at DESC'), sa.text('uid DESC')], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_created_at_uid', table_name='user', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,40 @@
+"""add review pagination indexes
+
+Revision ID: e5b70c3f1a46
+Revises: a9d3f6c21e85
+Create Date: 2026-10-17 17:05:51.604218
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b70c3f1a46'
+down_revision: Union[str, None] = 'a9d3f6c21e85'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Built concurrently (outside of a transaction) so that reviews can still be written meanwhile.
+# ix_reviews_book_uid is a prefix of both, so it is dropped once they exist.
+INDEXES = (
+    ('ix_reviews_book_uid_created_at', ['book_uid', sa.text('created_at DESC'), sa.text('uid DESC')]),
+    ('ix_reviews_book_uid_rating', ['book_uid', sa.text('rating DESC'), sa.text('created_at DESC'), sa.text('uid DESC')]),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'reviews', columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_reviews_book_uid', table_name='reviews', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reviews_book_uid', 'reviews', ['book_uid'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='reviews', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,89 @@
+"""one review per user and book
+
+Revision ID: f2c84d1e9b07
+Revises: e5b70c3f1a46
+Create Date: 2026-10-17 17:48:12.530961
+
+"""
+from typing import Sequence, Union
+
+import sqlmodel
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c84d1e9b07'
+down_revision: Union[str, None] = 'e5b70c3f1a46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Number of (user_uid, book_uid) pairs cleaned up per transaction.
+BATCH_SIZE = 1000
+
+DUPLICATE_PAIRS = sa.text("""
+    SELECT user_uid, book_uid FROM reviews
+    WHERE user_uid IS NOT NULL AND book_uid IS NOT NULL
+    GROUP BY user_uid, book_uid
+    HAVING count(*) > 1
+    LIMIT :batch_size
+""")
+
+# Keeps the most recently updated review of every pair, deletes the others and removes them from the
+# rating aggregates of their book, in a single statement (so the aggregates never count a deleted review).
+DELETE_DUPLICATES = sa.text("""
+    WITH pairs AS (
+        SELECT * FROM unnest(CAST(:user_uids AS uuid[]), CAST(:book_uids AS uuid[])) AS pair(user_uid, book_uid)
+    ), ranked AS (
+        SELECT reviews.uid, row_number() OVER (
+            PARTITION BY reviews.user_uid, reviews.book_uid
+            ORDER BY reviews.updated_at DESC NULLS LAST, reviews.created_at DESC NULLS LAST, reviews.uid DESC
+        ) AS position
+        FROM reviews JOIN pairs ON reviews.user_uid = pairs.user_uid AND reviews.book_uid = pairs.book_uid
+    ), deleted AS (
+        DELETE FROM reviews WHERE uid IN (SELECT uid FROM ranked WHERE position > 1)
+        RETURNING book_uid, rating
+    ), removed AS (
+        SELECT book_uid, count(*) AS count, sum(rating) AS total,
+               count(*) FILTER (WHERE rating = 0) AS hist_0, count(*) FILTER (WHERE rating = 1) AS hist_1,
+               count(*) FILTER (WHERE rating = 2) AS hist_2, count(*) FILTER (WHERE rating = 3) AS hist_3,
+               count(*) FILTER (WHERE rating = 4) AS hist_4
+        FROM deleted GROUP BY book_uid
+    )
+    UPDATE book SET
+        rating_count = book.rating_count - removed.count,
+        rating_sum = book.rating_sum - removed.total,
+        rating_hist_0 = book.rating_hist_0 - removed.hist_0,
+        rating_hist_1 = book.rating_hist_1 - removed.hist_1,
+        rating_hist_2 = book.rating_hist_2 - removed.hist_2,
+        rating_hist_3 = book.rating_hist_3 - removed.hist_3,
+        rating_hist_4 = book.rating_hist_4 - removed.hist_4
+    FROM removed WHERE book.uid = removed.book_uid
+""")
+
+
+def upgrade() -> None:
+    # Every batch commits on its own, so the reviews table is never locked for long. The loop also catches the
+    # duplicates written meanwhile by the running application, until the unique index is built (concurrently).
+    # Reviews detached from a deleted book (book_uid null) are left as they are: NULLs never conflict.
+    connection = op.get_bind()
+    with op.get_context().autocommit_block():
+        while True:
+            pairs = connection.execute(DUPLICATE_PAIRS, {"batch_size": BATCH_SIZE}).all()
+            if not pairs:
+                break
+            connection.execute(DELETE_DUPLICATES, {
+                "user_uids": [user_uid for user_uid, _ in pairs],
+                "book_uids": [book_uid for _, book_uid in pairs],
+            })
+        # If a duplicate slips in between the last batch and the build, the build fails and leaves an INVALID index:
+        # drop it and run the upgrade again.
+        op.create_index('ux_reviews_user_uid_book_uid', 'reviews', ['user_uid', 'book_uid'], unique=True, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_reviews_user_uid', table_name='reviews', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    # The deleted duplicates are not restored.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reviews_user_uid', 'reviews', ['user_uid'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ux_reviews_user_uid_book_uid', table_name='reviews', postgresql_concurrently=True, if_exists=True)
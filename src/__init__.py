@@ -2,6 +2,7 @@ from fastapi import FastAPI  # Import FastAPI for creating the application insta
 from src.books.routes import book_router  # Import the book router for book-related routes.
 from src.reviews.routes import review_router  # Import the review router for review-related routes.
 from src.auth.routers import auth_router  # Import the auth router for authentication-related routes.
+from src.admin.routes import admin_router  # Import the admin router for operational statistics.
 from contextlib import asynccontextmanager  # Import asynccontextmanager for managing the application's lifespan.
 
 """
@@ -16,21 +17,41 @@ async def life_span(app: FastAPI):
     and close the connection when the application stops.
     """
     print("Starting the application...")
+    from src.db.redis import init_redis, close_redis  # Import the functions managing the shared Redis client.
+    from src.db.main import async_session_maker, replica_router  # Import the session factories used by background jobs.
+    from src.books.suggest import suggest_index  # Import the in-memory autocomplete index.
+    from src.reviews.ingest import review_ingestor  # Import the write-behind ingestion of reviews.
+    from src.books.ranking import book_ranker  # Import the periodic ranking of the books.
     try:
-        from src.db.main import init_db  # Import the init_db function for initializing the database.
-        await init_db()  # Initialize the database (await the coroutine function).
+        from src.config import Config  # Import the Config class for the startup settings.
+        if Config.DB_CREATE_ALL:
+            from src.db.main import init_db  # Import the init_db function for initializing the database.
+            await init_db()  # Create the missing tables (development only: outside Alembic, they would break `alembic upgrade`).
+        await init_redis()  # Create the pooled Redis client shared by all requests of this worker.
+        if suggest_index.enabled:
+            session_maker = replica_router.choose() if replica_router.engines else async_session_maker  # Full scans go to a replica when there is one.
+            await suggest_index.rebuild(session_maker)  # Build the autocomplete index before serving requests.
+            suggest_index.start(session_maker)  # Rebuild it periodically.
+        review_ingestor.start(async_session_maker)  # Write the queued reviews (when the write-behind ingestion is enabled).
+        book_ranker.start(async_session_maker)  # Rank the books periodically (one worker at a time).
         yield  # Yield control back to the application.
     finally:
+        await review_ingestor.stop()  # Finish the current batch of queued reviews; the others stay in the stream.
+        await book_ranker.stop()  # Stop the periodic ranking of the books.
+        await suggest_index.stop()  # Stop the periodic rebuild of the autocomplete index.
+        await close_redis()  # Close the Redis connection pool.
         print("Stopped the application")
 
 version = "v1"  # Define the API version.
 
 # Create the FastAPI application instance with version, title, and description.
-app = FastAPI(version=version, title="MyBookie", description="REST API for a book review app service")
+app = FastAPI(version=version, title="MyBookie", description="REST API for a book review app service", lifespan=life_span)
 
 # Include the book router with a prefix and tag.
 app.include_router(book_router, prefix=f"/api/{version}/books", tags=['books'])
 # Include the auth router with a prefix and tag.
 app.include_router(auth_router, prefix=f"/api/{version}/auths", tags=['auth'])
 # Include the review router with a prefix and tag.
-app.include_router(review_router, prefix=f"/api/{version}/reviews", tags=['reviews'])
\ No newline at end of file
+app.include_router(review_router, prefix=f"/api/{version}/reviews", tags=['reviews'])
+# Include the admin router with a prefix and tag.
+app.include_router(admin_router, prefix=f"/api/{version}/admin", tags=['admin'])
@@ -0,0 +1,66 @@
+"""
+This file defines the admin-only routes used to operate the FastAPI application.
+It includes endpoints exposing runtime statistics of the worker serving the request
+(connection pools, caches, background jobs), used to size and monitor deployments.
+Every uvicorn worker keeps its own statistics, so sample several times to cover all workers.
+"""
+
+from fastapi import APIRouter, Depends  # Import FastAPI utilities for routing and dependencies.
+from src.db.main import engine, replica_router, get_pool_stats  # Import the database engines and the pool statistics helper.
+from src.books.cache import book_detail_cache  # Import the book detail cache for its counters.
+from src.books.suggest import suggest_index  # Import the autocomplete index for its size.
+from src.reviews.ingest import review_ingestor  # Import the write-behind ingestion of reviews for its metrics.
+from src.auth.dependencies import RoleChecker  # Import custom dependency for role-based access control.
+
+# Initialize FastAPI Router for admin endpoints
+admin_router = APIRouter()
+
+# Only admins can read operational statistics
+admin_checker = Depends(RoleChecker(['admin']))
+
+# ----------------- Database connection pool statistics -----------------
+@admin_router.get("/stats/db-pool", dependencies=[admin_checker])
+async def get_db_pool_stats() -> dict:
+    """
+    Retrieve the connection pool statistics of this worker.
+
+    Returns:
+        dict: Pool size, checked out and overflow connections, checkouts, timeouts and wait times.
+    """
+    return {
+        "primary": get_pool_stats(engine),
+        "replicas": [get_pool_stats(replica) for replica in replica_router.engines],
+    }
+
+# ----------------- Book detail cache statistics -----------------
+@admin_router.get("/stats/book-cache", dependencies=[admin_checker])
+async def get_book_cache_stats() -> dict:
+    """
+    Retrieve the book detail cache counters of this worker.
+
+    Returns:
+        dict: Entries, hits per tier, misses, evictions and invalidations.
+    """
+    return book_detail_cache.stats()
+
+# ----------------- Autocomplete index statistics -----------------
+@admin_router.get("/stats/suggest", dependencies=[admin_checker])
+async def get_suggest_stats() -> dict:
+    """
+    Retrieve the size and approximate memory use of the autocomplete index of this worker.
+
+    Returns:
+        dict: Indexed books, suggestions, keys, trigrams, memory in bytes and last rebuild time.
+    """
+    return suggest_index.stats()
+
+# ----------------- Review ingestion statistics -----------------
+@admin_router.get("/stats/review-ingest", dependencies=[admin_checker])
+async def get_review_ingest_stats() -> dict:
+    """
+    Retrieve the queue depth of the write-behind review ingestion and the flush statistics of this worker.
+
+    Returns:
+        dict: Reviews waiting (shared by all workers) and pending, counters and flush latency in milliseconds.
+    """
+    return await review_ingestor.stats()
@@ -38,46 +38,43 @@ class TokenBearer(HTTPBearer):
     async def __call__(self, request: Request) -> HTTPAuthorizationCredentials | None:
         """
         Override the __call__ method to extract and validate the token from the request.
+        The token is decoded and checked against the blocklist once per request; the result
+        is kept on `request.state` so that every other bearer dependency of the request reuses it.
         :param request: The incoming HTTP request.
         :return: Decoded token data if valid.
         :raises HTTPException: If the token is missing, invalid, or expired.
         """
-        # Call the parent class's __call__ method to extract credentials
-        credentials = await super().__call__(request)
-        
-        if credentials is None:
-            raise InvalidToken()
-        
-        token = credentials.credentials  # Extract the token
+        token_data = getattr(request.state, "token_data", None)
 
-        if token is None:
-            raise AccessTokenRequired()
+        if token_data is None:
+            # Call the parent class's __call__ method to extract credentials
+            credentials = await super().__call__(request)
+            
+            if credentials is None:
+                raise InvalidToken()
+            
+            token = credentials.credentials  # Extract the token
 
-        # Check if the token is valid
-        if not self.token_valid(token):
-            raise InvalidToken()
-        
-        # Decode the token to get token data
-        token_data = decode_access_token(token)
+            if token is None:
+                raise AccessTokenRequired()
+
+            # Decode the token to get token data (an empty dict means the token is invalid)
+            token_data = decode_access_token(token)
+
+            if not token_data:
+                raise InvalidToken()
+
+            # Check if the token is in the blocklist (revoked or blacklisted)
+            if await token_in_blocklist(token_data["jti"]):
+                raise RevokedToken()
 
-        # Check if the token is in the blocklist (revoked or blacklisted)
-        if await token_in_blocklist(token_data["jti"]):
-            raise RevokedToken()
+            request.state.token_data = token_data  # Share the verified token with the rest of the request.
 
         # Verify token-specific data (to be implemented by child classes)
         self.verify_token_data(token_data)
 
         return token_data  # type: ignore # Return the validated token data
 
-    def token_valid(self, token: str) -> bool:
-        """
-        Check if the token is valid by decoding it.
-        :param token: The token string.
-        :return: True if the token is valid, otherwise False.
-        """
-        token_data = decode_access_token(token)
-        return token_data is not None
-
     def verify_token_data(self, token_data):
         """
         Verify the token data. Must be implemented in child classes.
@@ -108,34 +105,87 @@ class RefreshTokenBearer(TokenBearer):
         if token_data and not token_data["refresh"]:
             raise RefreshTokenRequired()
 
+# Shared bearer instance: FastAPI caches a dependency per request by its callable,
+# so every route and dependency using this instance resolves it only once.
+access_token_bearer = AccessTokenBearer()
+
+# Request-scoped principal built from the verified access token
+class AuthContext:
+    def __init__(self, token_data: dict) -> None:
+        """
+        Hold the verified token data of the current request.
+        The user row is only fetched from the database when a handler asks for it.
+        :param token_data: Decoded access token data.
+        """
+        self.token_data = token_data
+        self._user: User | None = None
+
+    @property
+    def email(self) -> str:
+        return self.token_data['user']['email']
+
+    @property
+    def user_uid(self) -> str:
+        return self.token_data['user']['user_uid']
+
+    async def get_user(self, session: AsyncSession) -> User:
+        """
+        Fetch the user of the token, at most once per request.
+        :param session: Database session (AsyncSession).
+        :return: The user object corresponding to the token's email.
+        :raises UserNotFound: If the user does not exist in the database.
+        """
+        if self._user is None:
+            user = await user_service.get_user_by_email(self.email, session)
+            if not user:
+                raise UserNotFound()
+            self._user = user
+        return self._user
+
+# Dependency to get the request-scoped principal
+async def get_auth_context(request: Request, token_details: dict = Depends(access_token_bearer)) -> AuthContext:
+    """
+    Dependency returning the principal of the current request, created once and shared by all dependencies.
+    :param request: The incoming HTTP request.
+    :param token_details: Decoded token data from the access token.
+    :return: The AuthContext of the request.
+    """
+    context = getattr(request.state, "auth_context", None)
+    if context is None:
+        context = AuthContext(token_details)
+        request.state.auth_context = context
+    return context
+
 # Dependency to fetch the currently authenticated user
-async def get_current_user(token_details: dict = Depends(AccessTokenBearer()), 
+async def get_current_user(context: AuthContext = Depends(get_auth_context), 
                            session: AsyncSession = Depends(get_session)):
     """
     Dependency to fetch the currently authenticated user from the database.
-    :param token_details: Decoded token data from the access token.
+    :param context: The principal of the current request.
     :param session: Database session (AsyncSession).
     :return: The user object corresponding to the token's email.
     :raises UserNotFound: If the user does not exist in the database.
     """
-    # Extract user email from the token details
-    user_email = token_details['user']['email']
-    
-    # Fetch the user object from the database
-    user = await user_service.get_user_by_email(user_email, session)
-    
-    if not user:
-        raise UserNotFound()
-    
-    # Return the user object
-    return user
+    return await context.get_user(session)
 
 # Check the role of the user
 class RoleChecker:
     def __init__(self, allowed_roles: List[str]) -> None:
         self.allowed_roles = allowed_roles
 
-    def __call__(self, current_user: User = Depends(get_current_user)) -> Any:
-        if current_user.role in self.allowed_roles:
+    async def __call__(self, context: AuthContext = Depends(get_auth_context), 
+                       session: AsyncSession = Depends(get_session)) -> Any:
+        """
+        Check the role of the user row, not the role claim of the token: a demoted or deleted user must not keep
+        their permissions until the token expires. The row is fetched once per request and reused by the handler.
+        :raises UserNotFound: If the user of the token was deleted.
+        :raises InsufficientPermission: If the role of the user is not allowed.
+        """
+        user = await context.get_user(session)
+        # End the read transaction, so that the connection goes back to the pool before the handler takes its own
+        # (e.g. a read session): holding both would let concurrent requests exhaust the pool waiting for each other.
+        # The user stays usable, sessions do not expire their objects on commit.
+        await session.commit()
+        if user.role in self.allowed_roles:
             return True
         raise InsufficientPermission()
@@ -6,18 +6,20 @@ only authorized users can access certain endpoints.
 """
 
 import logging  # Import logging module for logging errors and information.
-from src.db.models import User  # Import the User model from the database models.
-from src.db.main import get_session  # Import the get_session function for database session management.
+from src.db.main import get_session, get_read_session  # Import the session dependencies (primary and read replicas).
 from datetime import datetime, timedelta  # Import datetime and timedelta for handling date and time operations.
 from src.auth.service import UserService  # Import the UserService class for user-related business logic.
 from src.db.redis import add_jti_to_blocklist  # Import the add_jti_to_blocklist function for adding tokens to the blocklist.
 from fastapi.responses import JSONResponse  # Import JSONResponse for sending JSON responses.
 from fastapi.exceptions import HTTPException  # Import HTTPException for raising HTTP exceptions.
-from fastapi import APIRouter, Depends, status  # Import FastAPI utilities for routing, dependencies, and status codes.
+from fastapi import APIRouter, Depends, Query, status  # Import FastAPI utilities for routing, dependencies, query parameters, and status codes.
+from typing import Optional  # Import Optional for optional type annotations.
+from src.config import Config  # Import the Config class for accessing configuration settings.
 from sqlmodel.ext.asyncio.session import AsyncSession  # Import the AsyncSession class for asynchronous database sessions.
-from src.auth.utils import create_access_token, verify_password  # Import utility functions for token creation and password verification.
-from src.auth.schemas import UserCreateModel, UserModel, UserLoginModel, UserBooksModel  # Import Pydantic models for request and response validation.
-from src.auth.dependencies import RefreshTokenBearer, AccessTokenBearer, get_current_user, RoleChecker  # Import custom dependencies for token validation and user authentication.
+from src.auth.utils import create_access_token, verify_and_update_password  # Import utility functions for token creation and password verification.
+from src.errors import PasswordHashingBusy, UserAlreadyExists  # Import the errors raised when the password hashing pool is saturated or the email is taken.
+from src.auth.schemas import UserCreateModel, UserModel, UserLoginModel, UserBooksModel, UserPageModel  # Import Pydantic models for request and response validation.
+from src.auth.dependencies import RefreshTokenBearer, access_token_bearer, get_auth_context, AuthContext, RoleChecker  # Import custom dependencies for token validation and user authentication.
 
 # Initialize the router for authentication-related endpoints
 auth_router = APIRouter()
@@ -27,18 +29,34 @@ role_checker = RoleChecker(['admin', 'user'])  # Create an instance of the RoleC
 # Define the expiration time for the refresh token
 REFRESH_TOKEN_EXPIRY = timedelta(days=2)
 
-@auth_router.get("/users", response_model=list[UserModel])
-async def get_all_users(session: AsyncSession = Depends(get_session), _ : bool= Depends(role_checker)):
+def hashing_busy_error() -> HTTPException:
+    """ 503 returned when the password hashing pool cannot take more work. """
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is busy, please retry", headers={"Retry-After": "1"})
+
+@auth_router.get("/users", response_model=UserPageModel)
+async def get_all_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(default=Config.PAGE_SIZE_DEFAULT, ge=1),
+    role: Optional[str] = None,
+    is_verified: Optional[bool] = None,
+    _ : bool= Depends(role_checker),
+    session: AsyncSession = Depends(get_read_session)
+):
     """
-    Fetch all users from the database.
+    Fetch one page of users, newest first, with the number of books and reviews of each.
     Args:
+        cursor: Cursor returned as `next_cursor` by the previous page (optional).
+        limit: Number of users per page (capped by PAGE_SIZE_MAX).
+        role: Only return the users with this role, e.g. "admin" (optional).
+        is_verified: Only return verified (true) or unverified (false) users (optional).
         session: Database session (injected via dependency).
     Returns:
-        List of users in the system.
+        Users of the page and the cursor of the next page.
     """
     try:
-        users = await user_Service.get_all_user(session=session)
-        return users
+        return await user_Service.get_all_user(session=session, cursor=cursor, limit=limit, role=role, is_verified=is_verified)
+    except HTTPException:
+        raise  # Invalid cursor.
     except Exception as e:
         logging.error(f"Error fetching users: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
@@ -63,6 +81,12 @@ async def create_user_account(user_data: UserCreateModel, session: AsyncSession
         new_user = await user_Service.create_user(user_data, session=session)
 
         return new_user 
+    except HTTPException:
+        raise
+    except PasswordHashingBusy:
+        raise hashing_busy_error()
+    except UserAlreadyExists:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User with this email already exists")
     except Exception as e:
         logging.error(f"Error creating user: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Internal Server Error")
@@ -83,9 +107,15 @@ async def login_user(login_data: UserLoginModel, session: AsyncSession = Depends
     user = await user_Service.get_user_by_email(email, session=session)
 
     if user is not None:
-        password_valid = verify_password(password, user.password)
+        try:
+            password_valid, new_hash = await verify_and_update_password(password, user.password)
+        except PasswordHashingBusy:
+            raise hashing_busy_error()
 
         if password_valid:
+            if new_hash is not None:
+                await user_Service.update_password_hash(user, new_hash, session=session)  # The bcrypt cost factor changed, store the rehashed password.
+
             access_token = create_access_token(user_data={"email": user.email, 
                                                           "user_uid": str(user.uid), 
                                                           "role":user.role})
@@ -124,14 +154,19 @@ async def get_new_access_token(token_details: dict = Depends(RefreshTokenBearer(
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token expired")
 
 @auth_router.get("/me", response_model=UserBooksModel)
-async def get_me(user: User = Depends(get_current_user), _ : bool= Depends(role_checker)):
+async def get_me(context: AuthContext = Depends(get_auth_context), 
+                 _ : bool= Depends(role_checker), 
+                 session: AsyncSession = Depends(get_read_session)):
     """
-    Get details of the currently authenticated user.
+    Get details of the currently authenticated user, with their books and reviews.
     Args:
-        user: User object (injected via dependency).
+        context: Principal of the current request (injected via dependency).
+        session: Database session (injected via dependency).
     Returns:
         User details.
     """
+    user = await user_Service.get_user_by_email(context.email, session=session, with_relations=True)
+
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
@@ -141,7 +176,7 @@ async def get_me(user: User = Depends(get_current_user), _ : bool= Depends(role_
     return user
 
 @auth_router.get("/logout")
-async def revoke_token(token_details: dict = Depends(AccessTokenBearer())):
+async def revoke_token(token_details: dict = Depends(access_token_bearer)):
     """
     Revoke the user's access token by adding it to the blocklist.
     Args:
@@ -36,6 +36,22 @@ class UserModel(BaseModel):
     created_at: datetime.datetime  # Timestamp of when the user was created.
     updated_at: datetime.datetime  # Timestamp of when the user was last updated.
 
+class UserCountsModel(UserModel):
+    """
+    Pydantic model for representing a user with the number of books and reviews they created.
+    Inherits from UserModel.
+    """
+    book_count: int  # Number of books created by the user.
+    review_count: int  # Number of reviews written by the user.
+
+class UserPageModel(BaseModel):
+    """
+    Pydantic model for representing one page of users.
+    `next_cursor` is passed back as `cursor` to fetch the following page; it is None on the last page.
+    """
+    items: List[UserCountsModel]  # Users of the current page.
+    next_cursor: Optional[str] = None  # Opaque cursor pointing after the last user of the page.
+
 class UserBooksModel(UserModel):
     """
     Pydantic model for representing a user along with their books and reviews.
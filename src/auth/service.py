@@ -5,11 +5,17 @@ These functions interact with the database to perform the necessary operations.
 """
 
 import logging  # Import logging module for logging errors and information.
-from src.db.models import User  # Import the User model from the database models.
+from src.db.models import User, BookModel, Review  # Import the User, Book and Review models from the database models.
 from src.auth.schemas import UserCreateModel  # Import the UserCreateModel schema for user creation.
-from src.auth.utils import generated_pswd_hash  # Import the generated_pswd_hash function for password hashing.
+from src.errors import UserAlreadyExists  # Import the error raised when the email is already taken.
+from src.auth.utils import generated_pswd_hash_async  # Import the generated_pswd_hash_async function for password hashing.
 from sqlmodel.ext.asyncio.session import AsyncSession  # Import the AsyncSession class for asynchronous database sessions.
 from sqlmodel import select  # Import select for constructing SQL queries.
+from sqlalchemy import exists, func  # Import exists and func for the existence check and case-insensitive email lookups.
+from sqlalchemy.exc import IntegrityError  # Import IntegrityError for detecting a concurrent signup with the same email.
+from sqlalchemy.orm import selectinload  # Import selectinload for loading relationships on demand.
+from typing import Optional  # Import Optional for optional type annotations.
+from src.db.pagination import fetch_keyset_page  # Import the keyset pagination helper.
 from passlib.context import CryptContext  # Import CryptContext for password hashing.
 
 logging.basicConfig(level=logging.INFO)  # Configure logging to display information level logs.
@@ -18,28 +24,49 @@ logging.basicConfig(level=logging.INFO)  # Configure logging to display informat
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class UserService:
-    async def get_all_user(self, session: AsyncSession):
+    async def get_all_user(self, session: AsyncSession, cursor: Optional[str] = None, limit: Optional[int] = None,
+                           role: Optional[str] = None, is_verified: Optional[bool] = None):
         """
-        Retrieve all users from the database.
+        Retrieve one page of users, newest first, with the number of books and reviews of each.
+        The counts come from correlated subqueries (answered from the user_uid indexes); the books and
+        reviews themselves are never loaded.
         Args:
             session: Database session (injected via dependency).
+            cursor: Cursor returned with the previous page (optional).
+            limit: Maximum number of users to return (optional, capped by PAGE_SIZE_MAX).
+            role: Only return the users with this role (optional).
+            is_verified: Only return the users with this verification status (optional).
         Returns:
-            List of all users.
+            Dictionary with the users of the page and the cursor of the next page.
         """
-        statement = select(User)  # Construct a SQL query to select all users.
-        result = await session.exec(statement)  # Execute the query.
-        return result.all()  # Return all users.
+        book_count = select(func.count()).where(BookModel.user_uid == User.uid).correlate(User).scalar_subquery()
+        review_count = select(func.count()).where(Review.user_uid == User.uid).correlate(User).scalar_subquery()
+        statement = select(User, book_count.label("book_count"), review_count.label("review_count"))
+        if role is not None:
+            statement = statement.where(User.role == role)
+        if is_verified is not None:
+            statement = statement.where(User.is_verified == is_verified)
+        page = await fetch_keyset_page(
+            session, statement, (User.created_at, User.uid), cursor, limit,
+            cursor_values=lambda row: (row[0].created_at, row[0].uid),
+        )
+        page["items"] = [{**user.model_dump(), "book_count": books, "review_count": reviews} for user, books, reviews in page["items"]]
+        return page
 
-    async def get_user_by_email(self, email: str, session: AsyncSession):
+    async def get_user_by_email(self, email: str, session: AsyncSession, with_relations: bool = False):
         """
-        Retrieve a user by their email address.
+        Retrieve a user by their email address (case-insensitive, using the unique index on lower(email)).
         Args:
             email: Email of the user to search for.
             session: Database session (injected via dependency).
+            with_relations: Whether to also load the user's books and reviews (default is False).
         Returns:
             The user object if found, otherwise None.
         """
-        statement = select(User).where(User.email == email)  # Construct a SQL query to select a user by email.
+        statement = select(User).where(func.lower(User.email) == email.lower())  # Construct a SQL query to select a user by email.
+        if with_relations:
+            # The user may already be in the session without its relations (e.g. loaded by get_current_user).
+            statement = statement.options(selectinload(User.books), selectinload(User.reviews)).execution_options(populate_existing=True)
         result = await session.exec(statement)  # Execute the query.
         usr = result.first()  # Get the first result (if any).
         return usr  # Return the user object or None.
@@ -53,8 +80,9 @@ class UserService:
         Returns:
             True if the user exists, False otherwise.
         """
-        usr = await self.get_user_by_email(email, session)  # Retrieve the user by email.
-        return usr is not None  # Return True if the user exists, otherwise False.
+        statement = select(exists().where(func.lower(User.email) == email.lower()))  # Answered from the index, without loading the user.
+        result = await session.exec(statement)  # Execute the query.
+        return bool(result.one())  # Return True if the user exists, otherwise False.
 
     async def create_user(self, user_data: UserCreateModel, session: AsyncSession):
         """
@@ -65,22 +93,37 @@ class UserService:
         Returns:
             The newly created user object.
         Raises:
-            ValueError: If a user with the given email already exists.
+            UserAlreadyExists: If a user with the given email already exists.
         """
         # Check if the user already exists
         if await self.user_exists(user_data.email, session):  
-            raise ValueError("User with this email already exists")
+            raise UserAlreadyExists("User with this email already exists")
 
         # Prepare the user data for insertion
         usr_data_dict = user_data.model_dump()  # Convert the user data to a dictionary.
         new_user = User(**usr_data_dict)  # Create a new User object.
-        new_user.password = generated_pswd_hash(user_data.password)  # Hash the user's password.
+        new_user.password = await generated_pswd_hash_async(user_data.password)  # Hash the user's password on the hashing pool.
         new_user.role = "user"  # Set the user's role to "user".
 
         # Add the new user to the database
         session.add(new_user)  # Add the new user to the session.
-        await session.commit()  # Commit the transaction.
+        try:
+            await session.commit()  # Commit the transaction.
+        except IntegrityError:
+            await session.rollback()  # A concurrent signup took the email between the check and the insert.
+            raise UserAlreadyExists("User with this email already exists")
         await session.refresh(new_user)  # Refresh the user instance to include the database-generated fields.
         logging.info(f"create_user: User created successfully: {new_user}")  # Log the successful creation of the user.
 
-        return new_user  # Return the newly created user object.
\ No newline at end of file
+        return new_user  # Return the newly created user object.
+
+    async def update_password_hash(self, user: User, password_hash: str, session: AsyncSession):
+        """
+        Replace the stored password hash of a user (e.g. after the bcrypt cost factor changed).
+        Args:
+            user: The user to update.
+            password_hash: The new password hash.
+            session: Database session (injected via dependency).
+        """
+        user.password = password_hash  # Store the new hash.
+        await session.commit()  # Commit the transaction.
@@ -6,15 +6,30 @@ These utilities are used throughout the authentication module to handle common t
 
 import jwt  # Import the jwt module for handling JSON Web Tokens.
 import uuid  # Import the uuid module for generating unique identifiers.
+import asyncio  # Import asyncio for running bcrypt off the event loop.
 import logging  # Import the logging module for logging errors and information.
 from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.errors import PasswordHashingBusy  # Import the error raised when the hashing pool is saturated.
 from datetime import datetime, timedelta  # Import datetime and timedelta for handling date and time operations.
-from typing import Optional  # Import Optional for optional type annotations.
+from typing import Optional, Tuple  # Import typing utilities for type annotations.
+from concurrent.futures import ThreadPoolExecutor  # Import ThreadPoolExecutor for the dedicated hashing threads.
 from passlib.context import CryptContext  # Import CryptContext for password hashing.
 
-password_context = CryptContext(schemes=["bcrypt"])  # Define the password hashing context using bcrypt.
+# Define the password hashing context using bcrypt. Hashes made with another cost factor are
+# reported by verify_and_update() so they can be rehashed with the configured one.
+password_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__default_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=Config.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=Config.BCRYPT_ROUNDS,
+)
 ACCESS_TOKEN_EXPIRE_MINUTES = 3600  # Define the expiration time for access tokens in minutes.
 
+# bcrypt takes hundreds of milliseconds per call, so it runs on a small dedicated pool
+# instead of the event loop. `_pending_hash_jobs` counts running and queued jobs.
+hash_executor = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending_hash_jobs = 0
+
 def generated_pswd_hash(password: str) -> str:
     """
     Hash the given password using bcrypt.
@@ -37,6 +52,42 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     return password_context.verify(plain_password, hashed_password)  # Verify the password.
 
+async def _run_hash_job(func, *args):
+    """
+    Run a bcrypt function on the hashing pool.
+    Raises:
+        PasswordHashingBusy: If all threads are busy and PASSWORD_HASH_MAX_QUEUE jobs are already waiting.
+    """
+    global _pending_hash_jobs
+    if _pending_hash_jobs >= Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_MAX_QUEUE:
+        raise PasswordHashingBusy()
+    _pending_hash_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(hash_executor, func, *args)
+    finally:
+        _pending_hash_jobs -= 1
+
+async def generated_pswd_hash_async(password: str) -> str:
+    """
+    Hash the given password using bcrypt on the hashing pool.
+    Args:
+        password: The plain text password to hash.
+    Returns:
+        The hashed password.
+    """
+    return await _run_hash_job(generated_pswd_hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify the password on the hashing pool and rehash it if it was hashed with another cost factor.
+    Args:
+        plain_password: The plain text password.
+        hashed_password: The hashed password.
+    Returns:
+        Whether the password matches, and the new hash to store (None if the current one is up to date).
+    """
+    return await _run_hash_job(password_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(user_data: dict, expiry: Optional[timedelta] = None, refresh: bool = False) -> str:
     """
     Create a new access token with the given user data and expiration time.
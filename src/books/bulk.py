@@ -0,0 +1,291 @@
+"""
+This file defines the bulk import and export of books, shared by the API and the command line (src/cli.py).
+
+Import (POST /books/import, `python -m src.cli import-books`):
+The input (NDJSON or CSV) is parsed as it arrives, so memory use does not depend on its size. Rows are
+validated with BookCreateModel and written in batches, one multi-row INSERT and one transaction per batch.
+A batch rejected by the database is retried row by row, so one bad row never fails the whole import:
+the result is a report of the inserted rows and of every row that failed, with its line number.
+
+Export (GET /books/export, `python -m src.cli export`):
+Books or reviews are read through a server-side cursor and streamed as NDJSON or CSV, optionally gzipped,
+so memory use does not depend on the size of the table.
+"""
+
+import io  # Import io for writing CSV chunks in memory.
+import csv  # Import csv for parsing and writing CSV records.
+import json  # Import json for parsing and writing NDJSON records.
+import zlib  # Import zlib for gzipping the exports on the fly.
+import uuid  # Import the uuid module for handling UUIDs.
+import codecs  # Import codecs for decoding UTF-8 split across chunks.
+import logging  # Import logging module for logging errors and information.
+from datetime import datetime, date  # Import datetime and date for the timestamps.
+from typing import AsyncIterator, Callable, List, Optional, Tuple  # Import typing utilities for type annotations.
+from pydantic import ValidationError  # Import ValidationError for reporting invalid rows.
+from sqlalchemy import insert, select  # Import insert for the multi-row INSERT statements and select for the exports.
+from src.db.ids import uuid7  # Import the time-ordered UUID generator for the book UIDs.
+from src.db.models import BookModel, Review  # Import the Book and Review models from the database models.
+from src.books.schemas import BookCreateModel  # Import the BookCreateModel schema used to validate every row.
+from src.books.search import fallback_search_index  # Import the fallback search index, updated with the new books.
+from src.books.suggest import suggest_index  # Import the autocomplete index, updated with the new books.
+
+# Supported input and output formats
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# Exportable tables
+EXPORT_RESOURCES = {"books": BookModel, "reviews": Review}
+
+
+class ImportReport:
+    """
+    Progress and outcome of an import. `errors` lists the first `max_errors` failed rows.
+    """
+
+    def __init__(self, max_errors: int) -> None:
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors: List[dict] = []
+
+    def add_error(self, line: int, errors) -> None:
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "errors": errors})
+
+    def progress(self) -> dict:
+        return {"rows": self.rows, "inserted": self.inserted, "failed": self.failed, "batches": self.batches}
+
+    def as_dict(self) -> dict:
+        return {**self.progress(), "errors": self.errors, "errors_truncated": self.failed > len(self.errors)}
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """ Decode a stream of UTF-8 bytes (with or without BOM) into lines, without the line endings. """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """ Yield (line number, JSON value or parsing error message) for every non-blank line. """
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {e}"
+
+
+async def iter_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yield (line number, dictionary or parsing error message) for every CSV record after the header row.
+    Quoted fields may span several lines: a record is complete once it holds an even number of quotes.
+    Empty cells are read as missing values.
+    """
+    header: Optional[List[str]] = None
+    record, start = "", 0
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        record = f"{record}\n{line}" if record else line
+        start = start or line_number
+        if record.count('"') % 2:
+            continue  # Inside a quoted field.
+        text, first_line = record, start
+        record, start = "", 0
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            yield first_line, f"Invalid CSV: {e}"
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield first_line, f"Expected {len(header)} fields, got {len(values)}"
+            continue
+        yield first_line, {name: value for name, value in zip(header, values) if value != ""}
+    if record:
+        yield start, "Invalid CSV: unterminated quoted field"
+
+
+async def _insert_batch(session_maker, batch: List[Tuple[int, dict]], report: ImportReport) -> List[dict]:
+    """
+    Insert a batch with one multi-row INSERT; if the database rejects it, insert the rows one by one.
+    Returns:
+        The rows actually inserted.
+    """
+    rows = [row for _, row in batch]
+    try:
+        async with session_maker() as session:
+            connection = await session.connection()
+            await connection.execute(insert(BookModel.__table__), rows)  # Sent as multi-row VALUES batches by the driver.
+            await session.commit()
+        return rows
+    except Exception as e:
+        logging.warning(f"Bulk import: batch of {len(rows)} rows rejected ({e}), retrying row by row.")
+
+    inserted = []
+    for line, row in batch:
+        try:
+            async with session_maker() as session:
+                connection = await session.connection()
+                await connection.execute(insert(BookModel.__table__), [row])
+                await session.commit()
+            inserted.append(row)
+        except Exception as e:
+            report.add_error(line, [{"msg": str(getattr(e, "orig", e)).strip()}])
+    return inserted
+
+
+async def import_books(session_maker,
+                       chunks: AsyncIterator[bytes],
+                       input_format: str,
+                       user_uid: Optional[str],
+                       batch_size: int,
+                       max_errors: int,
+                       on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Import books from an NDJSON or CSV stream.
+    Args:
+        session_maker: Factory of the sessions used for the inserts (one per batch).
+        chunks: The input, as an asynchronous iterator of bytes.
+        input_format: "ndjson" or "csv" (with a header row naming BookCreateModel fields).
+        user_uid: UID of the user the books are attributed to (optional).
+        batch_size: Number of rows per INSERT and transaction.
+        max_errors: Number of row errors listed in the report.
+        on_progress: Called with the progress counters after every batch (optional).
+    Returns:
+        The import report: rows read, inserted and failed, batches, and the row errors.
+    """
+    if input_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format '{input_format}'")
+    records = iter_ndjson(chunks) if input_format == "ndjson" else iter_csv(chunks)
+    owner = uuid.UUID(user_uid) if user_uid else None
+    report = ImportReport(max_errors)
+    batch: List[Tuple[int, dict]] = []
+
+    async def flush() -> None:
+        inserted = await _insert_batch(session_maker, batch, report)
+        report.inserted += len(inserted)
+        report.batches += 1
+        books = [BookModel(**row) for row in inserted]
+        for book in books:
+            fallback_search_index.add(book)
+        await suggest_index.add_books(books)
+        batch.clear()
+        if on_progress is not None:
+            on_progress(report.progress())
+
+    async for line, record in records:
+        report.rows += 1
+        if isinstance(record, str):
+            report.add_error(line, [{"msg": record}])
+            continue
+        try:
+            book = BookCreateModel.model_validate(record)
+        except ValidationError as e:
+            report.add_error(line, json.loads(e.json(include_url=False)))
+            continue
+        now = datetime.now()
+        row = book.model_dump()
+        row.update(
+            uid=uuid7(),
+            user_uid=owner,
+            created_at=row["created_at"] or now,
+            updated_at=now,  # Set by the server: the change feed relies on it.
+        )
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    logging.info(f"Bulk import finished: {report.progress()}")
+    return report.as_dict()
+
+
+# ----------------- Export -----------------
+
+def _export_value(value):
+    """ Convert a column value into something JSON and CSV can store. """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _export_chunk(rows, columns: List[str], output_format: str, header: bool) -> str:
+    if output_format == "ndjson":
+        return "".join(json.dumps({column: _export_value(value) for column, value in zip(columns, row)}) + "\n" for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows([["" if value is None else _export_value(value) for value in row] for row in rows])
+    return buffer.getvalue()
+
+
+async def export_rows(session_maker,
+                      resource: str,
+                      output_format: str,
+                      user_uid: Optional[str] = None,
+                      updated_since: Optional[datetime] = None,
+                      compress: bool = False,
+                      batch_size: int = 1000) -> AsyncIterator[bytes]:
+    """
+    Stream every book or review as NDJSON or CSV, reading the table through a server-side cursor
+    so that memory use does not depend on the size of the table.
+    Args:
+        session_maker: Factory of the session used for the export (its own session, as the response outlives the request).
+        resource: "books" or "reviews".
+        output_format: "ndjson" or "csv" (with a header row).
+        user_uid: Only export the rows of this user (optional).
+        updated_since: Only export the rows updated at or after this time (optional).
+        compress: Gzip the output on the fly.
+        batch_size: Number of rows fetched per round-trip.
+    Yields:
+        Chunks of the encoded output.
+    """
+    if resource not in EXPORT_RESOURCES:
+        raise ValueError(f"Unsupported export resource '{resource}'")
+    if output_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{output_format}'")
+    table = EXPORT_RESOURCES[resource].__table__
+    columns = [column.name for column in table.columns]
+
+    statement = select(table)
+    if user_uid is not None:
+        statement = statement.where(table.c.user_uid == uuid.UUID(user_uid))
+    if updated_since is not None:
+        statement = statement.where(table.c.updated_at >= updated_since)
+
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 writes the gzip container.
+    exported = 0
+    async with session_maker() as session:
+        result = await session.stream(statement.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            chunk = _export_chunk(rows, columns, output_format, header=exported == 0).encode()
+            exported += len(rows)
+            yield compressor.compress(chunk) if compressor else chunk
+    if exported == 0 and output_format == "csv":
+        chunk = _export_chunk([], columns, output_format, header=True).encode()
+        yield compressor.compress(chunk) if compressor else chunk
+    if compressor:
+        yield compressor.flush()
+    logging.info(f"Export of {resource} finished: {exported} row(s).")
@@ -0,0 +1,163 @@
+"""
+This file defines the read-through cache of serialized book details (GET /books/{book_uid}).
+The cache has two tiers: a small LRU with a TTL inside every worker, in front of a shared Redis layer.
+Writes to a book or its reviews invalidate both tiers and broadcast the invalidation to the other workers.
+"""
+
+import json  # Import json for storing book details in Redis.
+import time  # Import time for the TTL of local entries.
+import logging  # Import logging module for logging errors and information.
+from collections import OrderedDict  # Import OrderedDict for the LRU ordering.
+from typing import Dict, Optional, Tuple  # Import typing utilities for type annotations.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.db.redis import get_redis, subscriber  # Import the shared Redis client and pub/sub listener.
+
+# Channel announcing invalidated books to every worker
+BOOK_INVALIDATION_CHANNEL = "books:invalidate"
+
+class BookDetailCache:
+    """
+    Two-tier cache of serialized BookDetailModel dictionaries, keyed by book UID.
+
+    Redis errors are logged and treated as misses, so the cache never fails a request.
+    A per-book generation number prevents a read that started before an invalidation
+    from putting the old data back in the local tier.
+    """
+
+    def __init__(self, max_entries: int, local_ttl: float, redis_ttl: int, enabled: bool = True) -> None:
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()  # book UID -> (expiry, data)
+        self._generations: Dict[str, int] = {}
+        self._epoch = 0  # Bumped whenever `_generations` is cleared.
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(book_uid: str) -> str:
+        return str(book_uid).lower()
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return f"book:detail:{key}"
+
+    def generation(self, book_uid: str) -> Tuple[int, int]:
+        """ Current generation of a book, to pass back to `set` once the database read is done. """
+        return self._epoch, self._generations.get(self._key(book_uid), 0)
+
+    async def get(self, book_uid: str) -> Optional[dict]:
+        """
+        Look a book up in the local tier, then in Redis.
+        Args:
+            book_uid: Unique identifier of the book.
+        Returns:
+            The cached book detail, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        key = self._key(book_uid)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, data = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+                return data
+            del self._entries[key]
+
+        try:
+            raw = await get_redis().get(self._redis_key(key))
+        except Exception as e:
+            logging.warning(f"Book cache: Redis read failed: {e}")
+            raw = None
+        if raw is not None:
+            data = json.loads(raw)
+            self._store_local(key, data)
+            self.redis_hits += 1
+            return data
+
+        self.misses += 1
+        return None
+
+    async def set(self, book_uid: str, data: dict, generation: Tuple[int, int]) -> None:
+        """
+        Store a book detail read from the database in both tiers.
+        Args:
+            book_uid: Unique identifier of the book.
+            data: The serialized BookDetailModel.
+            generation: The value of `generation(book_uid)` taken before the database read.
+        """
+        if not self.enabled:
+            return
+        key = self._key(book_uid)
+        if self.generation(key) != generation:
+            return  # The book was invalidated while it was being read.
+        self._store_local(key, data)
+        try:
+            await get_redis().set(self._redis_key(key), json.dumps(data), ex=self.redis_ttl)
+        except Exception as e:
+            logging.warning(f"Book cache: Redis write failed: {e}")
+
+    async def invalidate(self, book_uid: str) -> None:
+        """
+        Drop a book from both tiers, here and on every other worker.
+        Args:
+            book_uid: Unique identifier of the book that changed.
+        """
+        if not self.enabled:
+            return
+        key = self._key(book_uid)
+        self._drop_local(key)
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.delete(self._redis_key(key))
+                pipe.publish(BOOK_INVALIDATION_CHANNEL, key)
+                await pipe.execute()
+        except Exception as e:
+            logging.warning(f"Book cache: Redis invalidation failed: {e}")
+
+    async def on_invalidation_message(self, data: str) -> None:
+        self._drop_local(data)
+
+    def _drop_local(self, key: str) -> None:
+        self._generations[key] = self._generations.get(key, 0) + 1
+        if self._entries.pop(key, None) is not None:
+            self.invalidations += 1
+        if len(self._generations) > 4 * self.max_entries:
+            self._generations.clear()  # Only reads in flight need them; bound the memory they use.
+            self._epoch += 1
+
+    def _store_local(self, key: str, data: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.local_ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """ Hit, miss and eviction counters of this worker. """
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+book_detail_cache = BookDetailCache(
+    Config.BOOK_CACHE_MAX_ENTRIES,
+    Config.BOOK_CACHE_LOCAL_TTL_SECONDS,
+    Config.BOOK_CACHE_REDIS_TTL_SECONDS,
+    enabled=Config.BOOK_CACHE_ENABLED,
+)
+if book_detail_cache.enabled:
+    subscriber.subscribe(BOOK_INVALIDATION_CHANNEL, book_detail_cache.on_invalidation_message)
@@ -0,0 +1,69 @@
+"""
+This file defines the change feed served by GET /books/changes, used by clients to stay in sync
+without downloading the whole catalog again.
+
+A cursor holds one position per stream of changes: books (updated_at, uid), reviews (updated_at, uid)
+and deleted books (deleted_at, uid) from the book_tombstones table. Every call returns at most `limit`
+rows of each stream after those positions, oldest first, and a new cursor to pass back as `since`.
+
+Timestamps are set when a row is written, before its transaction commits. A slow transaction can thus
+commit rows older than a position already handed out; rows younger than CHANGES_SAFETY_LAG_SECONDS are
+therefore held back until the next call, so that such rows are not skipped.
+
+Every timestamp of the feed (updated_at, deleted_at) and the cutoff come from the same clock, the application's
+datetime.now(): the clocks of the workers must agree (NTP) within CHANGES_SAFETY_LAG_SECONDS.
+"""
+
+import uuid  # Import the uuid module for handling UUIDs.
+from datetime import datetime, timedelta  # Import datetime and timedelta for the safety lag.
+from typing import Optional  # Import typing utilities for type annotations.
+from sqlmodel import select  # Import select for building SQL queries.
+from sqlmodel.ext.asyncio.session import AsyncSession  # Import AsyncSession for asynchronous database sessions.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.db.models import BookModel, Review, BookTombstone  # Import the models whose changes are listed.
+from src.db.pagination import clamp_page_size, decode_cursor, encode_cursor, keyset_filter  # Import the keyset pagination helpers.
+
+# Streams of changes, in the order of their positions in the cursor: (model, timestamp column)
+CHANGE_STREAMS = (
+    ("books", BookModel, BookModel.updated_at),
+    ("reviews", Review, Review.updated_at),
+    ("deleted", BookTombstone, BookTombstone.deleted_at),
+)
+CURSOR_TYPES = (datetime, uuid.UUID) * len(CHANGE_STREAMS)
+
+
+async def get_changes(session: AsyncSession, since: Optional[str] = None, limit: Optional[int] = None) -> dict:
+    """
+    List the books and reviews created or updated, and the books deleted, after a cursor.
+    Args:
+        session: Database session.
+        since: Cursor returned by the previous call (optional; without it, the feed starts from the beginning).
+        limit: Maximum number of rows per stream (optional, capped by PAGE_SIZE_MAX).
+    Returns:
+        A dictionary with the `books`, `reviews` and `deleted` rows, the `next_cursor` and
+        `has_more` (True when a stream had more rows than `limit`: call again right away).
+    """
+    page_size = clamp_page_size(limit)
+    positions = decode_cursor(since, CURSOR_TYPES) if since else [None] * len(CURSOR_TYPES)
+    cutoff = datetime.now() - timedelta(seconds=Config.CHANGES_SAFETY_LAG_SECONDS)
+
+    changes = {"has_more": False}
+    next_positions = []
+    for index, (name, model, timestamp) in enumerate(CHANGE_STREAMS):
+        position = positions[2 * index:2 * index + 2]
+        statement = select(model).where(timestamp <= cutoff)
+        if position[0] is not None:
+            statement = statement.where(keyset_filter((timestamp, model.uid), position, descending=False))
+        statement = statement.order_by(timestamp, model.uid).limit(page_size + 1)
+        rows = (await session.exec(statement)).all()
+
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            changes["has_more"] = True
+        if rows:
+            position = [getattr(rows[-1], timestamp.key), rows[-1].uid]
+        changes[name] = rows
+        next_positions.extend(position)
+
+    changes["next_cursor"] = encode_cursor(*next_positions)
+    return changes
@@ -0,0 +1,269 @@
+"""
+This file defines the ranking of the books served by GET /books/top.
+
+Two scores are computed for every reviewed book, from the rating aggregates stored on the book table (one row per
+book, so the cost of the job does not depend on the number of reviews):
+    - the Bayesian average ("rating"): the average rating pulled towards the mean rating of all the reviews by
+      RANKING_PRIOR_REVIEWS virtual reviews, so that a single top rating does not outrank hundreds of good ones;
+    - the Wilson score lower bound ("wilson"): the lower bound of the 95% confidence interval of the share of
+      positive reviews (rated RANKING_POSITIVE_RATING or more).
+
+The job reads the books in chunks of RANKING_BATCH_SIZE into NumPy arrays and computes both scores with vectorized
+operations. It writes back the scores that changed (`rating_bayesian` and `rating_wilson`) with one executemany per
+chunk, keeps a running top RANKING_TOP_SIZE per score, and replaces the Redis sorted sets read by GET /books/top
+in one transaction. Every worker schedules it every RANKING_INTERVAL_SECONDS, and a Redis lock lets only one of them
+run it per interval. NumPy is only imported when the job runs.
+"""
+
+import os  # Import os for naming the lock owner after the process.
+import time  # Import time for timing the job.
+import socket  # Import socket for naming the lock owner after the host.
+import asyncio  # Import asyncio for the periodic task.
+import logging  # Import logging module for logging errors and information.
+from datetime import datetime  # Import datetime for the time of the last ranking.
+from typing import List, Optional, Tuple  # Import typing utilities for type annotations.
+from sqlalchemy import bindparam, func, update  # Import SQL helpers for the bulk update of the scores.
+from sqlmodel import select  # Import select for reading the aggregates.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.db.models import BookModel  # Import the BookModel from the database models.
+from src.db.redis import get_redis  # Import get_redis for the shared Redis client.
+from src.books.ratings import RATING_VALUES, histogram_column  # Import the rating values and their histogram columns.
+
+# Sorted set of the top books of every score, the time they were computed, and the lock of the job
+RANKING_KEYS = {"rating": "books:top:rating", "wilson": "books:top:wilson"}
+RANKING_COMPUTED_AT_KEY = "books:top:computed_at"
+RANKING_LOCK_KEY = "books:ranking:lock"
+
+# Score column of every ranking, used when Redis is unavailable
+RANKING_COLUMNS = {"rating": BookModel.rating_bayesian, "wilson": BookModel.rating_wilson}
+
+WILSON_Z = 1.96  # 95% confidence.
+SCORE_DECIMALS = 6  # Scores are rounded, so that tiny changes of the global mean do not rewrite every book.
+
+
+def _numpy():
+    """ Import NumPy, which only the ranking job needs. """
+    try:
+        import numpy
+    except ImportError as e:
+        raise RuntimeError("Ranking the books needs NumPy: pip install numpy") from e
+    return numpy
+
+
+def bayesian_average(counts, sums, prior_mean: float, prior_reviews: float):
+    """
+    Bayesian average rating of every book.
+    Args:
+        counts: NumPy array of the number of reviews of every book.
+        sums: NumPy array of the sum of the ratings of every book.
+        prior_mean: Mean rating of all the reviews.
+        prior_reviews: Weight of the prior, in reviews.
+    Returns:
+        NumPy array of the averages.
+    """
+    return (sums + prior_mean * prior_reviews) / (counts + prior_reviews)
+
+
+def wilson_lower_bound(positives, counts, z: float = WILSON_Z):
+    """
+    Lower bound of the Wilson score interval of the share of positive reviews of every book.
+    Args:
+        positives: NumPy array of the number of positive reviews of every book.
+        counts: NumPy array of the number of reviews of every book.
+        z: Quantile of the normal distribution for the confidence level.
+    Returns:
+        NumPy array of the lower bounds (0 for the books without reviews).
+    """
+    np = _numpy()
+    n = np.maximum(counts, 1)
+    p = positives / n
+    z2 = z * z
+    bound = (p + z2 / (2 * n) - z * np.sqrt(p * (1 - p) / n + z2 / (4 * n * n))) / (1 + z2 / n)
+    return np.where(counts > 0, bound, 0.0)
+
+
+class _TopScores:
+    """ Running top `size` of the scores seen so far, chunk after chunk. """
+
+    def __init__(self, size: int) -> None:
+        np = _numpy()
+        self.size = size
+        self.uids = np.empty(0, dtype=object)
+        self.scores = np.empty(0, dtype=np.float64)
+
+    def add(self, uids, scores) -> None:
+        np = _numpy()
+        self.uids = np.concatenate([self.uids, uids])
+        self.scores = np.concatenate([self.scores, scores])
+        if len(self.scores) > self.size:
+            keep = np.argpartition(-self.scores, self.size - 1)[:self.size]  # The `size` highest, in no particular order.
+            self.uids, self.scores = self.uids[keep], self.scores[keep]
+
+    def mapping(self) -> dict:
+        return {uid: float(score) for uid, score in zip(self.uids, self.scores)}
+
+
+class BookRanker:
+    """
+    Periodic ranking job of this worker, and the reads of its results.
+    """
+
+    def __init__(self, batch_size: int, prior_reviews: float, positive_rating: int, top_size: int, interval_seconds: int, enabled: bool = True) -> None:
+        self.batch_size = batch_size
+        self.prior_reviews = prior_reviews
+        self.positive_rating = positive_rating
+        self.top_size = top_size
+        self.interval_seconds = interval_seconds
+        self.enabled = enabled
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------------- Ranking ----------------
+    async def rank(self, session_maker) -> dict:
+        """
+        Compute the scores of every book, write the ones that changed and publish the top books to Redis.
+        Args:
+            session_maker: Factory of the session used to read and update the books.
+        Returns:
+            Summary of the run: books read, books reviewed, scores written, prior mean and duration.
+        """
+        np = _numpy()
+        started = time.perf_counter()
+        table = BookModel.__table__
+        positives = sum(histogram_column(rating) for rating in RATING_VALUES if rating >= self.positive_rating)
+        write = (
+            update(table)
+            .where(table.c.uid == bindparam("book_uid"))
+            # Keep updated_at: the scores are derived data and must not bring every book back in GET /books/changes.
+            .values(rating_bayesian=bindparam("new_bayesian"), rating_wilson=bindparam("new_wilson"), updated_at=table.c.updated_at)
+        )
+        top = {by: _TopScores(self.top_size) for by in RANKING_KEYS}
+        books = rated = written = 0
+
+        async with session_maker() as session:
+            total_sum, total_count = (await session.exec(
+                select(func.coalesce(func.sum(BookModel.rating_sum), 0), func.coalesce(func.sum(BookModel.rating_count), 0))
+            )).one()
+            prior_mean = total_sum / total_count if total_count else 0.0
+
+            last_uid = None
+            while True:
+                statement = (
+                    select(BookModel.uid, BookModel.rating_count, BookModel.rating_sum, positives, BookModel.rating_bayesian, BookModel.rating_wilson)
+                    .order_by(BookModel.uid)
+                    .limit(self.batch_size)
+                )
+                if last_uid is not None:
+                    statement = statement.where(BookModel.uid > last_uid)
+                rows = (await session.exec(statement)).all()
+                if not rows:
+                    break
+                last_uid = rows[-1][0]
+
+                uids = np.array([str(row[0]) for row in rows], dtype=object)
+                counts, sums, positive_counts = np.array([row[1:4] for row in rows], dtype=np.float64).T
+                stored = np.array([row[4:6] for row in rows], dtype=np.float64)  # NULL scores become NaN.
+                reviewed = counts > 0
+                scores = {
+                    "rating": np.where(reviewed, np.round(bayesian_average(counts, sums, prior_mean, self.prior_reviews), SCORE_DECIMALS), np.nan),
+                    "wilson": np.where(reviewed, np.round(wilson_lower_bound(positive_counts, counts), SCORE_DECIMALS), np.nan),
+                }
+                changed = np.zeros(len(rows), dtype=bool)
+                for column, by in enumerate(RANKING_KEYS):
+                    same = (scores[by] == stored[:, column]) | (np.isnan(scores[by]) & np.isnan(stored[:, column]))
+                    changed |= ~same
+
+                indexes = np.flatnonzero(changed)
+                if len(indexes):
+                    params = [
+                        {
+                            "book_uid": rows[i][0],
+                            "new_bayesian": float(scores["rating"][i]) if reviewed[i] else None,
+                            "new_wilson": float(scores["wilson"][i]) if reviewed[i] else None,
+                        }
+                        for i in indexes
+                    ]
+                    connection = await session.connection()
+                    await connection.execute(write, params)
+                    await session.commit()  # One transaction per chunk, so that the books are not locked for long.
+                for by in RANKING_KEYS:
+                    top[by].add(uids[reviewed], scores[by][reviewed])
+                books += len(rows)
+                rated += int(reviewed.sum())
+                written += len(indexes)
+
+        async with get_redis().pipeline(transaction=True) as pipe:  # Readers see the old or the new ranking, never a mix.
+            for by, key in RANKING_KEYS.items():
+                pipe.delete(key)
+                mapping = top[by].mapping()
+                if mapping:
+                    pipe.zadd(key, mapping)
+            pipe.set(RANKING_COMPUTED_AT_KEY, datetime.now().isoformat())
+            await pipe.execute()
+
+        return {
+            "books": books,
+            "reviewed": rated,
+            "written": written,
+            "prior_mean": prior_mean,
+            "elapsed_ms": (time.perf_counter() - started) * 1000,
+        }
+
+    # ---------------- Reading ----------------
+    async def top(self, by: str, limit: int) -> Tuple[List[Tuple[str, float]], Optional[datetime]]:
+        """
+        Read the best ranked books from Redis.
+        Args:
+            by: The score ("rating" or "wilson").
+            limit: Number of books.
+        Returns:
+            The (book UID, score) pairs, best first, and the time they were computed (None if never).
+        """
+        redis = get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrange(RANKING_KEYS[by], 0, limit - 1, withscores=True)
+            pipe.get(RANKING_COMPUTED_AT_KEY)
+            entries, computed_at = await pipe.execute()
+        entries = [(uid.decode() if isinstance(uid, bytes) else uid, score) for uid, score in entries]
+        if computed_at is not None:
+            computed_at = datetime.fromisoformat(computed_at.decode() if isinstance(computed_at, bytes) else computed_at)
+        return entries, computed_at
+
+    # ---------------- Scheduling ----------------
+    def start(self, session_maker) -> None:
+        """ Start the periodic ranking task. """
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(session_maker))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, session_maker) -> None:
+        while True:
+            try:
+                # The lock is never released: it expires after one interval, so the job runs once per interval in all.
+                if await get_redis().set(RANKING_LOCK_KEY, self.owner, nx=True, ex=self.interval_seconds):
+                    summary = await self.rank(session_maker)
+                    logging.info(f"Books ranked: {summary}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Book ranking failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+
+# Shared instance of this worker
+book_ranker = BookRanker(
+    batch_size=Config.RANKING_BATCH_SIZE,
+    prior_reviews=Config.RANKING_PRIOR_REVIEWS,
+    positive_rating=Config.RANKING_POSITIVE_RATING,
+    top_size=Config.RANKING_TOP_SIZE,
+    interval_seconds=Config.RANKING_INTERVAL_SECONDS,
+    enabled=Config.RANKING_ENABLED,
+)
@@ -0,0 +1,160 @@
+"""
+This file defines the helpers maintaining the rating aggregates stored on the book table
+(rating_count, rating_sum and one histogram column per rating value).
+Reviews update the aggregates incrementally with a single atomic UPDATE, so reading the rating
+of a book never touches the reviews table. `reconcile_rating_aggregates` recomputes them from
+the reviews, to backfill existing data or repair any drift.
+"""
+
+import logging  # Import logging module for logging errors and information.
+from collections import defaultdict  # Import defaultdict for summing the ratings of a batch per book.
+from typing import Iterable, List, Optional, Tuple  # Import typing utilities for type annotations.
+from sqlalchemy import bindparam, func, or_, update  # Import SQL helpers for the aggregate updates.
+from sqlmodel import select  # Import select for building SQL queries.
+from sqlmodel.ext.asyncio.session import AsyncSession  # Import AsyncSession for asynchronous database sessions.
+from src.db.models import BookModel, Review  # Import the Book and Review models.
+
+# Every rating a review can have (see ReviewCreateModel)
+RATING_VALUES = range(0, 5)
+
+
+def histogram_column(rating: int):
+    """
+    Return the histogram column counting the reviews with the given rating.
+    Args:
+        rating: The rating of a review.
+    Returns:
+        The matching `rating_hist_<rating>` column of the book table.
+    Raises:
+        ValueError: If the rating is out of range.
+    """
+    if rating not in RATING_VALUES:
+        raise ValueError(f"Rating {rating} is out of range")
+    return getattr(BookModel, f"rating_hist_{rating}")
+
+
+def rating_increment_values(rating: int, count: int = 1) -> dict:
+    """
+    Build the SET clause adding (or, with a negative count, removing) reviews to the aggregates of a book.
+    The values are expressions on the current column values, so concurrent reviews never lose an update.
+    Args:
+        rating: The rating of the reviews.
+        count: The number of reviews to add.
+    Returns:
+        A dictionary usable in `update(BookModel).values()`.
+    """
+    hist = histogram_column(rating)
+    return {
+        BookModel.rating_count: BookModel.rating_count + count,
+        BookModel.rating_sum: BookModel.rating_sum + rating * count,
+        hist: hist + count,
+    }
+
+
+def rating_change_values(previous_rating: Optional[int], rating: int) -> dict:
+    """
+    Build the SET clause replacing the rating of a review in the aggregates of its book.
+    Args:
+        previous_rating: The current rating of the review (None for a new review).
+        rating: The new rating of the review.
+    Returns:
+        A dictionary usable in `update(BookModel).values()`, empty if the rating does not change.
+    """
+    if previous_rating is None:
+        return rating_increment_values(rating)
+    if previous_rating == rating:
+        return {}
+    previous_hist, hist = histogram_column(previous_rating), histogram_column(rating)
+    return {
+        BookModel.rating_sum: BookModel.rating_sum + (rating - previous_rating),
+        previous_hist: previous_hist - 1,
+        hist: hist + 1,
+    }
+
+
+async def add_ratings(session: AsyncSession, ratings: Iterable[Tuple[object, int]], removed: Iterable[Tuple[object, int]] = ()) -> None:
+    """
+    Add a batch of reviews to the aggregates of their books, with one UPDATE per book sent as a single executemany.
+    The books are updated in UID order, so that concurrent batches lock them in the same order.
+    Args:
+        session: Database session (the caller commits).
+        ratings: (book UID, rating) of every review added.
+        removed: (book UID, previous rating) of every review removed, or replaced by one of `ratings` (optional).
+    """
+    per_book = defaultdict(lambda: [0] * len(RATING_VALUES))
+    for book_uid, rating in ratings:
+        histogram_column(rating)  # Validates the rating.
+        per_book[book_uid][rating] += 1
+    for book_uid, rating in removed:
+        histogram_column(rating)
+        per_book[book_uid][rating] -= 1
+    per_book = {book_uid: histogram for book_uid, histogram in per_book.items() if any(histogram)}  # Edits keeping their rating change nothing.
+    if not per_book:
+        return
+
+    table = BookModel.__table__
+    values = {
+        "rating_count": table.c.rating_count + bindparam("add_count"),
+        "rating_sum": table.c.rating_sum + bindparam("add_sum"),
+    }
+    for rating in RATING_VALUES:
+        values[f"rating_hist_{rating}"] = table.c[f"rating_hist_{rating}"] + bindparam(f"add_hist_{rating}")
+    statement = update(table).where(table.c.uid == bindparam("book_uid")).values(values)
+
+    params = []
+    for book_uid in sorted(per_book, key=str):
+        histogram = per_book[book_uid]
+        row = {"book_uid": book_uid, "add_count": sum(histogram), "add_sum": sum(rating * count for rating, count in enumerate(histogram))}
+        row.update({f"add_hist_{rating}": count for rating, count in enumerate(histogram)})
+        params.append(row)
+    connection = await session.connection()
+    await connection.execute(statement, params)
+
+
+def _review_aggregate(*conditions, aggregate=None):
+    """ Correlated subquery aggregating the reviews of the book being updated. """
+    statement = select(aggregate if aggregate is not None else func.count()).where(Review.book_uid == BookModel.uid, *conditions)
+    return statement.scalar_subquery()
+
+
+async def reconcile_rating_aggregates(session: AsyncSession, batch_size: int = 1000) -> List[str]:
+    """
+    Recompute the rating aggregates of every book from its reviews, in batches of `batch_size` books.
+    Only the books whose stored aggregates differ from the reviews are written.
+    Args:
+        session: Database session.
+        batch_size: Number of books updated per transaction.
+    Returns:
+        The UIDs of the books whose aggregates were corrected.
+    """
+    expected = {
+        BookModel.rating_count: _review_aggregate(),
+        BookModel.rating_sum: _review_aggregate(aggregate=func.coalesce(func.sum(Review.rating), 0)),
+    }
+    for rating in RATING_VALUES:
+        expected[histogram_column(rating)] = _review_aggregate(Review.rating == rating)
+    drifted = or_(*[column != value for column, value in expected.items()])
+
+    corrected = []
+    last_uid = None
+    while True:
+        statement = select(BookModel.uid).order_by(BookModel.uid).limit(batch_size)
+        if last_uid is not None:
+            statement = statement.where(BookModel.uid > last_uid)
+        batch = (await session.exec(statement)).all()
+        if not batch:
+            break
+        last_uid = batch[-1]
+
+        result = await session.exec(
+            update(BookModel)
+            .where(BookModel.uid.in_(batch), drifted)
+            .values(expected)
+            .returning(BookModel.uid)
+            .execution_options(synchronize_session=False)
+        )
+        corrected.extend(str(uid) for uid in result.scalars().all())
+        await session.commit()
+
+    logging.info(f"Rating aggregates reconciled: {len(corrected)} book(s) corrected.")
+    return corrected
@@ -6,15 +6,20 @@ These routes use custom dependencies for token validation and role-based access
 only authorized users can access certain endpoints.
 """
 
-from fastapi import APIRouter, status, Depends, HTTPException  # Import FastAPI utilities for routing, status codes, dependencies, and HTTP exceptions.
-from fastapi.responses import JSONResponse  # Import JSONResponse for sending JSON responses.
-from typing import List  # Import List for type annotations.
+from fastapi import APIRouter, status, Depends, HTTPException, Query, Request  # Import FastAPI utilities for routing, status codes, dependencies, query parameters, and HTTP exceptions.
+from fastapi.responses import JSONResponse, StreamingResponse  # Import JSONResponse and StreamingResponse for sending responses.
+import uuid  # Import the uuid module for handling UUIDs.
+from datetime import datetime  # Import datetime for the export filters.
+from typing import List, Literal, Optional  # Import typing utilities for type annotations.
 from sqlmodel.ext.asyncio.session import AsyncSession  # Import the AsyncSession class for asynchronous database sessions.
-from src.books.schemas import BookModel, BookCreateModel, UpdateBookModel, BookDetailModel  # Import Pydantic models for request and response validation.
+from src.books.schemas import BookModel, BookCreateModel, UpdateBookModel, BookDetailModel, BookPageModel, BookSuggestionModel, BookChangesModel, BookBulkUpdateModel, BookUpdatedModel, BookBulkUpdatedModel, BookFilterModel, BookBatchRequestModel, BookBatchModel, BookTopModel  # Import Pydantic models for request and response validation.
 from src.db.models import BookModel  # Import the BookModel from the database models.
 from src.books.service import BookService  # Import the BookService class for book-related business logic.
-from src.db.main import get_session  # Import the get_session function for database session management.
-from src.auth.dependencies import AccessTokenBearer, RoleChecker  # Import custom dependencies for token validation and role-based access control.
+from src.db.main import get_session, get_read_session, pin_to_primary, async_session_maker, replica_router  # Import the session dependencies (primary and read replicas) and the read-your-writes pin.
+from src.auth.dependencies import access_token_bearer, RoleChecker  # Import custom dependencies for token validation and role-based access control.
+from src.books.suggest import suggest_index  # Import the in-memory autocomplete index.
+from src.books.bulk import import_books, export_rows, IMPORT_FORMATS  # Import the streaming bulk import and export.
+from src.config import Config  # Import the Config class for accessing configuration settings.
 
 # Initialize FastAPI Router for books
 book_router = APIRouter()
@@ -22,57 +27,196 @@ book_router = APIRouter()
 # BookService instance for handling book-related operations
 book_service = BookService()
 
-# Dependencies for authentication and role-based access control
-access_token_bearer = AccessTokenBearer()
+# Dependencies for authentication and role-based access control (the bearer is shared so the token is verified once per request)
 role_checker = Depends(RoleChecker(['admin', 'user']))
+admin_checker = Depends(RoleChecker(['admin']))
 
 # ----------------- List all the books -----------------
-@book_router.get("/", response_model=List[BookModel], dependencies=[role_checker])
+@book_router.get("/", response_model=BookPageModel, dependencies=[role_checker])
 async def getAllBooks(
-    session: AsyncSession = Depends(get_session), 
+    cursor: Optional[str] = None,
+    limit: int = Query(default=Config.PAGE_SIZE_DEFAULT, ge=1),
+    session: AsyncSession = Depends(get_read_session), 
     token_details: dict = Depends(access_token_bearer)
 ):
     """
-    Retrieve all books from the database.
+    Retrieve one page of books from the database, newest first.
 
     Args:
+        cursor (str): Cursor returned as `next_cursor` by the previous page (optional).
+        limit (int): Number of books per page (capped by PAGE_SIZE_MAX).
         session (AsyncSession): Database session for querying.
         token_details: User details retrieved from the access token.
 
     Returns:
-        List[BookModel]: List of all books.
+        BookPageModel: Books of the page and the cursor of the next page.
     """
     print(f"User details: {token_details}")
-    return await book_service.get_all_books(session)
+    return await book_service.get_all_books(session, cursor=cursor, limit=limit)
 
 # ----------------- List all the books added by a specific user -----------------
-@book_router.get("/user/{user_uid}", response_model=List[BookModel], dependencies=[role_checker])
+@book_router.get("/user/{user_uid}", response_model=BookPageModel, dependencies=[role_checker])
 async def get_user_book_submissions(
     user_uid : str,
-    session: AsyncSession = Depends(get_session), 
+    cursor: Optional[str] = None,
+    limit: int = Query(default=Config.PAGE_SIZE_DEFAULT, ge=1),
+    session: AsyncSession = Depends(get_read_session), 
     token_details: dict = Depends(access_token_bearer)
 ):
     """
-    Retrieve all books from the database created by a particular user.
+    Retrieve one page of books created by a particular user, newest first.
 
     Args:
-        session (AsyncSession): Database session for querying.
         user_uid: UID of the user who has inserted data of the books.
+        cursor (str): Cursor returned as `next_cursor` by the previous page (optional).
+        limit (int): Number of books per page (capped by PAGE_SIZE_MAX).
+        session (AsyncSession): Database session for querying.
         token_details: User details retrieved from the access token.
 
     Returns:
-        List[BookModel]: List of all books added by that particular user.
+        BookPageModel: Books of the page added by that particular user and the cursor of the next page.
     """
     print(f"User details: {token_details}")
-    return await book_service.get_user_books(user_uid, session)
+    return await book_service.get_user_books(user_uid, session, cursor=cursor, limit=limit)
+
+# ----------------- Search the books -----------------
+# Declared before "/{book_uid}" so that "search" is not taken for a book ID.
+@book_router.get("/search", response_model=BookPageModel, dependencies=[role_checker])
+async def search_books(
+    q: str = Query(min_length=1, max_length=256),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=Config.PAGE_SIZE_DEFAULT, ge=1),
+    session: AsyncSession = Depends(get_read_session), 
+    token_details: dict = Depends(access_token_bearer)
+):
+    """
+    Search the books by title, author and publisher, best match first.
+
+    Args:
+        q (str): The search query: words (all must match), "quoted phrases" and prefix* terms.
+        cursor (str): Cursor returned as `next_cursor` by the previous page (optional).
+        limit (int): Number of books per page (capped by PAGE_SIZE_MAX).
+        session (AsyncSession): Database session for querying.
+        token_details: User details retrieved from the access token.
+
+    Returns:
+        BookPageModel: Matching books of the page and the cursor of the next page.
+    """
+    return await book_service.search_books(q, session, cursor=cursor, limit=limit)
+
+# ----------------- Top rated books -----------------
+# Declared before "/{book_uid}" so that "top" is not taken for a book ID.
+@book_router.get("/top", response_model=BookTopModel, dependencies=[role_checker])
+async def get_top_books(
+    by: Literal["rating", "wilson"] = "rating",
+    limit: int = Query(default=Config.PAGE_SIZE_DEFAULT, ge=1),
+    session: AsyncSession = Depends(get_read_session), 
+    token_details: dict = Depends(access_token_bearer)
+):
+    """
+    Retrieve the best ranked books, computed periodically by the ranking job.
+
+    Args:
+        by (str): "rating" (Bayesian average rating, default) or "wilson" (lower bound of the share of positive reviews).
+        limit (int): Number of books (capped by PAGE_SIZE_MAX).
+        session (AsyncSession): Database session for querying.
+        token_details: User details retrieved from the access token.
+
+    Returns:
+        BookTopModel: The books, best first, with their scores.
+    """
+    return await book_service.get_top_books(by, limit, session)
+
+# ----------------- Changes since a cursor (delta sync) -----------------
+@book_router.get("/changes", response_model=BookChangesModel, dependencies=[role_checker])
+async def get_book_changes(
+    since: Optional[str] = None,
+    limit: int = Query(default=Config.PAGE_SIZE_MAX, ge=1),
+    session: AsyncSession = Depends(get_session), 
+    token_details: dict = Depends(access_token_bearer)
+):
+    """
+    Retrieve the books and reviews created or updated, and the books deleted, since a cursor.
+    Reads go to the primary: a lagging replica could make the feed skip changes for good.
+
+    Args:
+        since (str): `next_cursor` of the previous call (optional, starts from the beginning).
+        limit (int): Maximum number of rows per kind of change (capped by PAGE_SIZE_MAX).
+        session (AsyncSession): Database session for querying.
+        token_details: User details retrieved from the access token.
+
+    Returns:
+        BookChangesModel: The changes, the cursor of the next call and whether more changes are waiting.
+    """
+    return await book_service.get_changes(session, since=since, limit=limit)
+
+# ----------------- Suggest titles and authors -----------------
+# Served from the in-memory index of this worker, without any database query.
+@book_router.get("/suggest", response_model=List[BookSuggestionModel], dependencies=[role_checker])
+async def suggest_books(
+    prefix: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1),
+    token_details: dict = Depends(access_token_bearer)
+):
+    """
+    Suggest book titles and authors starting with (or close to) what the user typed.
+
+    Args:
+        prefix (str): The text typed so far.
+        limit (int): Number of suggestions (capped by SUGGEST_MAX_RESULTS).
+        token_details: User details retrieved from the access token.
+
+    Returns:
+        List[BookSuggestionModel]: Suggestions, exact prefix matches first.
+    """
+    if not suggest_index.enabled:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Suggestions are disabled")
+    return suggest_index.suggest(prefix, min(limit, Config.SUGGEST_MAX_RESULTS))
+
+# ----------------- Export books or reviews -----------------
+@book_router.get("/export", dependencies=[admin_checker])
+async def exportBooks(
+    resource: Literal["books", "reviews"] = "books",
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user_uid: Optional[uuid.UUID] = None,
+    updated_since: Optional[datetime] = None,
+    gzip: bool = False
+) -> StreamingResponse:
+    """
+    Stream every book or review as NDJSON or CSV (admin only).
+    Rows are read through a server-side cursor, so memory use does not depend on the size of the table.
+
+    Args:
+        resource (str): "books" or "reviews".
+        format (str): "ndjson" or "csv".
+        user_uid (UUID): Only export the rows of this user (optional).
+        updated_since (datetime): Only export the rows updated at or after this time (optional).
+        gzip (bool): Gzip the output on the fly.
+
+    Returns:
+        StreamingResponse: The export, sent as it is read.
+    """
+    session_maker = replica_router.choose() if replica_router.engines else async_session_maker  # Full scans go to a replica when there is one.
+    content = export_rows(
+        session_maker,  # The response outlives the request, so the export opens its own session.
+        resource,
+        format,
+        user_uid=str(user_uid) if user_uid else None,
+        updated_since=updated_since,
+        compress=gzip,
+        batch_size=Config.EXPORT_BATCH_SIZE,
+    )
+    filename = f"{resource}.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else ("application/x-ndjson" if format == "ndjson" else "text/csv")
+    return StreamingResponse(content, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 # ----------------- List the book data by ID -----------------
 @book_router.get("/{book_uid}", response_model=BookDetailModel, dependencies=[role_checker])
 async def getBook(
     book_uid: str, 
-    session: AsyncSession = Depends(get_session), 
+    session: AsyncSession = Depends(get_read_session), 
     token_details: dict = Depends(access_token_bearer)
-) -> dict:
+):
     """
     Retrieve details of a specific book by its unique ID.
 
@@ -82,15 +226,15 @@ async def getBook(
         token_details: User details retrieved from the access token.
 
     Returns:
-        dict: Success message and book data if found.
+        BookDetailModel: The book data with its reviews if found.
 
     Raises:
         HTTPException: If the book with the given ID is not found.
     """
     print(f"User details: {token_details}")
-    book = await book_service.get_book(book_uid, session)
+    book = await book_service.get_book_detail(book_uid, session)
     if book is not None:
-        return {"message": "Book data retrieved successfully", "data": book}
+        return book
     else:
         raise HTTPException(status_code=404, detail=f"Book with ID '{book_uid}' not found")
 
@@ -117,10 +261,133 @@ async def createBook(
         raise HTTPException(status_code=400, detail="User details not found in token")
     user_uid = user['user_uid']
     new_book = await book_service.create_book(newbook, user_uid, session)
+    await pin_to_primary(user_uid)  # The user's next reads must see the new book.
     return {"message": "Book created successfully", "data": new_book}
 
+# ----------------- List several books by ID -----------------
+@book_router.post("/batch", response_model=BookBatchModel, dependencies=[role_checker])
+async def getBooks(
+    batch: BookBatchRequestModel,
+    session: AsyncSession = Depends(get_read_session), 
+    token_details: dict = Depends(access_token_bearer)
+):
+    """
+    Retrieve several books by their unique IDs in one request, for instance to render a reading list.
+
+    Args:
+        batch (BookBatchRequestModel): UIDs of the books (at most BOOK_BATCH_MAX_UIDS) and whether to include their reviews.
+        session (AsyncSession): Database session for querying.
+        token_details: User details retrieved from the access token.
+
+    Returns:
+        BookBatchModel: The books found, in the order of the request, and the UIDs that match no book.
+    """
+    if len(batch.uids) > Config.BOOK_BATCH_MAX_UIDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {Config.BOOK_BATCH_MAX_UIDS} books can be fetched at once")
+    return await book_service.get_books(batch.uids, session, with_reviews=batch.include_reviews)
+
+# ----------------- Bulk import of books -----------------
+@book_router.post("/import", dependencies=[admin_checker])
+async def importBooks(
+    request: Request,
+    format: Optional[str] = Query(default=None, description="ndjson or csv; taken from the Content-Type when omitted"),
+    batch_size: int = Query(default=Config.BULK_IMPORT_BATCH_SIZE, ge=1),
+    token_details: dict = Depends(access_token_bearer)
+) -> dict:
+    """
+    Import books from an NDJSON or CSV request body (admin only).
+    The body is parsed while it is received and the books are inserted in batches, so one bad row
+    never fails the whole import.
+
+    Args:
+        request (Request): The incoming request, whose body is streamed.
+        format (str): "ndjson" or "csv" (optional, detected from the Content-Type).
+        batch_size (int): Number of books per INSERT and transaction (capped by BULK_IMPORT_MAX_BATCH_SIZE).
+        token_details: User details retrieved from the access token.
+
+    Returns:
+        dict: Rows read, inserted and failed, batches, and the errors of the failed rows with their line number.
+    """
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported format '{format}', expected one of {', '.join(IMPORT_FORMATS)}")
+    user_uid = token_details["user"]["user_uid"]
+    report = await import_books(
+        async_session_maker,  # One short transaction per batch on the primary, independently of the request session.
+        request.stream(),
+        format,
+        user_uid,
+        batch_size=min(batch_size, Config.BULK_IMPORT_MAX_BATCH_SIZE),
+        max_errors=Config.BULK_IMPORT_MAX_ERRORS,
+    )
+    await pin_to_primary(user_uid)  # The user's next reads must see the imported books.
+    return report
+
+# ----------------- Bulk update of books -----------------
+@book_router.patch("/", status_code=status.HTTP_200_OK, response_model=BookBulkUpdatedModel, dependencies=[admin_checker])
+async def updateBooks(
+    bulk_update: BookBulkUpdateModel,
+    session: AsyncSession = Depends(get_session), 
+    token_details: dict = Depends(access_token_bearer)
+) -> dict:
+    """
+    Apply the same update to several books with a single UPDATE statement (admin only).
+
+    Args:
+        bulk_update (BookBulkUpdateModel): UIDs of the books (at most BULK_UPDATE_MAX_BOOKS) and the fields to write.
+        session (AsyncSession): Database session for querying.
+        token_details: User details retrieved from the access token.
+
+    Returns:
+        dict: Success message, the updated books and the UIDs that matched no book.
+    """
+    if len(bulk_update.uids) > Config.BULK_UPDATE_MAX_BOOKS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {Config.BULK_UPDATE_MAX_BOOKS} books can be updated at once")
+    result = await book_service.update_books(bulk_update.uids, bulk_update.changes, session)
+    await pin_to_primary(token_details['user']['user_uid'])  # The user's next reads must see the update.
+    return {"message": f"{len(result['updated'])} book(s) updated successfully", "data": result["updated"], "missing": result["missing"]}
+
+# ----------------- Bulk deletion of books -----------------
+@book_router.delete("/", status_code=status.HTTP_200_OK, dependencies=[admin_checker])
+async def deleteBooks(
+    user_uid: Optional[uuid.UUID] = None,
+    author: Optional[str] = None,
+    publisher: Optional[str] = None,
+    language: Optional[str] = None,
+    created_before: Optional[datetime] = None,
+    created_after: Optional[datetime] = None,
+    session: AsyncSession = Depends(get_session), 
+    token_details: dict = Depends(access_token_bearer)
+) -> dict:
+    """
+    Delete every book matching all the given criteria, in one transaction (admin only).
+    At least one criterion is required.
+
+    Args:
+        user_uid (UUID): UID of the user who created the books (optional).
+        author (str): Author of the books (optional).
+        publisher (str): Publisher of the books (optional).
+        language (str): Language of the books (optional).
+        created_before (datetime): Only books created before this time (optional).
+        created_after (datetime): Only books created at or after this time (optional).
+        session (AsyncSession): Database session for querying.
+        token_details: User details retrieved from the access token.
+
+    Returns:
+        dict: Success message and the UIDs of the deleted books.
+
+    Raises:
+        HTTPException: If no criterion is given.
+    """
+    filters = BookFilterModel(user_uid=user_uid, author=author, publisher=publisher, language=language,
+                              created_before=created_before, created_after=created_after)
+    deleted = await book_service.delete_books(filters, session)
+    await pin_to_primary(token_details['user']['user_uid'])  # The user's next reads must not see the books anymore.
+    return {"message": f"{len(deleted)} book(s) deleted successfully", "uids": deleted}
+
 # ----------------- Update Books based on User ID -----------------
-@book_router.patch("/updatebook/{book_uid}", status_code=status.HTTP_200_OK, dependencies=[role_checker])
+@book_router.patch("/updatebook/{book_uid}", status_code=status.HTTP_200_OK, response_model=BookUpdatedModel, dependencies=[role_checker])
 async def updateBook(
     book_uid: str, 
     book: UpdateBookModel, 
@@ -144,6 +411,7 @@ async def updateBook(
     """
     print(f"User details: {token_details}")
     updated_book = await book_service.update_book(book_uid, book, session)
+    await pin_to_primary(token_details['user']['user_uid'])  # The user's next reads must see the update.
     if updated_book is not None:
         return {"message": "Book updated successfully", "data": updated_book}
     else:
@@ -172,6 +440,7 @@ async def deleteBook(
     """
     print(f"User details: {token_details}")
     book_to_delete = await book_service.delete_book(book_uid, session)
+    await pin_to_primary(token_details['user']['user_uid'])  # The user's next reads must not see the book anymore.
     print(f"Book to delete: {book_to_delete}")
     if book_to_delete is not None:
         return JSONResponse(status_code=200, content={"message": "Book deleted successfully"})
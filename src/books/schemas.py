@@ -6,9 +6,9 @@ They ensure that the data being sent and received adheres to the expected struct
 
 import uuid  # Import the uuid module for handling UUIDs.
 from src.reviews.schemas import ReviewModel  # Import the ReviewModel from the reviews module.
-from typing import Optional, List  # Import typing utilities for type annotations.
+from typing import Optional, List, Union  # Import typing utilities for type annotations.
 from datetime import datetime, date  # Import datetime and date for handling date and time.
-from pydantic import BaseModel  # Import BaseModel from pydantic for creating Pydantic models.
+from pydantic import BaseModel, Field  # Import BaseModel from pydantic for creating Pydantic models, and Field for constraints.
 
 # Create Book
 class BookModel(BaseModel):
@@ -24,13 +24,80 @@ class BookModel(BaseModel):
     created_at: Optional[datetime] = None  # Timestamp of when the book was created.
     updated_at: Optional[datetime] = None  # Timestamp of when the book was last updated.
     published_date: Optional[date] = None  # Date when the book was published.
+    rating_count: int = 0  # Number of reviews of the book.
+    rating_sum: int = 0  # Sum of the ratings of the book.
+    rating_average: Optional[float] = None  # Average rating of the book (None without reviews).
+    rating_histogram: List[int] = [0, 0, 0, 0, 0]  # Number of reviews for every rating from 0 to 4.
 
 class BookDetailModel(BookModel):
     """
-    Pydantic model for representing detailed information about a book, including reviews.
-    Inherits from BookModel.
+    Pydantic model for representing detailed information about a book, including its latest reviews.
+    Inherits from BookModel. The older reviews are listed by GET /reviews/book/{book_uid}, starting at `reviews_next_cursor`.
     """
-    reviews: List[ReviewModel]  # List of reviews associated with the book.
+    reviews: List[ReviewModel]  # Latest reviews of the book, newest first (at most BOOK_DETAIL_REVIEWS).
+    reviews_next_cursor: Optional[str] = None  # Cursor of the following reviews (None if all of them are listed).
+
+class BookBatchRequestModel(BaseModel):
+    """
+    Pydantic model for fetching several books at once.
+    """
+    uids: List[uuid.UUID] = Field(min_length=1)  # UIDs of the books, in the order they are wanted.
+    include_reviews: bool = False  # Whether to return the reviews of every book.
+
+class BookBatchModel(BaseModel):
+    """
+    Pydantic model for representing the books of a batch, in the order of the request.
+    """
+    items: List[Union[BookDetailModel, BookModel]]  # Books found (with their reviews when requested), in the order of the requested UIDs.
+    missing: List[uuid.UUID]  # Requested UIDs that match no book.
+
+class BookPageModel(BaseModel):
+    """
+    Pydantic model for representing one page of books.
+    `next_cursor` is passed back as `cursor` to fetch the following page; it is None on the last page.
+    """
+    items: List[BookModel]  # Books of the current page.
+    next_cursor: Optional[str] = None  # Opaque cursor pointing after the last book of the page.
+
+class DeletedBookModel(BaseModel):
+    """
+    Pydantic model for representing a deleted book in the change feed.
+    """
+    uid: uuid.UUID  # UID of the deleted book.
+    deleted_at: datetime  # Timestamp of when the book was deleted.
+
+class BookChangesModel(BaseModel):
+    """
+    Pydantic model for representing one page of the change feed.
+    `next_cursor` is passed back as `since` on the next call; `has_more` tells to call again right away.
+    """
+    books: List[BookModel]  # Books created or updated since the cursor.
+    reviews: List[ReviewModel]  # Reviews created or updated since the cursor.
+    deleted: List[DeletedBookModel]  # Books deleted since the cursor.
+    next_cursor: str  # Opaque cursor pointing after the last change returned.
+    has_more: bool  # Whether more changes are already available.
+
+class BookRankedModel(BookModel):
+    """
+    Pydantic model for representing a book in a ranking, with the score it is ranked by.
+    """
+    score: float  # Bayesian average rating, or Wilson lower bound of the share of positive reviews.
+
+class BookTopModel(BaseModel):
+    """
+    Pydantic model for representing the best ranked books.
+    """
+    by: str  # The score the books are ranked by ("rating" or "wilson").
+    items: List[BookRankedModel]  # Books, best first.
+    computed_at: Optional[datetime] = None  # When the ranking was computed (None if it was read from the database).
+
+class BookSuggestionModel(BaseModel):
+    """
+    Pydantic model for representing one autocomplete suggestion.
+    """
+    text: str  # Suggested title or author.
+    field: str  # "title" or "author".
+    book_count: int  # Number of books with this title or author.
 
 class BookCreateModel(BaseModel):
     """
@@ -56,6 +123,39 @@ class UpdateBookModel(BaseModel):
     language: Optional[str] = "English"  # Language of the book (default is English).
     published_date: Optional[date] = None  # Date when the book was published.
 
+class BookBulkUpdateModel(BaseModel):
+    """
+    Pydantic model for applying the same update to several books.
+    """
+    uids: List[uuid.UUID] = Field(min_length=1)  # UIDs of the books to update.
+    changes: UpdateBookModel  # Fields to write; fields left out keep their value.
+
+class BookUpdatedModel(BaseModel):
+    """
+    Pydantic model for representing the response of a book update.
+    """
+    message: str  # Success message.
+    data: BookModel  # The book as written.
+
+class BookBulkUpdatedModel(BaseModel):
+    """
+    Pydantic model for representing the response of a bulk update.
+    """
+    message: str  # Success message.
+    data: List[BookModel]  # The books as written.
+    missing: List[uuid.UUID]  # Requested UIDs that match no book.
+
+class BookFilterModel(BaseModel):
+    """
+    Pydantic model for selecting the books of a bulk deletion; a book must match every criterion given.
+    """
+    user_uid: Optional[uuid.UUID] = None  # UID of the user who created the books.
+    author: Optional[str] = None  # Author of the books.
+    publisher: Optional[str] = None  # Publisher of the books.
+    language: Optional[str] = None  # Language of the books.
+    created_before: Optional[datetime] = None  # Only books created before this time.
+    created_after: Optional[datetime] = None  # Only books created at or after this time.
+
 class BOOKS:
     """
     Class representing a book with attributes for title, author, publisher, published date, page count, and language.
@@ -0,0 +1,236 @@
+"""
+This file defines the full-text search over the title, author and publisher of the books.
+On Postgres, the search uses the generated `book.search_vector` tsvector column and its GIN index
+(created by the "add book search vector" migration, or by init_db, see src/db/models.py); the column is
+maintained by the database and is not mapped on BookModel. Other databases (SQLite in tests) use an
+in-process inverted index that mirrors the same tokenization, weighting and query syntax.
+
+Query syntax:
+    words               every word must match (AND)
+    "quoted words"      the words must follow each other (phrase)
+    word*               prefix match
+"""
+
+import re  # Import re for tokenizing the queries and the book fields.
+import uuid  # Import the uuid module for handling UUIDs.
+from dataclasses import dataclass  # Import dataclass for the parsed query terms.
+from typing import Dict, List, Optional, Tuple  # Import typing utilities for type annotations.
+from fastapi import HTTPException, status  # Import HTTPException and status codes for invalid queries.
+from sqlalchemy import func, literal_column  # Import SQL helpers for the tsvector queries.
+from sqlmodel import select  # Import select for building SQL queries.
+from sqlmodel.ext.asyncio.session import AsyncSession  # Import AsyncSession for asynchronous database sessions.
+from src.db.models import BookModel  # Import the BookModel from the database models.
+from src.db.pagination import fetch_keyset_page, clamp_page_size, decode_cursor, encode_cursor  # Import the keyset pagination helpers.
+
+# Text search configuration of the generated column: no stemming or stop words, like the fallback index
+SEARCH_CONFIG = "simple"
+
+# Searchable fields and their weight (Postgres ranks weight A as 1.0, B as 0.4 and C as 0.2)
+SEARCH_FIELDS = (("title", "A", 1.0), ("author", "B", 0.4), ("publisher", "C", 0.2))
+
+# Generated column, see BOOK_SEARCH_VECTOR in src/db/models.py
+search_vector = literal_column("book.search_vector")
+
+_TOKEN = re.compile(r"\w+")
+_QUERY_PART = re.compile(r'"([^"]*)"|(\S+)')
+
+@dataclass
+class SearchTerm:
+    """
+    One clause of a search query: a single word or a phrase, the last word optionally being a prefix.
+    """
+    words: List[str]
+    prefix: bool = False
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """ Split a text into lowercase words, like the 'simple' text search configuration. """
+    return _TOKEN.findall(text.lower()) if text else []
+
+
+def parse_search_query(query: str) -> List[SearchTerm]:
+    """
+    Parse a search query into terms.
+    Args:
+        query: The query sent by the client.
+    Returns:
+        The terms, all of which must match.
+    Raises:
+        HTTPException: If the query contains no searchable word.
+    """
+    terms = []
+    for phrase, word in _QUERY_PART.findall(query):
+        words = tokenize(phrase if phrase else word)
+        if words:
+            terms.append(SearchTerm(words=words, prefix=not phrase and word.endswith("*")))
+    if not terms:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query has no searchable words")
+    return terms
+
+
+def to_tsquery_text(terms: List[SearchTerm]) -> str:
+    """
+    Build the text of a `to_tsquery` call. Words only contain \\w characters, so they cannot inject operators.
+    Args:
+        terms: The parsed query terms.
+    Returns:
+        The tsquery text, e.g. "(the <-> hobbit) & (tolk:*)".
+    """
+    clauses = []
+    for term in terms:
+        words = list(term.words)
+        if term.prefix:
+            words[-1] += ":*"
+        clauses.append(" <-> ".join(words))
+    return " & ".join(f"({clause})" for clause in clauses)
+
+
+class FallbackSearchIndex:
+    """
+    In-process inverted index of the searchable fields, used when the database has no tsvector support.
+    It is built from the database on the first search and kept up to date by BookService afterwards.
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self._postings: Dict[str, Dict[uuid.UUID, List[Tuple[int, float]]]] = {}  # word -> book UID -> (position, weight)
+        self._words: Dict[uuid.UUID, List[str]] = {}  # book UID -> indexed words, to remove a book
+
+    async def build(self, session: AsyncSession) -> None:
+        """ Index every book of the database. """
+        self._postings.clear()
+        self._words.clear()
+        result = await session.exec(select(BookModel))
+        for book in result.all():
+            self._index(book)
+        self.ready = True
+
+    def add(self, book: BookModel) -> None:
+        """ Index a new or updated book (no-op until the index is built). """
+        if self.ready:
+            self.remove(book.uid)
+            self._index(book)
+
+    def remove(self, book_uid) -> None:
+        """ Remove a book from the index (no-op until the index is built). """
+        if not self.ready:
+            return
+        book_uid = uuid.UUID(str(book_uid))
+        for word in self._words.pop(book_uid, []):
+            postings = self._postings.get(word)
+            if postings is not None:
+                postings.pop(book_uid, None)
+                if not postings:
+                    del self._postings[word]
+
+    def _index(self, book: BookModel) -> None:
+        book_uid = uuid.UUID(str(book.uid))
+        position = 0
+        words = set()
+        for field, _, weight in SEARCH_FIELDS:
+            for word in tokenize(getattr(book, field)):
+                position += 1
+                self._postings.setdefault(word, {}).setdefault(book_uid, []).append((position, weight))
+                words.add(word)
+        self._words[book_uid] = list(words)
+
+    def _word_postings(self, word: str, prefix: bool) -> Dict[uuid.UUID, List[Tuple[int, float]]]:
+        if not prefix:
+            return self._postings.get(word, {})
+        merged: Dict[uuid.UUID, List[Tuple[int, float]]] = {}
+        for indexed, postings in self._postings.items():
+            if indexed.startswith(word):
+                for book_uid, positions in postings.items():
+                    merged.setdefault(book_uid, []).extend(positions)
+        return merged
+
+    def _term_matches(self, term: SearchTerm) -> Dict[uuid.UUID, float]:
+        """ Score of every book matching a term: the weights of the positions where the term starts. """
+        postings = [
+            self._word_postings(word, term.prefix and i == len(term.words) - 1)
+            for i, word in enumerate(term.words)
+        ]
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates &= set(other)
+
+        scores = {}
+        for book_uid in candidates:
+            following = [{position for position, _ in p[book_uid]} for p in postings[1:]]
+            score = sum(
+                weight for position, weight in postings[0][book_uid]
+                if all(position + offset + 1 in positions for offset, positions in enumerate(following))
+            )
+            if score:
+                scores[book_uid] = score
+        return scores
+
+    def search(self, terms: List[SearchTerm]) -> List[Tuple[float, uuid.UUID]]:
+        """
+        Find the books matching every term.
+        Returns:
+            (rank, book UID) pairs, best match first.
+        """
+        ranks: Optional[Dict[uuid.UUID, float]] = None
+        for term in terms:
+            matches = self._term_matches(term)
+            if ranks is None:
+                ranks = matches
+            else:
+                ranks = {book_uid: ranks[book_uid] + score for book_uid, score in matches.items() if book_uid in ranks}
+        return sorted(((rank, book_uid) for book_uid, rank in (ranks or {}).items()), reverse=True)
+
+# Used by every non-Postgres session of this worker
+fallback_search_index = FallbackSearchIndex()
+
+
+async def search_books(session: AsyncSession, query: str, cursor: Optional[str] = None, limit: Optional[int] = None) -> dict:
+    """
+    Search the books, best match first, one page at a time.
+    Args:
+        session: Database session.
+        query: The search query (see the module docstring for the syntax).
+        cursor: Cursor returned with the previous page (optional).
+        limit: Maximum number of books to return (optional, capped by PAGE_SIZE_MAX).
+    Returns:
+        A dictionary with the books of the page and the cursor of the next page.
+    """
+    terms = parse_search_query(query)
+    if session.bind.dialect.name == "postgresql":
+        return await _search_postgres(session, terms, cursor, limit)
+    return await _search_fallback(session, terms, cursor, limit)
+
+
+async def _search_postgres(session: AsyncSession, terms: List[SearchTerm], cursor: Optional[str], limit: Optional[int]) -> dict:
+    tsquery = func.to_tsquery(SEARCH_CONFIG, to_tsquery_text(terms))
+    rank = func.ts_rank_cd(search_vector, tsquery)
+    statement = select(BookModel, rank.label("rank")).where(search_vector.op("@@")(tsquery))
+    page = await fetch_keyset_page(
+        session, statement, (rank, BookModel.uid), cursor, limit,
+        types=(float, uuid.UUID),
+        cursor_values=lambda row: (row.rank, row[0].uid),
+    )
+    return {"items": [row[0] for row in page["items"]], "next_cursor": page["next_cursor"]}
+
+
+async def _search_fallback(session: AsyncSession, terms: List[SearchTerm], cursor: Optional[str], limit: Optional[int]) -> dict:
+    if not fallback_search_index.ready:
+        await fallback_search_index.build(session)
+    page_size = clamp_page_size(limit)
+    matches = fallback_search_index.search(terms)
+    if cursor:
+        after = tuple(decode_cursor(cursor, (float, uuid.UUID)))
+        matches = [match for match in matches if match < after]
+    page = matches[:page_size + 1]
+
+    next_cursor = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        next_cursor = encode_cursor(*page[-1])
+
+    uids = [book_uid for _, book_uid in page]
+    books = {}
+    if uids:
+        result = await session.exec(select(BookModel).where(BookModel.uid.in_(uids)))
+        books = {book.uid: book for book in result.all()}
+    return {"items": [books[book_uid] for book_uid in uids if book_uid in books], "next_cursor": next_cursor}
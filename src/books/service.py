@@ -1,52 +1,193 @@
 """In this we are going to write all our logic regarding CRUD operations"""
 
 from sqlmodel.ext.asyncio.session import AsyncSession  # Import the AsyncSession class for asynchronous database sessions.
-from .schemas import BookCreateModel, UpdateBookModel  # Import the BookCreateModel and UpdateBookModel schemas for book creation and updates.
-from sqlmodel import select, desc  # Import select for constructing SQL queries and desc for ordering results in descending order.
+from .schemas import BookModel as BookSchema, BookCreateModel, UpdateBookModel, BookDetailModel, BookFilterModel  # Import the schemas for books, book creation, updates, book details and bulk filters.
+from .cache import book_detail_cache  # Import the book detail cache.
+from .search import search_books, fallback_search_index  # Import the full-text search and its in-process fallback index.
+from .suggest import suggest_index  # Import the autocomplete index.
+from .changes import get_changes  # Import the change feed.
+from .ranking import book_ranker, RANKING_COLUMNS  # Import the book ranking and its score columns.
+from sqlmodel import select  # Import select for constructing SQL queries.
+from sqlalchemy import update, delete  # Import update and delete for the single-statement writes.
+from sqlalchemy.orm import selectinload  # Import selectinload for loading relationships on demand.
+import logging  # Import logging module for logging errors and information.
 from uuid import UUID  # Import the UUID class for handling UUIDs.
-from src.db.models import BookModel  # Import the BookModel from the database models.
+from typing import List, Optional  # Import typing utilities for type annotations.
+from datetime import datetime  # Import datetime for the server-side timestamps.
+from src.db.models import BookModel, Review, BookTombstone  # Import the Book, Review and Book tombstone models from the database models.
 from fastapi import HTTPException  # Import HTTPException for raising HTTP exceptions.
+from src.db.pagination import fetch_keyset_page, clamp_page_size  # Import the keyset pagination helpers.
+from src.reviews.service import ReviewService  # Import the ReviewService class for the latest reviews embedded in the book details.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.db.main import engine, async_session_maker, replica_router  # Import the primary engine and its session factory, which fill the book detail cache, and the replicas.
+
+review_service = ReviewService()
 
 class BookService:
-    async def get_all_books(self, session: AsyncSession):
+    async def get_all_books(self, session: AsyncSession, cursor: Optional[str] = None, limit: Optional[int] = None):
         """
-        Retrieve all books from the database, ordered by creation date in descending order.
+        Retrieve one page of books from the database, ordered by creation date in descending order.
         Args:
             session: Database session (injected via dependency).
+            cursor: Cursor returned with the previous page (optional).
+            limit: Maximum number of books to return (optional, capped by PAGE_SIZE_MAX).
         Returns:
-            List of all books.
+            Dictionary with the books of the page and the cursor of the next page.
         """
-        statement = select(BookModel).order_by(desc(BookModel.created_at))  # Construct a SQL query to select all books ordered by creation date.
-        result = await session.exec(statement)  # Execute the query.
-        return result.all()  # Return all books.
+        statement = select(BookModel)  # Construct a SQL query to select books; ordering is applied by the paginator.
+        return await fetch_keyset_page(session, statement, (BookModel.created_at, BookModel.uid), cursor, limit)
 
-    async def get_user_books(self, user_uid: str, session: AsyncSession):
+    async def get_user_books(self, user_uid: str, session: AsyncSession, cursor: Optional[str] = None, limit: Optional[int] = None):
         """
-        Retrieve all books from the database created by a specific user, ordered by creation date in descending order.
+        Retrieve one page of books created by a specific user, ordered by creation date in descending order.
         Args:
             user_uid: UID of the user who created the books.
             session: Database session (injected via dependency).
+            cursor: Cursor returned with the previous page (optional).
+            limit: Maximum number of books to return (optional, capped by PAGE_SIZE_MAX).
         Returns:
-            List of all books created by the specified user.
+            Dictionary with the books of the page and the cursor of the next page.
         """
-        statement = select(BookModel).where(BookModel.user_uid == user_uid).order_by(desc(BookModel.created_at))  # Construct a SQL query to select books by user UID ordered by creation date.
-        result = await session.exec(statement)  # Execute the query.
-        return result.all()  # Return all books created by the specified user.
+        statement = select(BookModel).where(BookModel.user_uid == user_uid)  # Construct a SQL query to select books by user UID.
+        return await fetch_keyset_page(session, statement, (BookModel.created_at, BookModel.uid), cursor, limit)
+
+    async def search_books(self, query: str, session: AsyncSession, cursor: Optional[str] = None, limit: Optional[int] = None):
+        """
+        Search the books by title, author and publisher, best match first.
+        Args:
+            query: The search query (words, "quoted phrases" and prefix* terms).
+            session: Database session (injected via dependency).
+            cursor: Cursor returned with the previous page (optional).
+            limit: Maximum number of books to return (optional, capped by PAGE_SIZE_MAX).
+        Returns:
+            Dictionary with the books of the page and the cursor of the next page.
+        """
+        return await search_books(session, query, cursor=cursor, limit=limit)
+
+    async def get_changes(self, session: AsyncSession, since: Optional[str] = None, limit: Optional[int] = None):
+        """
+        Retrieve the books and reviews created or updated, and the books deleted, since a cursor.
+        Args:
+            session: Database session (injected via dependency).
+            since: Cursor returned by the previous call (optional, starts from the beginning).
+            limit: Maximum number of rows per kind of change (optional, capped by PAGE_SIZE_MAX).
+        Returns:
+            Dictionary with the changed books, reviews and deleted books, the next cursor and `has_more`.
+        """
+        return await get_changes(session, since=since, limit=limit)
 
-    async def get_book(self, book_uid: str, session: AsyncSession):
+    async def get_book(self, book_uid: str, session: AsyncSession, with_reviews: bool = False):
         """
         Retrieve a specific book by its unique ID.
         Args:
             book_uid: Unique identifier of the book.
             session: Database session (injected via dependency).
+            with_reviews: Whether to load the reviews of the book in a second query (default is False).
         Returns:
             The book object if found, otherwise None.
         """
         statement = select(BookModel).where(BookModel.uid == book_uid)  # Construct a SQL query to select a book by its UID.
+        if with_reviews:
+            statement = statement.options(selectinload(BookModel.reviews))  # Load the reviews only when the caller needs them.
         result = await session.exec(statement)  # Execute the query.
         book = result.first()  # Get the first result (if any).
         return book if book is not None else None  # Return the book object or None.
 
+    async def get_books(self, book_uids: List[UUID], session: AsyncSession, with_reviews: bool = False):
+        """
+        Retrieve several books by their unique IDs with a single query.
+        Args:
+            book_uids: Unique identifiers of the books, in the order they are wanted.
+            session: Database session (injected via dependency).
+            with_reviews: Whether to return the latest reviews of every book, loaded in a second query (default is False).
+        Returns:
+            Dictionary with the serialized books found, in the order of `book_uids` (without duplicates), and the UIDs that match no book.
+        """
+        book_uids = list(dict.fromkeys(book_uids))  # Drop duplicates, keeping the first occurrence.
+        statement = select(BookModel).where(BookModel.uid.in_(book_uids))
+        books = {book.uid: BookSchema.model_validate(book, from_attributes=True) for book in (await session.exec(statement)).all()}
+        if with_reviews:
+            # One more query for the latest reviews of every book, as in the details of a single book.
+            latest = await review_service.get_latest_reviews(list(books), session, Config.BOOK_DETAIL_REVIEWS)
+            books = {book_uid: self._detail(book, latest.get(book_uid)) for book_uid, book in books.items()}
+        return {
+            "items": [books[book_uid] for book_uid in book_uids if book_uid in books],
+            "missing": [book_uid for book_uid in book_uids if book_uid not in books],
+        }
+
+    async def get_top_books(self, by: str, limit: Optional[int], session: AsyncSession):
+        """
+        Retrieve the best ranked books, from the Redis sorted set of their score.
+        If Redis is unavailable, the books are sorted by the score column instead (a scan of the book table).
+        Args:
+            by: The score ("rating" or "wilson").
+            limit: Number of books (optional, capped by PAGE_SIZE_MAX).
+            session: Database session (injected via dependency).
+        Returns:
+            Dictionary with the score, the books with their scores (best first) and the time of the ranking.
+        """
+        limit = clamp_page_size(limit)
+        try:
+            ranking, computed_at = await book_ranker.top(by, limit)
+        except Exception as e:
+            logging.warning(f"Book ranking unavailable in Redis, sorting the books instead: {e}")
+            column = RANKING_COLUMNS[by]
+            statement = select(BookModel).where(column.is_not(None)).order_by(column.desc(), BookModel.uid).limit(limit)
+            books = (await session.exec(statement)).all()
+            items = [{**BookSchema.model_validate(book, from_attributes=True).model_dump(), "score": getattr(book, column.key)} for book in books]
+            return {"by": by, "items": items, "computed_at": None}
+
+        books = await self.get_books([UUID(book_uid) for book_uid, _ in ranking], session)  # Books deleted since the ranking are left out.
+        scores = {book_uid: score for book_uid, score in ranking}
+        items = [{**book.model_dump(), "score": scores[str(book.uid)]} for book in books["items"]]
+        return {"by": by, "items": items, "computed_at": computed_at}
+
+    async def get_book_detail(self, book_uid: str, session: AsyncSession):
+        """
+        Retrieve a book with its latest reviews, serialized as a BookDetailModel, through the book detail cache.
+        The cache is only filled from the primary: a replica may not have the last write yet, and its stale data would
+        be served to everyone (the writer included) until the entry expires. A miss on a replica session is therefore
+        read from the primary. A user pinned to the primary after a write skips the cache read, so that they always
+        see their write, even if another worker put back an entry read just before it.
+        Args:
+            book_uid: Unique identifier of the book.
+            session: Database session (injected via dependency), on the primary or on a replica.
+        Returns:
+            The serialized book detail if found, otherwise None.
+        """
+        pinned = bool(replica_router.engines) and session.bind is engine  # get_read_session only uses the primary for pinned users.
+        if not pinned:
+            cached = await book_detail_cache.get(book_uid)
+            if cached is not None:
+                return cached
+
+        generation = book_detail_cache.generation(book_uid)  # Taken before the read, see BookDetailCache.set.
+        if session.bind is engine:
+            detail = await self._read_detail(book_uid, session)
+        else:
+            async with async_session_maker() as primary_session:
+                detail = await self._read_detail(book_uid, primary_session)
+        if detail is not None:
+            await book_detail_cache.set(book_uid, detail, generation)
+        return detail
+
+    async def _read_detail(self, book_uid: str, session: AsyncSession) -> Optional[dict]:
+        """ Read a book and its latest reviews from the database, serialized as a BookDetailModel (None if not found). """
+        book = await self.get_book(book_uid, session)
+        if book is None:
+            return None
+        page = await review_service.get_book_reviews(book.uid, session, limit=Config.BOOK_DETAIL_REVIEWS)
+        return self._detail(BookSchema.model_validate(book, from_attributes=True), page).model_dump(mode="json")
+
+    @staticmethod
+    def _detail(book: BookSchema, reviews: Optional[dict]) -> BookDetailModel:
+        """ Combine a serialized book with a page of its latest reviews (None if it has none). """
+        reviews = reviews or {"items": [], "next_cursor": None}
+        return BookDetailModel.model_validate(
+            {**book.model_dump(), "reviews": reviews["items"], "reviews_next_cursor": reviews["next_cursor"]},
+            from_attributes=True,
+        )
+
     async def create_book(self, book_data: BookCreateModel, user_uid: str, session: AsyncSession):
         """
         Create a new book in the database.
@@ -60,13 +201,18 @@ class BookService:
         book_data_dict = book_data.model_dump()  # Convert the book data to a dictionary.
         newbook = BookModel(**book_data_dict)  # Create a new BookModel object.
         newbook.user_uid = UUID(user_uid)  # Set the user UID for the new book.
+        newbook.updated_at = datetime.now()  # Set by the server: the change feed relies on it.
+        newbook.created_at = newbook.created_at or newbook.updated_at
         session.add(newbook)  # Add the new book to the session.
         await session.commit()  # Commit the transaction.
+        fallback_search_index.add(newbook)  # Keep the fallback search index (non-Postgres databases) up to date.
+        await suggest_index.add_book(newbook)  # Offer the new title and author as suggestions.
         return newbook  # Return the newly created book.
 
     async def update_book(self, book_uid: str, update_data: UpdateBookModel, session: AsyncSession):
         """
-        Update details of an existing book by its unique ID.
+        Update details of an existing book by its unique ID, with a single UPDATE ... RETURNING.
+        Only the fields sent by the client are written; `updated_at` is set by the server.
         Args:
             book_uid: Unique identifier of the book to update.
             update_data: Updated book data.
@@ -76,35 +222,103 @@ class BookService:
         Raises:
             HTTPException: If the book with the given ID is not found.
         """
-        book_to_update = await self.get_book(book_uid, session)  # Retrieve the book to update.
+        books = await self._update_where(BookModel.uid == book_uid, update_data, session)
+        if not books:
+            raise HTTPException(status_code=404, detail=f"Book with ID '{book_uid}' not found")  # No row matched: the book does not exist.
+        return books[0]  # Return the updated book.
 
-        if book_to_update is not None:
-            update_data_dict = update_data.model_dump()  # Convert the update data to a dictionary.
-
-            for key, value in update_data_dict.items():
-                if value is not None:
-                    setattr(book_to_update, key, value)  # Update the book's attributes with the new values.
-
-            await session.commit()  # Commit the transaction.
-            await session.refresh(book_to_update)  # Refresh the book instance to include the updated fields.
-            return book_to_update  # Return the updated book.
-        else:
-            raise HTTPException(status_code=404, detail=f"Book with ID '{book_uid}' not found")  # Raise an HTTPException if the book is not found.
+    async def update_books(self, book_uids: List[UUID], update_data: UpdateBookModel, session: AsyncSession):
+        """
+        Apply the same update to several books, with a single UPDATE ... RETURNING.
+        Args:
+            book_uids: Unique identifiers of the books to update.
+            update_data: Updated book data.
+            session: Database session (injected via dependency).
+        Returns:
+            Dictionary with the updated books and the UIDs that matched no book.
+        """
+        books = await self._update_where(BookModel.uid.in_(book_uids), update_data, session)
+        found = {book.uid for book in books}
+        return {"updated": books, "missing": [book_uid for book_uid in dict.fromkeys(book_uids) if book_uid not in found]}
 
     async def delete_book(self, book_uid: str, session: AsyncSession):
         """
-        Delete a book from the database by its unique ID.
+        Delete a book from the database by its unique ID, with a single DELETE ... RETURNING.
         Args:
             book_uid: Unique identifier of the book to delete.
             session: Database session (injected via dependency).
         Returns:
-            The deleted book object if found, otherwise None.
+            The UID of the deleted book if found, otherwise None.
         """
-        book_to_delete = await self.get_book(book_uid, session)  # Retrieve the book to delete.
+        deleted = await self._delete_where(BookModel.uid == book_uid, session)
+        return deleted[0] if deleted else None  # Return None if the book is not found.
 
-        if book_to_delete is not None:
-            await session.delete(book_to_delete)  # Delete the book from the session.
-            await session.commit()  # Commit the transaction.
-            return book_to_delete  # Return the deleted book.
-        else:
-            return None  # Return None if the book is not found.
\ No newline at end of file
+    async def delete_books(self, filters: BookFilterModel, session: AsyncSession):
+        """
+        Delete every book matching a filter, in one transaction.
+        Args:
+            filters: Criteria the books must all match (at least one is required).
+            session: Database session (injected via dependency).
+        Returns:
+            The UIDs of the deleted books.
+        Raises:
+            HTTPException: If no criterion is given.
+        """
+        conditions = []
+        if filters.user_uid is not None:
+            conditions.append(BookModel.user_uid == filters.user_uid)
+        if filters.author is not None:
+            conditions.append(BookModel.author == filters.author)
+        if filters.publisher is not None:
+            conditions.append(BookModel.publisher == filters.publisher)
+        if filters.language is not None:
+            conditions.append(BookModel.language == filters.language)
+        if filters.created_before is not None:
+            conditions.append(BookModel.created_at < filters.created_before)
+        if filters.created_after is not None:
+            conditions.append(BookModel.created_at >= filters.created_after)
+        if not conditions:
+            raise HTTPException(status_code=400, detail="At least one filter is required to delete books")  # Never delete the whole catalog by accident.
+        return await self._delete_where(conditions, session)
+
+    async def _update_where(self, condition, update_data: UpdateBookModel, session: AsyncSession) -> List[BookModel]:
+        """ Update the matching books in one round-trip and return them as written, then refresh the caches and indexes. """
+        values = update_data.model_dump(exclude_unset=True, exclude_none=True)  # Fields left out by the client keep their value (including the language).
+        values["updated_at"] = datetime.now()  # Always bumped, so that the change feed sees the update (same clock as its cutoff).
+        statement = update(BookModel).where(condition).values(**values).returning(BookModel)
+        books = list((await session.exec(statement)).scalars().all())
+        await session.commit()  # Commit the transaction.
+        for book in books:
+            await book_detail_cache.invalidate(str(book.uid))  # Drop the cached details of the book.
+            fallback_search_index.add(book)  # Re-index the updated fields.
+        await suggest_index.add_books(books)  # Replace the suggestions of the books.
+        return books
+
+    async def _delete_where(self, conditions, session: AsyncSession) -> List[UUID]:
+        """
+        Delete the matching books and record their tombstones in one transaction, then refresh the caches and indexes.
+        Their reviews are kept, detached from the book (as the ORM cascade used to do).
+        """
+        conditions = conditions if isinstance(conditions, list) else [conditions]
+        now = datetime.now()
+        await session.exec(
+            update(Review)
+            .where(Review.book_uid.in_(select(BookModel.uid).where(*conditions)))
+            .values(book_uid=None, updated_at=now)  # Bumped, so that the change feed sees the detached reviews.
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.exec(
+            delete(BookModel)
+            .where(*conditions)
+            .returning(BookModel.uid, BookModel.user_uid)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = result.all()
+        session.add_all([BookTombstone(uid=uid, user_uid=user_uid, deleted_at=now) for uid, user_uid in deleted])  # Record the deletions for the change feed, in the same transaction.
+        await session.commit()  # Commit the transaction.
+        book_uids = [uid for uid, _ in deleted]
+        for book_uid in book_uids:
+            await book_detail_cache.invalidate(str(book_uid))  # Drop the cached details of the book.
+            fallback_search_index.remove(book_uid)  # Remove the book from the fallback search index.
+        await suggest_index.remove_books(book_uids)  # Drop the suggestions only these books provided.
+        return book_uids
@@ -0,0 +1,373 @@
+"""
+This file defines the in-memory autocomplete index serving GET /books/suggest.
+Every worker keeps its own index of the book titles and authors, built from the database at startup
+and rebuilt periodically. Writes handled by this worker update it right away and are broadcast over
+Redis pub/sub so the other workers apply them too.
+
+Two structures are kept:
+    - a sorted array of keys (every suffix of words of a suggestion, e.g. "the hobbit" and "hobbit"),
+      searched with bisect for exact prefix matches;
+    - trigram postings of the distinct words, used to find close words (typos) when the prefix
+      matches too few suggestions.
+"""
+
+import sys  # Import sys for estimating the memory used by the index.
+import json  # Import json for the update messages broadcast to the other workers.
+import time  # Import time for timing the rebuilds.
+import asyncio  # Import asyncio for the periodic rebuild task.
+import bisect  # Import bisect for searching the sorted array of keys.
+import logging  # Import logging module for logging errors and information.
+from typing import Dict, Iterable, List, Optional, Set, Tuple  # Import typing utilities for type annotations.
+from sqlmodel import select  # Import select for building SQL queries.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.db.models import BookModel  # Import the BookModel from the database models.
+from src.db.redis import get_redis, subscriber  # Import the shared Redis client and pub/sub listener.
+from src.books.search import tokenize  # Import the tokenizer shared with the full-text search.
+
+# Channel announcing added, updated and deleted books to every worker
+SUGGEST_UPDATE_CHANNEL = "books:suggest"
+
+# Fields offered as suggestions
+SUGGEST_FIELDS = ("title", "author")
+
+# Maximum number of keys read for one prefix, so that short prefixes stay fast on large catalogs
+MAX_PREFIX_SCAN = 1000
+
+
+def normalize(text: Optional[str]) -> str:
+    """ Lowercase a text and keep only its words, separated by single spaces. """
+    return " ".join(tokenize(text))
+
+
+def trigrams(word: str, complete: bool = True) -> Set[str]:
+    """
+    Return the trigrams of a word, padded with two spaces in front and, for complete words, one at the end.
+    Args:
+        word: A normalized word.
+        complete: False for a prefix typed by the user, whose end is unknown.
+    """
+    padded = f"  {word} " if complete else f"  {word}"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Suggestion:
+    """ One suggested text (a title or an author) and the number of books it comes from. """
+    __slots__ = ("text", "book_count")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.book_count = 0
+
+
+class _IndexState:
+    """ The data of one version of the index; rebuilds fill a new state and swap it in. """
+
+    def __init__(self) -> None:
+        self.suggestions: Dict[Tuple[str, str], _Suggestion] = {}  # (field, normalized text) -> suggestion
+        self.keys: List[str] = []  # Sorted word suffixes of the suggestions ("the hobbit", "hobbit").
+        self.key_ids: List[Tuple[str, str]] = []  # Suggestion of every key, in the same order.
+        self.words: Dict[str, Set[Tuple[str, str]]] = {}  # word -> suggestions containing it
+        self.trigrams: Dict[str, Set[str]] = {}  # trigram -> words containing it
+        self.books: Dict[str, List[Tuple[str, str]]] = {}  # book UID -> suggestions
+
+    def add_book(self, book_uid: str, values: Dict[str, Optional[str]], insort: bool = True) -> None:
+        """ Index a book; bulk loads pass `insort=False` and call `sort()` once at the end. """
+        self.remove_book(book_uid)
+        ids = []
+        for field in SUGGEST_FIELDS:
+            normalized = normalize(values.get(field))
+            if not normalized:
+                continue
+            suggestion_id = (field, normalized)
+            suggestion = self.suggestions.get(suggestion_id)
+            if suggestion is None:
+                suggestion = self.suggestions[suggestion_id] = _Suggestion(values[field].strip())
+                self._link(suggestion_id, insort=insort)
+            suggestion.book_count += 1
+            ids.append(suggestion_id)
+        if ids:
+            self.books[book_uid] = ids
+
+    def remove_book(self, book_uid: str) -> None:
+        for suggestion_id in self.books.pop(book_uid, []):
+            suggestion = self.suggestions.get(suggestion_id)
+            if suggestion is None:
+                continue
+            suggestion.book_count -= 1
+            if not suggestion.book_count:
+                del self.suggestions[suggestion_id]
+                self._unlink(suggestion_id)
+
+    def sort(self) -> None:
+        """ Sort the keys after a bulk load done with `insort=False`. """
+        order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self.keys = [self.keys[i] for i in order]
+        self.key_ids = [self.key_ids[i] for i in order]
+
+    @staticmethod
+    def _keys_of(normalized: str) -> List[str]:
+        words = normalized.split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    def _link(self, suggestion_id: Tuple[str, str], insort: bool) -> None:
+        for key in self._keys_of(suggestion_id[1]):
+            if insort:
+                index = bisect.bisect_right(self.keys, key)
+                self.keys.insert(index, key)
+                self.key_ids.insert(index, suggestion_id)
+            else:
+                self.keys.append(key)
+                self.key_ids.append(suggestion_id)
+        for word in set(suggestion_id[1].split(" ")):
+            postings = self.words.get(word)
+            if postings is None:
+                postings = self.words[word] = set()
+                for trigram in trigrams(word):
+                    self.trigrams.setdefault(trigram, set()).add(word)
+            postings.add(suggestion_id)
+
+    def _unlink(self, suggestion_id: Tuple[str, str]) -> None:
+        for key in self._keys_of(suggestion_id[1]):
+            index = bisect.bisect_left(self.keys, key)
+            while index < len(self.keys) and self.keys[index] == key:
+                if self.key_ids[index] == suggestion_id:
+                    del self.keys[index]
+                    del self.key_ids[index]
+                    break
+                index += 1
+        for word in set(suggestion_id[1].split(" ")):
+            postings = self.words.get(word)
+            if postings is None:
+                continue
+            postings.discard(suggestion_id)
+            if postings:
+                continue
+            del self.words[word]  # Last suggestion using the word: drop it from the trigram postings.
+            for trigram in trigrams(word):
+                words = self.trigrams.get(trigram)
+                if words is not None:
+                    words.discard(word)
+                    if not words:
+                        del self.trigrams[trigram]
+
+
+class SuggestIndex:
+    """
+    Per-worker autocomplete index of book titles and authors.
+    """
+
+    def __init__(self, rebuild_seconds: float, min_similarity: float, enabled: bool = True) -> None:
+        self.rebuild_seconds = rebuild_seconds
+        self.min_similarity = min_similarity
+        self.enabled = enabled
+        self.ready = False
+        self.last_rebuild_at: Optional[float] = None
+        self.last_rebuild_ms: Optional[float] = None
+        self._state = _IndexState()
+        self._pending: Optional[List[Tuple[str, Optional[dict]]]] = None  # Updates received during a rebuild.
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------------- Building ----------------
+    async def rebuild(self, session_maker) -> None:
+        """
+        Build a new index from the book table and swap it in. Updates received meanwhile are replayed on it.
+        Args:
+            session_maker: Factory of the session used to read the books.
+        """
+        started = time.perf_counter()
+        self._pending = []
+        try:
+            async with session_maker() as session:
+                result = await session.exec(select(BookModel.uid, BookModel.title, BookModel.author))
+                rows = result.all()
+            state = await asyncio.to_thread(self._build, rows)  # Keep the event loop responsive on large catalogs.
+            for book_uid, values in self._pending:
+                if values is None:
+                    state.remove_book(book_uid)
+                else:
+                    state.add_book(book_uid, values)
+            self._state = state
+            self.ready = True
+        finally:
+            self._pending = None
+        self.last_rebuild_at = time.time()
+        self.last_rebuild_ms = (time.perf_counter() - started) * 1000
+        logging.info(f"Suggest index rebuilt: {len(self._state.suggestions)} suggestions in {self.last_rebuild_ms:.0f} ms.")
+
+    @staticmethod
+    def _build(rows: Iterable) -> _IndexState:
+        state = _IndexState()
+        for book_uid, title, author in rows:
+            state.add_book(str(book_uid), {"title": title, "author": author}, insort=False)
+        state.sort()
+        return state
+
+    def start(self, session_maker) -> None:
+        """ Start the periodic rebuild task. """
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run(session_maker))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, session_maker) -> None:
+        while True:
+            await asyncio.sleep(self.rebuild_seconds)
+            try:
+                await self.rebuild(session_maker)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Suggest index rebuild failed: {e}")
+
+    # ---------------- Incremental updates ----------------
+    def _apply(self, book_uid: str, values: Optional[dict]) -> None:
+        if values is None:
+            self._state.remove_book(book_uid)
+        else:
+            self._state.add_book(book_uid, values)
+        if self._pending is not None:
+            self._pending.append((book_uid, values))
+
+    async def _publish(self, updates: List[Tuple[str, Optional[dict]]]) -> None:
+        try:
+            await get_redis().publish(SUGGEST_UPDATE_CHANNEL, json.dumps({"updates": updates}))
+        except Exception as e:
+            logging.warning(f"Could not broadcast {len(updates)} suggest index update(s): {e}")
+
+    async def add_books(self, books: Iterable) -> None:
+        """ Index new or updated books here and on the other workers, with a single broadcast. """
+        if not self.enabled:
+            return
+        updates = [(str(book.uid), {field: getattr(book, field) for field in SUGGEST_FIELDS}) for book in books]
+        for book_uid, values in updates:
+            self._apply(book_uid, values)
+        if updates:
+            await self._publish(updates)
+
+    async def add_book(self, book: BookModel) -> None:
+        """ Index a new or updated book here and on the other workers. """
+        await self.add_books([book])
+
+    async def remove_books(self, book_uids: Iterable) -> None:
+        """ Remove deleted books here and on the other workers, with a single broadcast. """
+        if not self.enabled:
+            return
+        updates = [(str(book_uid), None) for book_uid in book_uids]
+        for book_uid, values in updates:
+            self._apply(book_uid, values)
+        if updates:
+            await self._publish(updates)
+
+    async def remove_book(self, book_uid) -> None:
+        """ Remove a deleted book here and on the other workers. """
+        await self.remove_books([book_uid])
+
+    async def on_update_message(self, data: str) -> None:
+        for book_uid, values in json.loads(data)["updates"]:
+            self._apply(book_uid, values)
+
+    # ---------------- Queries ----------------
+    def suggest(self, prefix: str, limit: int) -> List[dict]:
+        """
+        Suggest titles and authors for what the user typed.
+        Exact prefix matches come first (most books first), then close matches found with trigrams.
+        Args:
+            prefix: The text typed so far.
+            limit: Maximum number of suggestions.
+        Returns:
+            A list of {"text", "field", "book_count"} dictionaries.
+        """
+        state = self._state
+        query = normalize(prefix)
+        if not query:
+            return []
+
+        matches: Dict[Tuple[str, str], float] = {}
+        index = bisect.bisect_left(state.keys, query)
+        end = min(len(state.keys), index + MAX_PREFIX_SCAN)
+        while index < end and state.keys[index].startswith(query):
+            matches[state.key_ids[index]] = 2.0  # Exact prefix matches rank above any close match.
+            index += 1
+
+        if len(matches) < limit:
+            matches.update({
+                suggestion_id: score for suggestion_id, score in self._close_matches(state, query).items()
+                if suggestion_id not in matches
+            })
+
+        ranked = sorted(
+            matches,
+            key=lambda suggestion_id: (-matches[suggestion_id], -state.suggestions[suggestion_id].book_count, suggestion_id[1]),
+        )
+        return [
+            {
+                "text": state.suggestions[suggestion_id].text,
+                "field": suggestion_id[0],
+                "book_count": state.suggestions[suggestion_id].book_count,
+            }
+            for suggestion_id in ranked[:limit]
+        ]
+
+    def _close_matches(self, state: _IndexState, query: str) -> Dict[Tuple[str, str], float]:
+        """ Suggestions with a word sharing enough trigrams with the last word typed, scored by the share of matched trigrams. """
+        typed = query.split(" ")
+        last = typed[-1]
+        if len(last) < 3:
+            return {}  # Too short to tell a typo from another word.
+        wanted = trigrams(last, complete=False)
+        counts: Dict[str, int] = {}
+        for trigram in wanted:
+            for word in state.trigrams.get(trigram, ()):
+                counts[word] = counts.get(word, 0) + 1
+
+        close_words = sorted(
+            ((count / len(wanted), word) for word, count in counts.items() if count / len(wanted) >= self.min_similarity),
+            reverse=True,
+        )
+        others = typed[:-1]  # Words typed before the last one must appear as they are.
+        scores: Dict[Tuple[str, str], float] = {}
+        for similarity, word in close_words:
+            for suggestion_id in state.words[word]:
+                if suggestion_id not in scores and all(other in state.words and suggestion_id in state.words[other] for other in others):
+                    scores[suggestion_id] = similarity
+            if len(scores) >= MAX_PREFIX_SCAN:
+                break
+        return scores
+
+    def stats(self) -> dict:
+        """ Size and approximate memory use of the index (walks the whole index). """
+        state = self._state
+        memory = sys.getsizeof(state.keys) + sys.getsizeof(state.key_ids) + sum(sys.getsizeof(key) for key in state.keys)
+        memory += sys.getsizeof(state.words) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in state.words.items())
+        memory += sys.getsizeof(state.trigrams) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in state.trigrams.items())
+        memory += sys.getsizeof(state.suggestions) + sum(
+            sys.getsizeof(i) + sys.getsizeof(s) + sys.getsizeof(s.text) for i, s in state.suggestions.items()
+        )
+        memory += sys.getsizeof(state.books) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in state.books.items())
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "books": len(state.books),
+            "suggestions": len(state.suggestions),
+            "keys": len(state.keys),
+            "words": len(state.words),
+            "trigrams": len(state.trigrams),
+            "memory_bytes": memory,
+            "last_rebuild_at": self.last_rebuild_at,
+            "last_rebuild_ms": self.last_rebuild_ms,
+        }
+
+suggest_index = SuggestIndex(
+    Config.SUGGEST_REBUILD_SECONDS,
+    Config.SUGGEST_MIN_SIMILARITY,
+    enabled=Config.SUGGEST_ENABLED,
+)
+if suggest_index.enabled:
+    subscriber.subscribe(SUGGEST_UPDATE_CHANNEL, suggest_index.on_update_message)
@@ -0,0 +1,135 @@
+"""
+This file defines the command line interface used to run maintenance tasks against the database.
+Run it from the project root, with the same environment (.env) as the application:
+
+    python -m src.cli reconcile-ratings [--batch-size 1000]
+    python -m src.cli rank-books [--batch-size 50000]
+    python -m src.cli import-books books.csv [--format csv] [--user-uid UID] [--batch-size 1000]
+    python -m src.cli export books [--format csv] [--user-uid UID] [--updated-since 2025-01-01] [--gzip] [-o books.csv.gz]
+"""
+
+import asyncio  # Import asyncio for running the asynchronous commands.
+import sys  # Import sys for writing exports to the standard output.
+import argparse  # Import argparse for parsing the command line.
+from datetime import datetime  # Import datetime for parsing the export filters.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.db.main import engine, async_session_maker  # Import the database engine and session factory.
+from src.books.ratings import reconcile_rating_aggregates  # Import the rating aggregates reconciliation.
+from src.books.cache import book_detail_cache  # Import the book detail cache, to drop the corrected books.
+from src.books.ranking import book_ranker  # Import the ranking of the books.
+from src.books.bulk import import_books as run_import, export_rows, IMPORT_FORMATS, EXPORT_RESOURCES  # Import the streaming bulk import and export.
+from src.db.redis import close_redis  # Import close_redis for releasing the Redis connections.
+
+
+async def reconcile_ratings(args: argparse.Namespace) -> None:
+    """ Recompute the rating aggregates of every book from its reviews. """
+    async with async_session_maker() as session:
+        corrected = await reconcile_rating_aggregates(session, batch_size=args.batch_size)
+    for book_uid in corrected:
+        await book_detail_cache.invalidate(book_uid)
+    print(f"{len(corrected)} book(s) corrected.")
+
+
+async def rank_books(args: argparse.Namespace) -> None:
+    """ Rank the books now, without waiting for the periodic job. """
+    book_ranker.batch_size = args.batch_size
+    summary = await book_ranker.rank(async_session_maker)
+    print(f"{summary['books']} book(s) read, {summary['reviewed']} reviewed, {summary['written']} score(s) written "
+          f"in {summary['elapsed_ms']:.0f} ms (mean rating {summary['prior_mean']:.3f}).")
+
+
+async def read_file(path: str, chunk_size: int = 64 * 1024):
+    """ Read a file in chunks without blocking the event loop. """
+    with open(path, "rb") as file:
+        while True:
+            chunk = await asyncio.to_thread(file.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def import_books(args: argparse.Namespace) -> None:
+    """ Import books from an NDJSON or CSV file, printing the progress after every batch. """
+    input_format = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    report = await run_import(
+        async_session_maker,
+        read_file(args.path),
+        input_format,
+        args.user_uid,
+        batch_size=args.batch_size,
+        max_errors=Config.BULK_IMPORT_MAX_ERRORS,
+        on_progress=lambda progress: print(f"{progress['rows']} rows read, {progress['inserted']} inserted, {progress['failed']} failed"),
+    )
+    for error in report["errors"]:
+        print(f"line {error['line']}: {error['errors']}")
+    if report["errors_truncated"]:
+        print(f"... {report['failed'] - len(report['errors'])} more failed row(s).")
+    print(f"Done: {report['inserted']} of {report['rows']} row(s) imported.")
+
+
+async def export(args: argparse.Namespace) -> None:
+    """ Export books or reviews to a file, or to the standard output. """
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        async for chunk in export_rows(
+            async_session_maker,
+            args.resource,
+            args.format,
+            user_uid=args.user_uid,
+            updated_since=args.updated_since,
+            compress=args.gzip,
+            batch_size=Config.EXPORT_BATCH_SIZE,
+        ):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """ Build the parser of the command line, one sub-command per task. """
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Bookie maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = commands.add_parser("reconcile-ratings", help="Backfill or repair the rating aggregates of the books.")
+    reconcile.add_argument("--batch-size", type=int, default=1000, help="Number of books updated per transaction.")
+    reconcile.set_defaults(handler=reconcile_ratings)
+
+    ranker = commands.add_parser("rank-books", help="Compute the book ranking of GET /api/v1/books/top now.")
+    ranker.add_argument("--batch-size", type=int, default=Config.RANKING_BATCH_SIZE, help="Number of books scored per chunk.")
+    ranker.set_defaults(handler=rank_books)
+
+    importer = commands.add_parser("import-books", help="Import books from an NDJSON or CSV file.")
+    importer.add_argument("path", help="File to import; CSV files need a header row naming the book fields.")
+    importer.add_argument("--format", choices=IMPORT_FORMATS, help="Input format (default: from the file extension).")
+    importer.add_argument("--user-uid", help="UID of the user the books are attributed to.")
+    importer.add_argument("--batch-size", type=int, default=Config.BULK_IMPORT_BATCH_SIZE, help="Number of books per INSERT and transaction.")
+    importer.set_defaults(handler=import_books)
+
+    exporter = commands.add_parser("export", help="Export books or reviews as NDJSON or CSV.")
+    exporter.add_argument("resource", choices=list(EXPORT_RESOURCES), help="Table to export.")
+    exporter.add_argument("--format", choices=IMPORT_FORMATS, default="ndjson", help="Output format.")
+    exporter.add_argument("--user-uid", help="Only export the rows of this user.")
+    exporter.add_argument("--updated-since", type=datetime.fromisoformat, help="Only export the rows updated at or after this time (ISO 8601).")
+    exporter.add_argument("--gzip", action="store_true", help="Gzip the output.")
+    exporter.add_argument("-o", "--output", help="Output file (default: standard output).")
+    exporter.set_defaults(handler=export)
+
+    return parser
+
+
+async def run(args: argparse.Namespace) -> None:
+    try:
+        await args.handler(args)
+    finally:
+        await close_redis()
+        await engine.dispose()
+
+
+def main(argv=None) -> None:
+    args = build_parser().parse_args(argv)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,12 @@ This file is responsible for loading and managing environment variables using Py
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from dotenv import load_dotenv
-import os
+import sys
 from pydantic import ValidationError
 
-# Load environment variables from the .env file into the environment
+# Load environment variables from the .env file into the environment.
+# Nothing is printed here: the connection URLs hold credentials, and the standard output carries the exports of src.cli.
 load_dotenv()
-print("Loaded DATABASE_URL from dotenv:", os.getenv("DATABASE_URL"))
-print(os.environ.get('DATABASE_URL'))
 
 class Settings(BaseSettings):
     """
@@ -19,10 +18,65 @@ class Settings(BaseSettings):
     """
 
     DATABASE_URL: str  # The database connection URL (required).
+    DATABASE_REPLICA_URLS: str = ""  # Comma-separated connection URLs of read replicas (optional, reads use the primary when empty).
+    DATABASE_REPLICA_STRATEGY: str = "round_robin"  # How read sessions pick a replica: "round_robin" or "least_connections".
+    DATABASE_REPLICA_PIN_SECONDS: float = 5.0  # After a write, the user's reads stay on the primary this long (read-your-writes).
+    DB_ECHO: bool = False  # Log every SQL statement (slow, for debugging only).
+    DB_POOL_SIZE: int = 5  # Connections kept open per worker (size this times the number of workers against max_connections).
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under load on top of DB_POOL_SIZE.
+    DB_POOL_TIMEOUT: float = 30.0  # Seconds a request waits for a free connection before failing.
+    DB_POOL_RECYCLE: int = 1800  # Seconds after which a connection is replaced, to survive server-side idle timeouts.
+    DB_POOL_PRE_PING: bool = True  # Test connections on checkout so that dropped ones are replaced transparently.
     JWT_SECRET: str  # The secret key for JWT token generation (required).
     JWT_ALGORITHM: str  # The algorithm used for JWT (e.g., "HS256") (required).
+    BCRYPT_ROUNDS: int = 12  # bcrypt cost factor; existing hashes are rehashed on the next successful login when it changes.
+    PASSWORD_HASH_WORKERS: int = 4  # Threads dedicated to bcrypt hashing and verification per worker.
+    PASSWORD_HASH_MAX_QUEUE: int = 64  # Hashing jobs allowed to wait for a thread before new ones are rejected with 503.
     REDIS_HOST: str = "localhost"  # Redis server hostname (optional, defaults to "localhost").
     REDIS_PORT: int = 6379  # Redis server port (optional, defaults to 6379).
+    REDIS_MAX_CONNECTIONS: int = 50  # Maximum number of pooled Redis connections per worker.
+    REDIS_SOCKET_TIMEOUT: float = 1.0  # Seconds to wait for a Redis reply before failing.
+    REDIS_CONNECT_TIMEOUT: float = 1.0  # Seconds to wait while opening a Redis connection.
+    REDIS_BLOCKLIST_BATCH_WINDOW_MS: float = 2.0  # Concurrent blocklist checks within this window share one pipelined round-trip (0 disables batching).
+    REDIS_BLOCKLIST_MAX_BATCH: int = 256  # A batch is sent immediately once it holds this many distinct JTIs.
+    REVOCATION_CACHE_ENABLED: bool = True  # Answer blocklist checks from an in-process copy of the revoked JTIs, kept current over Redis pub/sub.
+    REVOCATION_CACHE_MAX_SIZE: int = 100_000  # Above this many revoked JTIs the local copy is dropped and checks go to Redis again.
+    REVOCATION_CACHE_RESYNC_SECONDS: int = 300  # Full resync interval of the local copy, bounding staleness if a pub/sub message is lost.
+    PAGE_SIZE_DEFAULT: int = 20  # Number of items returned by list endpoints when no limit is given.
+    PAGE_SIZE_MAX: int = 100  # Server-side upper bound for the page size requested by clients.
+    DB_CREATE_ALL: bool = False  # Create the missing tables from the models at startup (local development only; the schema is managed by Alembic).
+    DB_RAISE_ON_LAZY_LOAD: bool = False  # Raise instead of logging when a relationship is lazy loaded without a loader option (enable in tests to catch N+1 queries).
+
+    BOOK_CACHE_ENABLED: bool = True  # Serve GET /books/{book_uid} from the in-process LRU and Redis caches.
+    BOOK_CACHE_MAX_ENTRIES: int = 1024  # Book details kept in the in-process LRU of each worker.
+    BOOK_CACHE_LOCAL_TTL_SECONDS: float = 30.0  # Lifetime of an entry in the in-process LRU.
+    BOOK_CACHE_REDIS_TTL_SECONDS: int = 300  # Lifetime of an entry in the shared Redis cache.
+    SUGGEST_ENABLED: bool = True  # Build the in-memory autocomplete index served by GET /books/suggest.
+    SUGGEST_REBUILD_SECONDS: float = 900.0  # Interval between two full rebuilds of the autocomplete index.
+    SUGGEST_MIN_SIMILARITY: float = 0.5  # Share of trigrams a close (misspelled) match must have in common with the typed word.
+    SUGGEST_MAX_RESULTS: int = 20  # Maximum number of suggestions returned per request.
+    BULK_IMPORT_BATCH_SIZE: int = 1000  # Books inserted per multi-row INSERT (and transaction) by the bulk import.
+    BULK_IMPORT_MAX_BATCH_SIZE: int = 10000  # Upper bound of the batch size a client can request.
+    BULK_IMPORT_MAX_ERRORS: int = 1000  # Row errors listed in an import report; further errors are only counted.
+    BOOK_BATCH_MAX_UIDS: int = 500  # Maximum number of UIDs accepted by POST /books/batch.
+    BOOK_DETAIL_REVIEWS: int = 10  # Number of latest reviews embedded in the details of a book; the rest are paginated.
+    BULK_UPDATE_MAX_BOOKS: int = 1000  # Maximum number of UIDs accepted by PATCH /books.
+    EXPORT_BATCH_SIZE: int = 1000  # Rows fetched per round-trip from the server-side cursor of an export.
+    REVIEW_INGEST_ENABLED: bool = False  # Queue new reviews in a Redis stream and write them in batches (POST /reviews answers 202).
+    REVIEW_INGEST_STREAM: str = "reviews:ingest"  # Redis stream holding the reviews waiting to be written.
+    REVIEW_INGEST_BATCH_SIZE: int = 500  # Maximum number of reviews written per transaction.
+    REVIEW_INGEST_FLUSH_MS: int = 50  # Maximum time a flusher waits to fill a batch; keep it below REDIS_SOCKET_TIMEOUT.
+    REVIEW_INGEST_MAX_QUEUED: int = 100_000  # Reviews waiting in the stream above which new ones are refused with a 503.
+    REVIEW_INGEST_CLAIM_IDLE_MS: int = 30_000  # Reviews left unacknowledged this long by a (crashed) worker are taken over by another one.
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86_400  # How long the response of a request with an Idempotency-Key is replayed to its retries.
+    IDEMPOTENCY_LOCK_SECONDS: int = 30  # How long a retry is answered 409 while the first request with its key runs (or after it crashed).
+    RANKING_ENABLED: bool = True  # Whether the workers recompute the book ranking of GET /books/top periodically (needs NumPy).
+    RANKING_INTERVAL_SECONDS: int = 600  # Interval between two rankings, run by one worker at a time.
+    RANKING_BATCH_SIZE: int = 50_000  # Number of books read and scored per chunk (and per update transaction).
+    RANKING_PRIOR_REVIEWS: float = 10.0  # Weight of the mean rating in the Bayesian average, in reviews.
+    RANKING_POSITIVE_RATING: int = 3  # Lowest rating counted as positive by the Wilson score.
+    RANKING_TOP_SIZE: int = 1000  # Number of top books kept in Redis for every score.
+    CHANGES_SAFETY_LAG_SECONDS: float = 5.0  # GET /books/changes holds back rows younger than this, longer than any write transaction.
 
     # Pydantic-specific configuration
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")  
@@ -34,8 +88,5 @@ try:
     Config = Settings()  # type: ignore # Create an instance of the Settings class to load variables.
 except ValidationError as e:
     # Handle cases where required environment variables are missing or invalid
-    print(f"Error loading settings: {e}")
-    exit(1)  # Exit the application if configuration fails.
-
-# Debug prints to confirm the settings are loaded correctly
-print(Config.DATABASE_URL)
\ No newline at end of file
+    print(f"Error loading settings: {e}", file=sys.stderr)
+    exit(1)  # Exit the application if configuration fails.
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+This file defines the Redis store behind the `Idempotency-Key` request header.
+
+A client that retries a request (e.g. after a timeout) sends the same key again. The first request with a key
+claims it; once it succeeds, its response is stored under the key for IDEMPOTENCY_KEY_TTL_SECONDS and every
+retry gets that response back instead of running the request again. A retry arriving while the first request
+is still running is answered 409. A key reused for a different request is refused with 422.
+A failed request releases its key, so that it can be retried with the same key.
+
+Keys are scoped per user, so two users can never see each other's responses.
+If Redis is unavailable, requests run without idempotency rather than failing.
+"""
+
+import json  # Import json for encoding the stored responses.
+import hashlib  # Import hashlib for fingerprinting the requests.
+import logging  # Import logging module for logging errors and information.
+from typing import Any, Optional  # Import typing utilities for type annotations.
+from fastapi import HTTPException, status  # Import HTTPException and status codes for the conflicting requests.
+from src.db.redis import get_redis  # Import get_redis for the shared Redis client.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """
+    Fingerprint the parts of a request that a retry must repeat identically (path parameters, body, ...).
+    Args:
+        parts: JSON serializable values.
+    Returns:
+        The hexadecimal SHA-256 of the parts.
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Claims, stored responses and releases of idempotency keys, in Redis.
+    """
+
+    def __init__(self, prefix: str, ttl_seconds: int, lock_seconds: int) -> None:
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds  # A claim left by a crashed request expires after this.
+
+    def _key(self, scope: str, key: str) -> str:
+        return f"{self.prefix}:{scope}:{key}"
+
+    async def begin(self, scope: str, key: str, fingerprint: str) -> Optional[dict]:
+        """
+        Claim a key before running the request.
+        Args:
+            scope: Owner of the key (the user UID).
+            key: Value of the Idempotency-Key header.
+            fingerprint: Fingerprint of the request (see `request_fingerprint`).
+        Returns:
+            None if the request must run, or the stored response (`status_code` and `body`) of the first request.
+        Raises:
+            HTTPException: 409 if the first request is still running, 422 if the key was used for another request.
+        """
+        try:
+            redis = get_redis()
+            claim = json.dumps({"fingerprint": fingerprint, "state": "running"})
+            if await redis.set(self._key(scope, key), claim, nx=True, ex=self.lock_seconds):
+                return None
+            raw = await redis.get(self._key(scope, key))
+        except Exception as e:
+            logging.warning(f"Idempotency keys unavailable, running the request anyway: {e}")
+            return None
+
+        if raw is None:  # Released or expired since the SET: the first request failed, let the client retry.
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A request with this Idempotency-Key just failed, please retry", headers={"Retry-After": "1"})
+        record = json.loads(raw)
+        if record["fingerprint"] != fingerprint:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="This Idempotency-Key was used for another request")
+        if record["state"] == "running":
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A request with this Idempotency-Key is in progress", headers={"Retry-After": "1"})
+        return record
+
+    async def complete(self, scope: str, key: str, fingerprint: str, status_code: int, body: Any) -> None:
+        """ Store the response of a successful request under its key. """
+        record = json.dumps({"fingerprint": fingerprint, "state": "done", "status_code": status_code, "body": body})
+        try:
+            await get_redis().set(self._key(scope, key), record, ex=self.ttl_seconds)
+        except Exception as e:
+            logging.warning(f"Idempotency key {key} not stored: {e}")
+
+    async def release(self, scope: str, key: str) -> None:
+        """ Forget the claim of a failed request, so that it can be retried with the same key. """
+        try:
+            await get_redis().delete(self._key(scope, key))
+        except Exception as e:
+            logging.warning(f"Idempotency key {key} not released: {e}")
+
+
+# Shared instance
+idempotency_store = IdempotencyStore("idempotency", Config.IDEMPOTENCY_KEY_TTL_SECONDS, Config.IDEMPOTENCY_LOCK_SECONDS)
@@ -0,0 +1,49 @@
+"""
+This file defines the generator of the primary keys of the tables: time-ordered UUIDs (version 7, RFC 9562).
+
+A UUIDv7 starts with the Unix time in milliseconds, so new rows land at the right end of the primary key
+index instead of at random places: inserts touch a few hot pages, and the index stays compact.
+The rest of the UUID is random, except for a counter that keeps the UUIDs generated by this process
+strictly increasing, even within the same millisecond or if the clock goes back.
+
+UUIDv7 values are ordinary UUIDs: they are stored in the same columns as the existing (version 4) ones.
+"""
+
+import os  # Import os for the random bits.
+import time  # Import time for the timestamp.
+import uuid  # Import the uuid module for building the UUIDs.
+import threading  # Import threading for keeping the counter consistent across threads.
+
+_COUNTER_BITS = 42  # The 12 bits of rand_a and the top 30 bits of rand_b.
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Generate a time-ordered UUID (version 7).
+    Returns:
+        A UUID greater than every UUID previously generated by this process.
+    """
+    global _last_ms, _counter
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms = now_ms
+            _counter = int.from_bytes(os.urandom(6), "big") >> (48 - _COUNTER_BITS + 1)  # Random start, leaving room to count.
+        else:
+            _counter += 1  # Same millisecond (or the clock went back): keep counting from the last UUID.
+            if _counter >> _COUNTER_BITS:
+                _last_ms += 1  # Counter exhausted: borrow the next millisecond.
+                _counter = 0
+        timestamp, counter = _last_ms, _counter
+
+    value = (timestamp & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76  # Version.
+    value |= (counter >> 30) << 64  # rand_a: top 12 bits of the counter.
+    value |= 0b10 << 62  # Variant (RFC 9562).
+    value |= (counter & 0x3FFF_FFFF) << 32  # Top of rand_b: low 30 bits of the counter.
+    value |= int.from_bytes(os.urandom(4), "big")  # Rest of rand_b: random.
+    return uuid.UUID(int=value)
+
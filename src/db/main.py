@@ -7,12 +7,184 @@ These functions ensure that the application can interact with the database effic
 from sqlmodel.ext.asyncio.session import AsyncSession  # Import the AsyncSession class for asynchronous database sessions.
 from sqlalchemy.ext.asyncio import create_async_engine  # Import create_async_engine for creating an asynchronous database engine.
 from sqlalchemy.ext.asyncio import async_sessionmaker  # Import async_sessionmaker for creating asynchronous session makers.
-from typing import AsyncGenerator  # Import AsyncGenerator for type annotations.
+import time  # Import time for measuring how long requests wait for a connection.
+import json  # Import json for encoding primary pin messages.
+import itertools  # Import itertools for round-robin replica selection.
+import logging  # Import logging module for logging errors and information.
+from typing import AsyncGenerator, Dict, List, Optional  # Import typing utilities for type annotations.
+from fastapi import Request  # Import Request to read the verified token of the current request.
+from sqlalchemy import event, exc  # Import event for registering ORM event listeners and exc for pool timeouts.
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # Import the default async connection pool to instrument it.
+from sqlalchemy.orm import Session, ORMExecuteState  # Import Session and ORMExecuteState for the lazy load detector.
 from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.errors import UnplannedLazyLoad  # Import the error raised on unplanned lazy loads.
+from src.db.redis import get_redis, subscriber  # Import the shared Redis client and pub/sub listener for primary pins.
 from sqlmodel import SQLModel  # Import SQLModel for handling SQLAlchemy models.
 
+class PoolStats:
+    """
+    Counters kept by InstrumentedQueuePool about connection checkouts.
+    """
+    def __init__(self) -> None:
+        self.checkouts = 0  # Number of connections handed out.
+        self.timeouts = 0  # Number of checkouts that gave up after DB_POOL_TIMEOUT.
+        self.wait_time_total = 0.0  # Total seconds spent waiting for a connection.
+        self.wait_time_max = 0.0  # Longest wait for a connection, in seconds.
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool measuring how long checkouts wait and how often they time out.
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+            self.stats.checkouts += 1
+            return connection
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.stats.wait_time_total += waited
+            self.stats.wait_time_max = max(self.stats.wait_time_max, waited)
+
+def create_engine_from_url(url: str):
+    """
+    Create an asynchronous database engine with the pool settings from the configuration.
+    SQLite (used in tests) keeps SQLAlchemy's default pool.
+    Args:
+        url: The database connection URL.
+    Returns:
+        The AsyncEngine.
+    """
+    options = {"echo": Config.DB_ECHO, "future": True}  # echo is used for logging
+    if not url.startswith("sqlite"):
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=Config.DB_POOL_SIZE,
+            max_overflow=Config.DB_MAX_OVERFLOW,
+            pool_timeout=Config.DB_POOL_TIMEOUT,
+            pool_recycle=Config.DB_POOL_RECYCLE,
+            pool_pre_ping=Config.DB_POOL_PRE_PING,
+        )
+    return create_async_engine(url=url, **options)
+
+def get_pool_stats(engine) -> dict:
+    """
+    Describe the state of the connection pool of an engine.
+    Args:
+        engine: The AsyncEngine to inspect.
+    Returns:
+        Dictionary with the pool size, checked out and overflow connections, and the checkout counters.
+    """
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    pool_stats = getattr(pool, "stats", None)
+    if pool_stats is not None:
+        attempts = pool_stats.checkouts + pool_stats.timeouts
+        stats.update(
+            checkouts=pool_stats.checkouts,
+            timeouts=pool_stats.timeouts,
+            wait_time_avg_ms=round(1000 * pool_stats.wait_time_total / attempts, 3) if attempts else 0.0,
+            wait_time_max_ms=round(1000 * pool_stats.wait_time_max, 3),
+        )
+    return stats
+
 # Create an asynchronous database engine using the database URL from the configuration
-engine = create_async_engine(url=Config.DATABASE_URL, echo=True, future=True)  # echo is used for logging
+engine = create_engine_from_url(Config.DATABASE_URL)
+
+# Session factory, built once and shared by every request
+async_session_maker = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+# Channel announcing users whose reads must stay on the primary for a while
+PRIMARY_PIN_CHANNEL = "db:primary-pin"
+
+class ReplicaRouter:
+    """
+    Routes read-only sessions to the read replicas.
+
+    Replicas are chosen round-robin or by the fewest checked out connections. Users who just wrote
+    are pinned to the primary for DATABASE_REPLICA_PIN_SECONDS so that they read their own writes;
+    pins are shared between workers over Redis pub/sub.
+    """
+
+    def __init__(self, urls: List[str], strategy: str, pin_seconds: float) -> None:
+        self.engines = [create_engine_from_url(url) for url in urls]
+        self.session_makers = [async_sessionmaker(bind=replica, expire_on_commit=False, class_=AsyncSession) for replica in self.engines]
+        self.strategy = strategy
+        self.pin_seconds = pin_seconds
+        self._pins: Dict[str, float] = {}  # user_uid -> timestamp until which reads use the primary.
+        self._next = itertools.count()
+
+    def choose(self) -> async_sessionmaker:
+        """ Pick the session factory of a replica. """
+        if self.strategy == "least_connections":
+            index = min(range(len(self.engines)), key=lambda i: getattr(self.engines[i].pool, "checkedout", lambda: 0)())
+        else:
+            index = next(self._next) % len(self.engines)
+        return self.session_makers[index]
+
+    def is_pinned(self, user_uid: Optional[str]) -> bool:
+        if user_uid is None:
+            return False
+        until = self._pins.get(user_uid)
+        if until is None:
+            return False
+        if until < time.time():
+            del self._pins[user_uid]
+            return False
+        return True
+
+    def pin(self, user_uid: str, until: float) -> None:
+        self._pins[user_uid] = max(until, self._pins.get(user_uid, 0.0))
+
+    async def on_pin_message(self, data: str) -> None:
+        message = json.loads(data)
+        self.pin(message["user_uid"], message["until"])
+
+replica_router = ReplicaRouter(
+    [url.strip() for url in Config.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+    Config.DATABASE_REPLICA_STRATEGY,
+    Config.DATABASE_REPLICA_PIN_SECONDS,
+)
+if replica_router.engines:
+    subscriber.subscribe(PRIMARY_PIN_CHANNEL, replica_router.on_pin_message)
+
+async def pin_to_primary(user_uid: str) -> None:
+    """
+    Keep the reads of a user on the primary for a while after they wrote (read-your-writes).
+    Does nothing when no replica is configured.
+    Args:
+        user_uid: UID of the user who just wrote.
+    """
+    if not replica_router.engines:
+        return
+    until = time.time() + replica_router.pin_seconds
+    replica_router.pin(user_uid, until)
+    try:
+        await get_redis().publish(PRIMARY_PIN_CHANNEL, json.dumps({"user_uid": user_uid, "until": until}))  # Pin the user on the other workers too.
+    except Exception as e:
+        logging.warning(f"Could not broadcast primary pin for user {user_uid}: {e}")
+
+# Relationships are not eagerly loaded by default: every service method picks its loader options
+# (e.g. selectinload()) for the data it returns. A lazy load that still happens is an N+1 query,
+# so it is logged, or rejected when DB_RAISE_ON_LAZY_LOAD is enabled (test mode).
+@event.listens_for(Session, "do_orm_execute")
+def detect_unplanned_lazy_load(orm_execute_state: ORMExecuteState) -> None:
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return  # Not a lazy load (plain query, DML statement or planned eager load).
+    message = f"Unplanned lazy load of {orm_execute_state.loader_strategy_path[-1]}"
+    if Config.DB_RAISE_ON_LAZY_LOAD:
+        raise UnplannedLazyLoad(message)
+    logging.warning(message)
 
 # This function initializes the database by creating all tables defined in the models
 async def init_db() -> None:
@@ -22,8 +194,19 @@ async def init_db() -> None:
 
 # This function provides an asynchronous database session for handling database operations
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async_session = async_sessionmaker(
-        bind=engine, expire_on_commit=False, class_=AsyncSession
-    )  # Create an asynchronous session maker
-    async with async_session() as session:  # Provide an asynchronous session
-        yield session  # Yield the session for use in database operations
\ No newline at end of file
+    async with async_session_maker() as session:  # Provide an asynchronous session
+        yield session  # Yield the session for use in database operations
+
+# This function provides an asynchronous database session for read-only handlers.
+# It uses a read replica when one is configured, unless the user of the request wrote recently.
+# The user is taken from the token verified by the auth dependencies, which run before it when
+# they are declared in the route's `dependencies` or before the session parameter.
+async def get_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    session_maker = async_session_maker
+    if replica_router.engines:
+        token_data = getattr(request.state, "token_data", None)
+        user_uid = token_data["user"].get("user_uid") if token_data else None
+        if not replica_router.is_pinned(user_uid):
+            session_maker = replica_router.choose()
+    async with session_maker() as session:  # Provide an asynchronous session
+        yield session  # Yield the session for use in database operations
@@ -9,6 +9,8 @@ from typing import List, Optional  # Import typing utilities for type annotation
 from datetime import datetime, date  # Import datetime and date for handling date and time.
 import sqlalchemy.dialects.postgresql as pg  # Import PostgreSQL dialects for SQLAlchemy.
 from sqlmodel import SQLModel, Field, Column, Relationship  # Import SQLModel, Field, Column, and Relationship from sqlmodel.
+from sqlalchemy import DDL, Index, event, func  # Import Index and func for the composite and expression indexes, DDL and event for the search column.
+from src.db.ids import uuid7  # Import the time-ordered UUID generator for the primary keys.
 
 # Create User
 class User(SQLModel, table=True):
@@ -19,7 +21,7 @@ class User(SQLModel, table=True):
             pg.UUID, 
             nullable=False, 
             primary_key=True, 
-            default=uuid.uuid4
+            default=uuid7
             )
         )  # User's unique identifier (UUID).
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))  # Timestamp of when the user was created.
@@ -31,13 +33,18 @@ class User(SQLModel, table=True):
     first_name: str  # First name of the user.
     last_name: str  # Last name of the user.
     is_verified: bool = Field(default=False)  # Whether the user's email is verified.
-    books: List["BookModel"] = Relationship(back_populates="user", sa_relationship_kwargs={"lazy": "selectin"})  # List of books associated with the user.
-    reviews: List["Review"] = Relationship(back_populates="user", sa_relationship_kwargs={"lazy": "selectin"})  # List of reviews associated with the user.
+    books: List["BookModel"] = Relationship(back_populates="user", sa_relationship_kwargs={"lazy": "select"})  # List of books associated with the user (loaded explicitly with selectinload() where needed).
+    reviews: List["Review"] = Relationship(back_populates="user", sa_relationship_kwargs={"lazy": "select"})  # List of reviews associated with the user (loaded explicitly with selectinload() where needed).
 
     """ String representation of the User object """
     def __repr__(self):
         return f"<User {self.username}>"
 
+# Email lookups (every authenticated request) are case-insensitive: see UserService.get_user_by_email.
+Index("ux_user_email_lower", func.lower(User.email), unique=True)
+# Keyset pagination of the users, newest first (GET /auths/users).
+Index("ix_user_created_at_uid", User.created_at.desc(), User.uid.desc())
+
 # Create Book
 class BookModel(SQLModel, table=True):
     __tablename__: str = "book"
@@ -47,12 +54,12 @@ class BookModel(SQLModel, table=True):
             pg.UUID, 
             nullable=False, 
             primary_key=True, 
-            default=uuid.uuid4
+            default=uuid7
             )
         )  # Book's unique identifier (UUID).
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))  # Timestamp of when the book was created.
-    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))  # Timestamp of when the book was last updated.
-    reviews: List["Review"] = Relationship(back_populates="book", sa_relationship_kwargs={"lazy": "selectin"})  # List of reviews associated with the book.
+    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now, index=True))  # Timestamp of when the book was last updated (drives GET /books/changes).
+    reviews: List["Review"] = Relationship(back_populates="book", sa_relationship_kwargs={"lazy": "select"})  # List of reviews associated with the book (loaded explicitly with selectinload() where needed).
     title: Optional[str] = None  # Title of the book.
     author: Optional[str] = None  # Author of the book.
     publisher: Optional[str] = None  # Publisher of the book.
@@ -61,10 +68,50 @@ class BookModel(SQLModel, table=True):
     published_date: Optional[date] = None  # Date when the book was published.
     user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="user.uid")  # UID of the user who created the book.
     user: Optional[User] = Relationship(back_populates="books")  # Relationship to the user who created the book.
+    # Rating aggregates, maintained by ReviewService in the same transaction as the review (see src/books/ratings.py).
+    rating_count: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))  # Number of reviews of the book.
+    rating_sum: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))  # Sum of the ratings of the book.
+    rating_hist_0: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))  # Number of reviews rated 0.
+    rating_hist_1: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))  # Number of reviews rated 1.
+    rating_hist_2: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))  # Number of reviews rated 2.
+    rating_hist_3: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))  # Number of reviews rated 3.
+    rating_hist_4: int = Field(default=0, sa_column=Column(pg.INTEGER, nullable=False, server_default="0"))  # Number of reviews rated 4.
+    # Ranking scores, recomputed periodically from the aggregates by the ranking job (see src/books/ranking.py); null until the book is reviewed.
+    rating_bayesian: Optional[float] = Field(default=None, sa_column=Column(pg.DOUBLE_PRECISION, nullable=True))  # Average rating pulled towards the mean of all books.
+    rating_wilson: Optional[float] = Field(default=None, sa_column=Column(pg.DOUBLE_PRECISION, nullable=True))  # Wilson lower bound of the share of positive reviews.
+
+    @property
+    def rating_average(self) -> Optional[float]:
+        """ Average rating of the book, None if it has no reviews. """
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @property
+    def rating_histogram(self) -> List[int]:
+        """ Number of reviews for every rating, index 0 being the number of reviews rated 0. """
+        return [self.rating_hist_0, self.rating_hist_1, self.rating_hist_2, self.rating_hist_3, self.rating_hist_4]
 
     def __repr__(self):
         return f"BookModel({self.title}, {self.author}, {self.publisher}, {self.page_count}, {self.language}, {self.published_date})"
 
+# Keyset pagination of the books, newest first (see src/db/pagination.py): all the books, and the books of a user.
+Index("ix_book_created_at_uid", BookModel.created_at.desc(), BookModel.uid.desc())
+Index("ix_book_user_uid_created_at", BookModel.user_uid, BookModel.created_at.desc(), BookModel.uid.desc())
+# Full-text search (src/books/search.py): generated tsvector column and its GIN index, on Postgres only, so they are
+# not mapped. Created here for the databases built by init_db; same definition as the "add book search vector" migration.
+BOOK_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(publisher, '')), 'C')"
+)
+event.listen(BookModel.__table__, "after_create", DDL(
+    f"ALTER TABLE book ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({BOOK_SEARCH_VECTOR}) STORED"
+).execute_if(dialect="postgresql"))
+event.listen(BookModel.__table__, "after_create", DDL(
+    "CREATE INDEX ix_book_search_vector ON book USING gin (search_vector)"
+).execute_if(dialect="postgresql"))
+
 # Create Review
 class Review(SQLModel, table=True):
     __tablename__: str = "reviews"
@@ -74,18 +121,39 @@ class Review(SQLModel, table=True):
             pg.UUID, 
             nullable=False, 
             primary_key=True, 
-            default=uuid.uuid4
+            default=uuid7
             )
         )  # Review's unique identifier (UUID).
-    rating: int = Field(lt=5)  # Rating of the book (less than 5).
+    rating: int = Field(ge=0, lt=5)  # Rating of the book (from 0 to 4).
     review_text: str  # Text of the review.
     created_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))  # Timestamp of when the review was created.
-    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now))  # Timestamp of when the review was last updated.
-    user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="user.uid")  # UID of the user who created the review.
-    book_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="book.uid")  # UID of the book being reviewed.
+    updated_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, default=datetime.now, onupdate=datetime.now, index=True))  # Timestamp of when the review was last updated (drives GET /books/changes).
+    submitted_at: Optional[datetime] = Field(default=None, sa_column=Column(pg.TIMESTAMP, default=datetime.now, nullable=True))  # Timestamp of when the latest version was received (the most recent one wins, see src/reviews/ingest.py).
+    user_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="user.uid")  # UID of the user who created the review (indexed below, with the book).
+    book_uid: Optional[uuid.UUID] = Field(default=None, foreign_key="book.uid")  # UID of the book being reviewed (indexed below, with the sort keys of its reviews).
     user: Optional[User] = Relationship(back_populates="reviews")  # Relationship to the user who created the review.
     book: Optional[BookModel] = Relationship(back_populates="reviews")  # Relationship to the book being reviewed.
 
     """ String representation of the Review object """
     def __repr__(self):
-        return f"<Review for book {self.book_uid} by user {self.user_uid}>"
\ No newline at end of file
+        return f"<Review for book {self.book_uid} by user {self.user_uid}>"
+
+# Keyset pagination of the reviews of a book, newest first and highest rated first (GET /reviews/book/{book_uid}).
+# They also serve the lookups by book_uid alone (detached on book deletion, selectinload(BookModel.reviews)).
+Index("ix_reviews_book_uid_created_at", Review.book_uid, Review.created_at.desc(), Review.uid.desc())
+Index("ix_reviews_book_uid_rating", Review.book_uid, Review.rating.desc(), Review.created_at.desc(), Review.uid.desc())
+# One review per user and book: a second submission edits the first (ON CONFLICT (user_uid, book_uid) DO UPDATE).
+# It also serves the lookups by user_uid alone (selectinload(User.reviews)).
+Index("ux_reviews_user_uid_book_uid", Review.user_uid, Review.book_uid, unique=True)
+
+# Create Book tombstone
+class BookTombstone(SQLModel, table=True):
+    """ Record of a deleted book, so that clients syncing with GET /books/changes learn about the deletion. """
+    __tablename__: str = "book_tombstones"
+
+    uid: uuid.UUID = Field(sa_column=Column(pg.UUID, nullable=False, primary_key=True))  # UID of the deleted book.
+    user_uid: Optional[uuid.UUID] = Field(default=None, sa_column=Column(pg.UUID, nullable=True))  # UID of the user who created the book.
+    deleted_at: datetime = Field(sa_column=Column(pg.TIMESTAMP, nullable=False, default=datetime.now, index=True))  # Timestamp of when the book was deleted.
+
+    def __repr__(self):
+        return f"<BookTombstone {self.uid}>"
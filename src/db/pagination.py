@@ -0,0 +1,127 @@
+"""
+This file defines the helpers used for keyset (cursor) pagination.
+Instead of OFFSET, every page remembers the sort key of its last row in an opaque cursor,
+and the next page only selects rows that sort after that key. This keeps deep pages as fast
+as the first one, as long as an index exists on the sort columns.
+"""
+
+import json  # Import json for serializing the cursor values.
+import uuid  # Import the uuid module for handling UUIDs.
+import base64  # Import base64 for making the cursor opaque and URL safe.
+from datetime import datetime  # Import datetime for handling date and time.
+from typing import Any, Callable, Optional, Sequence  # Import typing utilities for type annotations.
+from fastapi import HTTPException, status  # Import HTTPException and status codes for invalid cursors.
+from sqlalchemy import tuple_  # Import tuple_ for comparing several columns at once.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    """
+    Apply the server-side bounds to the page size requested by the client.
+    Args:
+        limit: The requested page size (optional).
+    Returns:
+        The page size that will actually be used.
+    """
+    if limit is None:
+        return Config.PAGE_SIZE_DEFAULT
+    return max(1, min(limit, Config.PAGE_SIZE_MAX))
+
+
+def _encode_value(value: Any) -> Any:
+    """ Convert a sort key value into something JSON can store. """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+    Args:
+        values: The sort key values, in the same order as the sort columns.
+    Returns:
+        The URL safe cursor string.
+    """
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> list:
+    """
+    Decode a cursor produced by `encode_cursor`.
+    Args:
+        cursor: The cursor string sent by the client.
+        types: The expected type of every value (datetime, uuid.UUID, float, ...).
+    Returns:
+        The list of decoded sort key values.
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("unexpected cursor length")
+        decoded = []
+        for value, value_type in zip(values, types):
+            if value is None:
+                decoded.append(None)
+            elif value_type is datetime:
+                decoded.append(datetime.fromisoformat(value))
+            else:
+                decoded.append(value_type(value))
+        return decoded
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid cursor: {e}")
+
+
+def keyset_filter(columns: Sequence[Any], values: Sequence[Any], descending: bool = True):
+    """
+    Build the WHERE clause that selects the rows after the cursor.
+    Args:
+        columns: The sort columns, e.g. (BookModel.created_at, BookModel.uid).
+        values: The decoded cursor values.
+        descending: Whether the columns are sorted in descending order (default is True).
+    Returns:
+        A SQL expression usable in `.where()`.
+    """
+    if descending:
+        return tuple_(*columns) < tuple_(*values)
+    return tuple_(*columns) > tuple_(*values)
+
+
+async def fetch_keyset_page(session, statement, columns: Sequence[Any], cursor: Optional[str], limit: Optional[int],
+                            types: Sequence[type] = (datetime, uuid.UUID),
+                            cursor_values: Optional[Callable[[Any], Sequence[Any]]] = None) -> dict:
+    """
+    Run `statement` for a single page, sorted by `columns` in descending order.
+    Args:
+        session: Database session.
+        statement: A select() statement without ORDER BY or LIMIT.
+        columns: The sort columns, unique together (usually created_at + uid).
+        cursor: The cursor returned with the previous page (optional).
+        limit: The requested page size (optional, clamped to PAGE_SIZE_MAX).
+        types: The type of every sort column, used to decode the cursor.
+        cursor_values: Function returning the sort key of a row (optional, defaults to the attributes named after `columns`).
+    Returns:
+        A dictionary with the `items` of the page and the `next_cursor` (None on the last page).
+    """
+    page_size = clamp_page_size(limit)
+    if cursor:
+        statement = statement.where(keyset_filter(columns, decode_cursor(cursor, types)))
+    statement = statement.order_by(*[column.desc() for column in columns]).limit(page_size + 1)  # One extra row tells us if there is a next page.
+
+    result = await session.exec(statement)
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        values = cursor_values(last) if cursor_values is not None else [getattr(last, column.key) for column in columns]
+        next_cursor = encode_cursor(*values)
+
+    return {"items": rows, "next_cursor": next_cursor}
@@ -3,18 +3,289 @@ This file handles Redis client setup and operations for managing token blocklist
 """
 
 # Import aioredis for asynchronous Redis operations
+import json  # Import json for encoding pub/sub messages.
+import time  # Import time for the expiry of revoked JTIs.
+import asyncio  # Import asyncio for batching concurrent blocklist checks.
+import logging  # Import logging module for logging errors and information.
+from typing import Awaitable, Callable, Dict, List, Optional  # Import typing utilities for type annotations.
 from redis import asyncio as aioredis
 from src.config import Config  # Import the configuration settings
 
 # Token expiry time in seconds for the blocklist (1 hour)
 JTI_EXPIRY_SECONDS = 3600
 
-# Initialize a Redis client for the token blocklist
-redis_token_blocklist = aioredis.StrictRedis(
-    host=Config.REDIS_HOST,  # Redis server host (from config)
-    port=Config.REDIS_PORT,  # Redis server port (from config)
-    db=0  # Use database 0
-)
+# Sorted set indexing every revoked JTI by its expiry time, and the channel announcing new revocations
+BLOCKLIST_INDEX_KEY = "blocklist:jtis"
+REVOCATION_CHANNEL = "blocklist:revoked"
+
+# Shared, connection-pooled Redis client (created in the application lifespan)
+redis_client: Optional[aioredis.Redis] = None
+
+def get_redis() -> aioredis.Redis:
+    """
+    Return the shared Redis client, creating its connection pool on first use.
+
+    Returns:
+        aioredis.Redis: The client bound to the per-worker connection pool.
+    """
+    global redis_client
+    if redis_client is None:
+        pool = aioredis.ConnectionPool(
+            host=Config.REDIS_HOST,  # Redis server host (from config)
+            port=Config.REDIS_PORT,  # Redis server port (from config)
+            db=0,  # Use database 0
+            max_connections=Config.REDIS_MAX_CONNECTIONS,
+            socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+        )
+        redis_client = aioredis.Redis(connection_pool=pool)
+    return redis_client
+
+async def init_redis() -> None:
+    """ Create the shared Redis client and start the pub/sub listener when the application starts. """
+    get_redis()
+    subscriber.start()
+
+async def close_redis() -> None:
+    """ Stop the pub/sub listener, then close the shared Redis client and its connection pool. """
+    global redis_client
+    await subscriber.stop()
+    if redis_client is not None:
+        await redis_client.aclose()
+        await redis_client.connection_pool.disconnect()
+        redis_client = None
+
+class BlocklistBatcher:
+    """
+    Coalesces concurrent blocklist lookups into a single pipelined round-trip.
+
+    Every lookup waits at most `window_ms` for other lookups to join its batch; the batch is
+    then sent as one pipeline of EXISTS commands and every waiter receives its own answer.
+    """
+
+    def __init__(self, window_ms: float, max_batch: int) -> None:
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def exists(self, jti: str) -> bool:
+        """
+        Check whether a JTI is in the blocklist, sharing the round-trip with concurrent callers.
+
+        Args:
+            jti (str): The unique identifier of the JWT token to check.
+
+        Returns:
+            bool: True if the JTI is in the blocklist, False otherwise.
+        """
+        if self.window <= 0:
+            return await get_redis().exists(jti) > 0
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(jti, []).append(future)
+
+        if len(self._pending) >= self.max_batch:
+            loop.create_task(self._execute(self._take()))  # The batch is full, send it right away.
+        elif self._flush_task is None:
+            self._flush_task = loop.create_task(self._flush_later())
+
+        return await future
+
+    def _take(self) -> Dict[str, List[asyncio.Future]]:
+        batch, self._pending = self._pending, {}
+        return batch
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.window)
+        self._flush_task = None
+        batch = self._take()
+        if batch:
+            await self._execute(batch)
+
+    async def _execute(self, batch: Dict[str, List[asyncio.Future]]) -> None:
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for jti in batch:
+                    pipe.exists(jti)
+                results = await pipe.execute()
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for futures, count in zip(batch.values(), results):
+            for future in futures:
+                if not future.done():  # The waiting request may have been cancelled.
+                    future.set_result(count > 0)
+
+blocklist_batcher = BlocklistBatcher(Config.REDIS_BLOCKLIST_BATCH_WINDOW_MS, Config.REDIS_BLOCKLIST_MAX_BATCH)
+
+class RedisSubscriber:
+    """
+    Background listener dispatching Redis pub/sub messages to in-process handlers.
+
+    Handlers are registered per channel before the application starts. `on_connect` callbacks run
+    every time the subscription is (re-)established, `on_disconnect` callbacks when it is lost, and
+    `on_tick` callbacks roughly once per second while connected.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, Callable[[str], Awaitable[None]]] = {}
+        self._on_connect: List[Callable[[], Awaitable[None]]] = []
+        self._on_disconnect: List[Callable[[], None]] = []
+        self._on_tick: List[Callable[[], Awaitable[None]]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+
+    def subscribe(self, channel: str, handler: Callable[[str], Awaitable[None]]) -> None:
+        self._handlers[channel] = handler
+
+    def on_connect(self, callback: Callable[[], Awaitable[None]]) -> None:
+        self._on_connect.append(callback)
+
+    def on_disconnect(self, callback: Callable[[], None]) -> None:
+        self._on_disconnect.append(callback)
+
+    def on_tick(self, callback: Callable[[], Awaitable[None]]) -> None:
+        self._on_tick.append(callback)
+
+    def start(self) -> None:
+        if self._handlers and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        backoff = 0.5
+        while True:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(*self._handlers)
+                self.connected = True
+                for callback in self._on_connect:
+                    await callback()
+                backoff = 0.5
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        channel = message["channel"].decode() if isinstance(message["channel"], bytes) else message["channel"]
+                        data = message["data"].decode() if isinstance(message["data"], bytes) else message["data"]
+                        await self._handlers[channel](data)
+                    for callback in self._on_tick:
+                        await callback()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"Redis pub/sub listener disconnected: {e}")
+            finally:
+                self.connected = False
+                for callback in self._on_disconnect:
+                    callback()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(backoff)  # Wait before reconnecting, backing off up to 30 seconds.
+            backoff = min(backoff * 2, 30)
+
+subscriber = RedisSubscriber()
+
+class RevocationCache:
+    """
+    In-process copy of the revoked JTIs, so that checking a valid token needs no network hop.
+
+    The copy is only trusted ("synced") while the pub/sub subscription is up and after a full
+    resync from `BLOCKLIST_INDEX_KEY`; otherwise lookups return None and the caller asks Redis.
+    Entries expire together with their Redis keys, and the copy gives up (falls back to Redis)
+    when more than `max_size` JTIs are revoked at the same time.
+    """
+
+    def __init__(self, max_size: int, resync_seconds: int) -> None:
+        self.max_size = max_size
+        self.resync_seconds = resync_seconds
+        self._revoked: Dict[str, float] = {}  # JTI -> expiry timestamp.
+        self._last_resync = 0.0
+        self.synced = False
+
+    def register(self, subscriber: RedisSubscriber) -> None:
+        subscriber.subscribe(REVOCATION_CHANNEL, self._on_message)
+        subscriber.on_connect(self.resync)
+        subscriber.on_disconnect(self._on_disconnect)
+        subscriber.on_tick(self._on_tick)
+
+    def lookup(self, jti: str) -> Optional[bool]:
+        """
+        Answer a blocklist check locally when possible.
+
+        Args:
+            jti (str): The unique identifier of the JWT token to check.
+
+        Returns:
+            Optional[bool]: True if revoked, False if not revoked, None if the local copy cannot tell.
+        """
+        expires_at = self._revoked.get(jti)
+        if expires_at is not None:
+            if expires_at > time.time():
+                return True
+            del self._revoked[jti]  # Expired in Redis too.
+        return False if self.synced else None
+
+    def add(self, jti: str, expires_at: float) -> None:
+        self._revoked[jti] = expires_at
+        if len(self._revoked) > self.max_size:
+            self._prune()
+            if len(self._revoked) > self.max_size:
+                self.synced = False  # Too large to be kept complete, let Redis answer.
+
+    def _prune(self) -> None:
+        now = time.time()
+        self._revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+
+    async def resync(self) -> None:
+        """ Reload the full set of revoked JTIs from Redis. """
+        redis = get_redis()
+        now = time.time()
+        if await redis.set(BLOCKLIST_INDEX_KEY + ":backfilled", "1", nx=True):
+            await self._backfill_index(redis)  # Only the first worker ever started does this.
+        await redis.zremrangebyscore(BLOCKLIST_INDEX_KEY, "-inf", now)
+        entries = await redis.zrangebyscore(BLOCKLIST_INDEX_KEY, now, "+inf", withscores=True, start=0, num=self.max_size + 1)
+        self._revoked = {(jti.decode() if isinstance(jti, bytes) else jti): score for jti, score in entries}
+        self._last_resync = now
+        self.synced = len(self._revoked) <= self.max_size
+
+    async def _backfill_index(self, redis: aioredis.Redis) -> None:
+        """ Index JTIs revoked before the sorted set existed (plain keys named after the JTI). """
+        now = time.time()
+        async for key in redis.scan_iter(match="????????-????-????-????-????????????", count=1000):
+            ttl = await redis.ttl(key)
+            if ttl > 0:
+                await redis.zadd(BLOCKLIST_INDEX_KEY, {key: now + ttl})
+
+    async def _on_message(self, data: str) -> None:
+        message = json.loads(data)
+        self.add(message["jti"], message["expires_at"])
+
+    def _on_disconnect(self) -> None:
+        self.synced = False  # Revocations published while disconnected would be missed.
+
+    async def _on_tick(self) -> None:
+        if time.time() - self._last_resync >= self.resync_seconds:
+            await self.resync()
+
+revocation_cache = RevocationCache(Config.REVOCATION_CACHE_MAX_SIZE, Config.REVOCATION_CACHE_RESYNC_SECONDS)
+if Config.REVOCATION_CACHE_ENABLED:
+    revocation_cache.register(subscriber)
 
 async def add_jti_to_blocklist(jti: str) -> None:
     """
@@ -24,10 +295,16 @@ async def add_jti_to_blocklist(jti: str) -> None:
         jti (str): The unique identifier of the JWT token to block.
 
     This function sets the JTI as a key in Redis with a blank value and 
-    an expiration time defined by `JTI_EXPIRY_SECONDS`.
+    an expiration time defined by `JTI_EXPIRY_SECONDS`, indexes it for the
+    revocation caches of the workers and announces it on `REVOCATION_CHANNEL`.
     """
-    async with aioredis.from_url(f"redis://{Config.REDIS_HOST}:{Config.REDIS_PORT}") as redis:
-        await redis.set(name=jti, value="", ex=JTI_EXPIRY_SECONDS)  # Set the JTI in Redis with an expiration time.
+    expires_at = time.time() + JTI_EXPIRY_SECONDS
+    async with get_redis().pipeline(transaction=True) as pipe:
+        pipe.set(name=jti, value="", ex=JTI_EXPIRY_SECONDS)  # Set the JTI in Redis with an expiration time.
+        pipe.zadd(BLOCKLIST_INDEX_KEY, {jti: expires_at})  # Index it so that workers can resync the full set.
+        pipe.publish(REVOCATION_CHANNEL, json.dumps({"jti": jti, "expires_at": expires_at}))  # Notify the other workers.
+        await pipe.execute()
+    revocation_cache.add(jti, expires_at)
 
 async def token_in_blocklist(jti: str) -> bool:
     """
@@ -39,8 +316,10 @@ async def token_in_blocklist(jti: str) -> bool:
     Returns:
         bool: True if the JTI is in the blocklist, False otherwise.
     """
-    async with aioredis.from_url(f"redis://{Config.REDIS_HOST}:{Config.REDIS_PORT}") as redis:
-        return await redis.exists(jti) > 0  # Check if the JTI exists in Redis.
+    revoked = revocation_cache.lookup(jti)  # Answer locally when the revocation cache is in sync.
+    if revoked is not None:
+        return revoked
+    return await blocklist_batcher.exists(jti)  # Check if the JTI exists in Redis (batched with concurrent checks).
 
 # Role-Based Access Definitions
 
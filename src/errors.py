@@ -58,4 +58,16 @@ class UserNotFound(BookieException):
     """
         Tag Not found
     """
-    pass    
+    pass
+
+class PasswordHashingBusy(BookieException):
+    """
+        All password hashing threads are busy and the waiting queue is full
+    """
+    pass
+
+class UnplannedLazyLoad(BookieException):
+    """
+        A relationship was lazy loaded without an explicit loader option (N+1 query)
+    """
+    pass
@@ -0,0 +1,330 @@
+"""
+This file defines the write-behind ingestion of reviews, an optional mode (REVIEW_INGEST_ENABLED) for traffic spikes.
+
+Instead of writing every review in its own transaction while the client waits, POST /reviews/book/{book_uid}
+validates the review, gives it its UID and appends it to a Redis stream shared by all the workers, then
+answers 202 with the UID. The stream is the outbox: entries stay in it until they are written, so queued
+reviews survive the crash of a worker (and of Redis itself, with AOF persistence enabled).
+
+Every worker runs a flusher, one consumer of the stream's consumer group. It gathers up to
+REVIEW_INGEST_BATCH_SIZE reviews for at most REVIEW_INGEST_FLUSH_MS, writes them in one transaction
+(one multi-row upsert, and one executemany for the rating aggregates of their books), then acknowledges and
+deletes them from the stream. Entries left unacknowledged by a crashed worker are claimed by another one after
+REVIEW_INGEST_CLAIM_IDLE_MS.
+
+As with the synchronous path, a user has one review per book: a queued review of a book the user already
+reviewed edits that review (which keeps its UID). The most recent review wins, whatever the order in which the
+entries are flushed: an entry already written, or older than the stored review, is skipped as a duplicate,
+so writing an entry twice is harmless. The order is the time the reviews were queued, kept in `submitted_at`;
+`updated_at` is set when a review is written, so that GET /books/changes lists the reviews flushed late
+(after a backlog, or claimed from a crashed worker) instead of placing them behind positions already handed out.
+
+Backpressure: once REVIEW_INGEST_MAX_QUEUED reviews are waiting, new ones are refused with a 503.
+A review whose book (or user) no longer exists when it is flushed is dropped and counted in the statistics.
+"""
+
+import os  # Import os for naming the consumer after the process.
+import uuid  # Import the uuid module for validating the book UID.
+import json  # Import json for encoding the stream entries.
+import time  # Import time for measuring the flush latency.
+import socket  # Import socket for naming the consumer after the host.
+import asyncio  # Import asyncio for the background flusher.
+import logging  # Import logging module for logging errors and information.
+from datetime import datetime  # Import datetime for the timestamps of the reviews.
+from typing import List, Optional, Tuple  # Import typing utilities for type annotations.
+from fastapi import HTTPException, status  # Import HTTPException and status codes for the backpressure error.
+from sqlalchemy import tuple_  # Import tuple_ for looking up the current reviews by user and book.
+from sqlalchemy.exc import IntegrityError, DataError  # Import the errors of the rows the database will never accept.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.db.ids import uuid7  # Import the time-ordered UUID generator for the review UIDs.
+from sqlmodel import select  # Import select for checking that the books still exist.
+from src.db.models import Review, BookModel  # Import the Review and Book models from the database models.
+from src.db.redis import get_redis  # Import get_redis for the shared Redis client.
+from src.books.ratings import add_ratings  # Import the batched update of the rating aggregates.
+from src.books.cache import book_detail_cache  # Import the book detail cache, which embeds the reviews.
+from src.reviews.schemas import ReviewCreateModel  # Import the ReviewCreateModel schema for review creation data.
+from src.reviews.service import upsert_reviews  # Import the upsert keeping one review per user and book.
+
+# Consumer group shared by the flushers of all the workers
+REVIEW_INGEST_GROUP = "review-writers"
+
+
+class ReviewIngestor:
+    """
+    Queue of reviews waiting to be written (a Redis stream) and the flusher of this worker.
+    """
+
+    def __init__(self, stream: str, batch_size: int, flush_ms: int, max_queued: int, claim_idle_ms: int, enabled: bool = False) -> None:
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.max_queued = max_queued
+        self.claim_idle_ms = claim_idle_ms
+        self.enabled = enabled
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._group_ready = False
+        # Counters of this worker
+        self.queued = 0
+        self.rejected = 0
+        self.written = 0
+        self.updated = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_flush_ms: Optional[float] = None
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # ---------------- Enqueuing ----------------
+    async def enqueue(self, user_uid: str, book_uid: str, review_data: ReviewCreateModel) -> dict:
+        """
+        Queue a validated review for writing.
+        Args:
+            user_uid: UID of the user adding the review, taken from the access token.
+            book_uid: Unique identifier of the book being reviewed.
+            review_data: The data for the new review.
+        Returns:
+            The UID of the review and its status ("queued").
+        Raises:
+            HTTPException: 404 if the book UID is malformed, 503 if too many reviews are waiting.
+        """
+        try:
+            book_uid = str(uuid.UUID(book_uid))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book Not Found!")
+        redis = get_redis()
+        if await redis.xlen(self.stream) >= self.max_queued:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many reviews waiting, please retry", headers={"Retry-After": "1"})
+
+        review = {
+            **review_data.model_dump(),
+            "uid": str(uuid7()),
+            "user_uid": str(user_uid),
+            "book_uid": book_uid,
+            "created_at": datetime.now().isoformat(),
+        }
+        await redis.xadd(self.stream, {"review": json.dumps(review)})
+        self.queued += 1
+        return {"uid": review["uid"], "status": "queued"}
+
+    # ---------------- Flushing ----------------
+    def start(self, session_maker) -> None:
+        """ Start the flusher of this worker. """
+        if self.enabled and self._task is None:
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run(session_maker))
+
+    async def stop(self) -> None:
+        """ Let the flusher finish its current batch, then stop it. Unwritten reviews stay in the stream. """
+        if self._task is None:
+            return
+        self._stopping = True
+        try:
+            await asyncio.wait_for(self._task, timeout=10)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        self._task = None
+
+    async def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            await get_redis().xgroup_create(self.stream, REVIEW_INGEST_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):  # BUSYGROUP: another worker already created the group.
+                raise
+        self._group_ready = True
+
+    async def _read(self, stream_id: str, count: int, block: Optional[int]) -> List[Tuple[str, dict]]:
+        response = await get_redis().xreadgroup(REVIEW_INGEST_GROUP, self.consumer, {self.stream: stream_id}, count=count, block=block)
+        return [entry for _, entries in response or [] for entry in entries]
+
+    async def _collect(self) -> List[Tuple[str, dict]]:
+        """ Gather up to batch_size new entries, waiting at most flush_ms after the first one. """
+        entries = await self._read(">", self.batch_size, self.flush_ms)
+        if not entries:
+            return entries
+        deadline = time.monotonic() + self.flush_ms / 1000
+        while len(entries) < self.batch_size:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            if remaining_ms <= 0:
+                break
+            more = await self._read(">", self.batch_size - len(entries), remaining_ms)
+            if not more:
+                break
+            entries.extend(more)
+        return entries
+
+    async def _run(self, session_maker) -> None:
+        retry_pending = True  # First write what this consumer left unacknowledged.
+        next_claim = 0.0
+        while not self._stopping:
+            try:
+                await self._ensure_group()
+                if time.monotonic() >= next_claim:
+                    # Take over the entries of consumers that stopped acknowledging (crashed workers).
+                    _, claimed, *_ = await get_redis().xautoclaim(self.stream, REVIEW_INGEST_GROUP, self.consumer, self.claim_idle_ms, start_id="0-0", count=self.batch_size)
+                    retry_pending = retry_pending or bool(claimed)
+                    next_claim = time.monotonic() + self.claim_idle_ms / 1000
+                if retry_pending:
+                    entries = await self._read("0", self.batch_size, None)
+                    retry_pending = bool(entries)
+                else:
+                    entries = await self._collect()
+                if entries:
+                    await self._flush(session_maker, entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed_batches += 1
+                retry_pending = True  # The entries stay pending and are read again.
+                logging.warning(f"Review ingestion: flush failed, retrying: {e}")
+                await asyncio.sleep(1)
+
+    async def _flush(self, session_maker, entries: List[Tuple[str, dict]]) -> None:
+        """ Write a batch of entries, then acknowledge and delete them from the stream. """
+        started = time.perf_counter()
+        rows, done = [], []
+        for entry_id, fields in entries:
+            try:
+                review = json.loads(fields[b"review"])
+                ReviewCreateModel.model_validate(review)
+                review.pop("updated_at", None)  # Set when the review is written.
+                review["created_at"] = review["submitted_at"] = datetime.fromisoformat(review["created_at"])
+                rows.append(review)
+            except Exception as e:
+                self.dropped += 1
+                logging.error(f"Review ingestion: dropping malformed entry {entry_id}: {e}")
+            done.append(entry_id)
+
+        written = await self._write(session_maker, rows) if rows else []
+        for book_uid in {str(row["book_uid"]) for row in written}:
+            await book_detail_cache.invalidate(book_uid)  # The cached details of the book list its reviews.
+
+        redis = get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.xack(self.stream, REVIEW_INGEST_GROUP, *done)
+            pipe.xdel(self.stream, *done)
+            await pipe.execute()
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    async def _write(self, session_maker, rows: List[dict]) -> list:
+        """
+        Write a batch of reviews and update the aggregates of their books, in one transaction.
+        If the database rejects the batch (e.g. a user was deleted meanwhile), the rows are written one by one
+        and the rows rejected on their own are dropped.
+        Returns:
+            The rows written.
+        """
+        try:
+            return await self._write_rows(session_maker, rows)
+        except (IntegrityError, DataError) as e:
+            logging.warning(f"Review ingestion: batch of {len(rows)} reviews rejected ({e}), retrying one by one.")
+
+        written = []
+        for row in rows:
+            try:
+                written.extend(await self._write_rows(session_maker, [row]))
+            except (IntegrityError, DataError) as e:  # Any other error (e.g. the database is unreachable) fails the batch, which is retried.
+                self.dropped += 1
+                logging.error(f"Review ingestion: dropping review {row['uid']}: {e.orig}")
+        return written
+
+    async def _write_rows(self, session_maker, rows: List[dict]) -> list:
+        async with session_maker() as session:
+            connection = await session.connection()
+            # Lock the books in UID order, like the other writers of reviews, and leave out the reviews of
+            # books deleted since they were queued, which would make the whole upsert fail.
+            book_uids = {str(row["book_uid"]) for row in rows}
+            existing = {str(book_uid) for book_uid in (await connection.execute(
+                select(BookModel.uid).where(BookModel.uid.in_(book_uids)).order_by(BookModel.uid).with_for_update()
+            )).scalars()}
+            missing = [row for row in rows if str(row["book_uid"]) not in existing]
+            if missing:
+                self.dropped += len(missing)
+                logging.error(f"Review ingestion: dropping {len(missing)} review(s) of deleted books: {[row['uid'] for row in missing]}")
+                rows = [row for row in rows if str(row["book_uid"]) in existing]
+                if not rows:
+                    return []
+
+            # One review per user and book: the most recent one of the batch replaces the others.
+            latest = {}
+            for row in rows:
+                key = (str(row["user_uid"]), str(row["book_uid"]))
+                if key not in latest or row["submitted_at"] >= latest[key]["submitted_at"]:
+                    latest[key] = row
+            current = {
+                (str(user_uid), str(book_uid)): (str(uid), rating, submitted_at or updated_at)  # Reviews older than submitted_at have none.
+                for uid, user_uid, book_uid, rating, submitted_at, updated_at in (await connection.execute(
+                    select(Review.uid, Review.user_uid, Review.book_uid, Review.rating, Review.submitted_at, Review.updated_at)
+                    .where(tuple_(Review.user_uid, Review.book_uid).in_(list(latest)))
+                )).all()
+            }
+            writes, added, removed, edits = [], [], [], 0
+            for key, row in latest.items():
+                previous = current.get(key)
+                if previous is not None:
+                    previous_uid, previous_rating, previous_submitted_at = previous
+                    if previous_uid == str(row["uid"]) or (previous_submitted_at is not None and previous_submitted_at >= row["submitted_at"]):
+                        continue  # Already written (the entry is replayed), or older than the stored review.
+                    removed.append((row["book_uid"], previous_rating))
+                    edits += 1
+                added.append((row["book_uid"], row["rating"]))
+                writes.append(row)
+            written_at = datetime.now()
+            for row in writes:
+                row["updated_at"] = written_at
+            if writes:
+                await connection.execute(upsert_reviews(connection.dialect.name, writes))
+                await add_ratings(session, added, removed)
+            await session.commit()
+        self.written += len(writes) - edits
+        self.updated += edits
+        self.duplicates += len(rows) - len(writes)
+        return writes
+
+    # ---------------- Statistics ----------------
+    async def stats(self) -> dict:
+        """ Queue depth (shared by all workers) and the counters and flush latency of this worker. """
+        stats = {
+            "enabled": self.enabled,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "written": self.written,
+            "updated": self.updated,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": self._total_flush_ms / self.batches if self.batches else None,
+            "max_flush_ms": self.max_flush_ms,
+        }
+        if self.enabled:
+            try:
+                redis = get_redis()
+                stats["queue_depth"] = await redis.xlen(self.stream)
+                stats["pending"] = (await redis.xpending(self.stream, REVIEW_INGEST_GROUP))["pending"] if self._group_ready else 0
+            except Exception as e:
+                stats["queue_error"] = str(e)
+        return stats
+
+
+# Shared instance of this worker
+review_ingestor = ReviewIngestor(
+    stream=Config.REVIEW_INGEST_STREAM,
+    batch_size=Config.REVIEW_INGEST_BATCH_SIZE,
+    flush_ms=Config.REVIEW_INGEST_FLUSH_MS,
+    max_queued=Config.REVIEW_INGEST_MAX_QUEUED,
+    claim_idle_ms=Config.REVIEW_INGEST_CLAIM_IDLE_MS,
+    enabled=Config.REVIEW_INGEST_ENABLED,
+)
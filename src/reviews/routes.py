@@ -1,16 +1,21 @@
 """
 This file defines the review-related routes for the FastAPI application.
-It includes endpoints for adding reviews to books.
+It includes endpoints for adding reviews to books and for listing the reviews of a book.
 These routes use custom dependencies for token validation to ensure that only authorized users can access certain endpoints.
 """
 
-from src.db.models import User  # Import the User model from the database models.
-from src.db.main import get_session  # Import the get_session function for database session management.
-from fastapi import APIRouter, Depends  # Import FastAPI utilities for routing and dependencies.
-from src.reviews.schemas import ReviewCreateModel, ReviewModel  # Import Pydantic models for request and response validation.
+from typing import Literal, Optional  # Import typing utilities for type annotations.
+from src.db.main import get_session, get_read_session, pin_to_primary  # Import the session dependencies (primary and read replicas) and the read-your-writes pin.
+from fastapi import APIRouter, Depends, Header, Query, status  # Import FastAPI utilities for routing, dependencies, headers, query parameters and status codes.
+from fastapi.encoders import jsonable_encoder  # Import jsonable_encoder for storing the responses of idempotent requests.
+from fastapi.responses import JSONResponse  # Import JSONResponse for the 202 of queued reviews.
+from src.reviews.schemas import ReviewCreateModel, ReviewModel, ReviewPageModel  # Import Pydantic models for request and response validation.
 from sqlmodel.ext.asyncio.session import AsyncSession  # Import the AsyncSession class for asynchronous database sessions.
 from src.reviews.service import ReviewService  # Import the ReviewService class for review-related business logic.
-from src.auth.dependencies import get_current_user  # Import custom dependency for getting the current authenticated user.
+from src.reviews.ingest import review_ingestor  # Import the write-behind ingestion of reviews.
+from src.db.idempotency import idempotency_store, request_fingerprint  # Import the Idempotency-Key store.
+from src.auth.dependencies import get_auth_context, AuthContext, RoleChecker  # Import custom dependencies for getting the principal of the current request and role-based access control.
+from src.config import Config  # Import the Config class for accessing configuration settings.
 
 # Initialize FastAPI Router for reviews
 review_router = APIRouter()
@@ -18,28 +23,80 @@ review_router = APIRouter()
 # ReviewService instance for handling review-related operations
 review_service = ReviewService()
 
+# Dependency for role-based access control
+role_checker = Depends(RoleChecker(['admin', 'user']))
+
+@review_router.get("/book/{book_uid}", response_model=ReviewPageModel, dependencies=[role_checker])
+async def get_book_reviews(book_uid: str,
+                           cursor: Optional[str] = None,
+                           limit: int = Query(default=Config.PAGE_SIZE_DEFAULT, ge=1),
+                           sort: Literal["newest", "highest"] = "newest",
+                           min_rating: Optional[int] = Query(default=None, ge=0, lt=5),
+                           max_rating: Optional[int] = Query(default=None, ge=0, lt=5),
+                           session: AsyncSession = Depends(get_read_session)):
+    """
+    List the reviews of a book, one page at a time.
+
+    Args:
+        book_uid (str): Unique identifier of the book.
+        cursor (str): Cursor returned as `next_cursor` by the previous page, with the same sort (optional).
+        limit (int): Number of reviews per page (capped by PAGE_SIZE_MAX).
+        sort (str): "newest" first (default) or "highest" rated first.
+        min_rating (int): Lowest rating returned (optional).
+        max_rating (int): Highest rating returned (optional).
+        session (AsyncSession): Database session for querying (injected via dependency).
+
+    Returns:
+        ReviewPageModel: Reviews of the page and the cursor of the next page.
+    """
+    return await review_service.get_book_reviews(
+        book_uid, session, cursor=cursor, limit=limit, sort=sort, min_rating=min_rating, max_rating=max_rating
+    )
+
 @review_router.post("/book/{book_uid}")
 async def add_review_to_books(book_uid: str,
                               review_data: ReviewCreateModel, 
-                              current_user: User = Depends(get_current_user), 
+                              idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key", min_length=1, max_length=255),
+                              context: AuthContext = Depends(get_auth_context), 
                               session: AsyncSession = Depends(get_session)):
     """
-    Add a review to a book.
+    Add the review of the current user to a book, or edit it if the user already reviewed the book.
 
     Args:
         book_uid (str): Unique identifier of the book to add the review to.
         review_data (ReviewCreateModel): Data for creating the review.
-        current_user (User): The current authenticated user (injected via dependency).
+        idempotency_key (str): Value of the Idempotency-Key header (optional): retries with the same key get the response of the first request.
+        context (AuthContext): Principal of the current request (injected via dependency).
         session (AsyncSession): Database session for querying (injected via dependency).
 
     Returns:
-        The newly created review.
+        The new or edited review or, when the write-behind ingestion is enabled, a 202 with the UID of the queued review.
     """
-    new_review = await review_service.add_review_to_book(
-        user_email=current_user.email,
-        review_data=review_data,
-        book_uid=book_uid,
-        session=session
-    )
+    fingerprint = request_fingerprint(book_uid, review_data.model_dump())
+    if idempotency_key is not None:
+        stored = await idempotency_store.begin(context.user_uid, idempotency_key, fingerprint)
+        if stored is not None:
+            return JSONResponse(status_code=stored["status_code"], content=stored["body"], headers={"Idempotent-Replayed": "true"})
+
+    try:
+        if review_ingestor.enabled:
+            status_code = status.HTTP_202_ACCEPTED
+            body = await review_ingestor.enqueue(context.user_uid, book_uid, review_data)
+        else:
+            review = await review_service.add_review_to_book(
+                user_uid=context.user_uid,
+                review_data=review_data,
+                book_uid=book_uid,
+                session=session
+            )
+            await pin_to_primary(context.user_uid)  # The user's next reads must see the new review.
+            status_code = status.HTTP_200_OK
+            body = jsonable_encoder(ReviewModel.model_validate(review, from_attributes=True))
+    except Exception:
+        if idempotency_key is not None:
+            await idempotency_store.release(context.user_uid, idempotency_key)
+        raise
 
-    return new_review  # Return the newly created review.
\ No newline at end of file
+    if idempotency_key is not None:
+        await idempotency_store.complete(context.user_uid, idempotency_key, fingerprint, status_code, body)
+    return JSONResponse(status_code=status_code, content=body)
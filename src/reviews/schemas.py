@@ -5,7 +5,7 @@ They ensure that the data being sent and received adheres to the expected struct
 """
 
 import uuid  # Import the uuid module for handling UUIDs.
-from typing import Optional  # Import Optional for optional type annotations.
+from typing import List, Optional  # Import List and Optional for type annotations.
 from datetime import datetime  # Import datetime for handling date and time.
 from sqlmodel import Field  # Import Field from sqlmodel for defining model fields.
 from pydantic import BaseModel  # Import BaseModel from pydantic for creating Pydantic models.
@@ -18,7 +18,7 @@ class ReviewModel(BaseModel):
     review_text: str  # Text of the review.
     created_at: datetime  # Timestamp of when the review was created.
     updated_at: datetime  # Timestamp of when the review was last updated.
-    rating: int = Field(lt=5)  # Rating of the book (less than 5).
+    rating: int = Field(ge=0, lt=5)  # Rating of the book (from 0 to 4).
     user_uid: Optional[uuid.UUID]  # UID of the user who created the review.
     book_uid: Optional[uuid.UUID]  # UID of the book being reviewed.
 
@@ -26,5 +26,13 @@ class ReviewCreateModel(BaseModel):
     """
     Pydantic model for creating a new review.
     """
-    rating: int = Field(lt=5)  # Rating of the book (less than 5).
-    review_text: str  # Text of the review.
\ No newline at end of file
+    rating: int = Field(ge=0, lt=5)  # Rating of the book (from 0 to 4).
+    review_text: str  # Text of the review.
+
+class ReviewPageModel(BaseModel):
+    """
+    Pydantic model for representing one page of the reviews of a book.
+    `next_cursor` is passed back as `cursor` to fetch the following page; it is None on the last page.
+    """
+    items: List[ReviewModel]  # Reviews of the current page.
+    next_cursor: Optional[str] = None  # Opaque cursor pointing after the last review of the page.
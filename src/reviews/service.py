@@ -1,65 +1,187 @@
 """
 This file defines the business logic for review-related operations in the application.
-It includes functions for adding reviews to books.
+It includes functions for adding (or editing) the review of a user on a book and for listing the reviews of books, page by page.
 These functions interact with the database to perform the necessary operations.
 """
 
+import uuid  # Import the uuid module for the types of the cursor values.
 import logging  # Import logging module for logging errors and information.
+from datetime import datetime  # Import datetime for the types of the cursor values.
+from typing import Dict, List, Literal, Optional  # Import typing utilities for type annotations.
 from fastapi import status  # Import status codes from FastAPI for use in HTTP responses.
-from src.db.models import Review  # Import the Review model from the database models.
-from src.auth.service import UserService  # Import the UserService class from the authentication service.
-from src.books.service import BookService  # Import the BookService class from the book service.
+from sqlalchemy import and_, update, exists, func  # Import and_ for the join on the current review, update for the rating aggregates of the book, exists and func for the listings.
+from sqlalchemy.dialects import postgresql, sqlite  # Import the dialect inserts supporting ON CONFLICT DO UPDATE.
+from sqlalchemy.orm import aliased  # Import aliased for reading reviews from a ranked subquery.
+from sqlmodel import select  # Import select for the listings.
+from sqlalchemy.exc import IntegrityError  # Import IntegrityError for detecting a review by a user who no longer exists.
+from src.db.models import Review, BookModel  # Import the Review and Book models from the database models.
+from src.books.ratings import rating_change_values  # Import the helper updating the rating aggregates of a book.
+from src.books.cache import book_detail_cache  # Import the book detail cache, which embeds the reviews.
 from fastapi.exceptions import HTTPException  # Import HTTPException from FastAPI to handle exceptions.
-from src.reviews.schemas import ReviewCreateModel  # Import the ReviewCreateModel schema for review creation data.
+from src.reviews.schemas import ReviewCreateModel, ReviewModel  # Import the schemas for review creation data and reviews.
+from src.db.pagination import fetch_keyset_page, encode_cursor  # Import the keyset pagination helpers.
 from sqlmodel.ext.asyncio.session import AsyncSession  # Import AsyncSession for asynchronous database sessions.
 
-# Initialize services
-book_service = BookService()  # Create an instance of the BookService class to interact with book-related operations.
-user_service = UserService()  # Create an instance of the UserService class to interact with user-related operations.
+# Sort columns and cursor types of every order of GET /reviews/book/{book_uid}, each backed by an index on (book_uid, ...).
+REVIEW_SORTS = {
+    "newest": ((Review.created_at, Review.uid), (datetime, uuid.UUID)),
+    "highest": ((Review.rating, Review.created_at, Review.uid), (int, datetime, uuid.UUID)),
+}
+
+
+def upsert_reviews(dialect_name: str, rows: List[dict]):
+    """
+    Build the INSERT of reviews that edits the existing review instead when the user already reviewed the book
+    (one review per user and book, see the unique index on (user_uid, book_uid)). The edited review keeps its UID
+    and creation time. The rows must not contain the same user and book twice.
+    Args:
+        dialect_name: Name of the database dialect ("postgresql" or "sqlite").
+        rows: The reviews to write.
+    Returns:
+        The INSERT ... ON CONFLICT (user_uid, book_uid) DO UPDATE statement.
+    """
+    dialect = sqlite if dialect_name == "sqlite" else postgresql
+    statement = dialect.insert(Review).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=["user_uid", "book_uid"],
+        set_={
+            "rating": statement.excluded.rating,
+            "review_text": statement.excluded.review_text,
+            "updated_at": statement.excluded.updated_at,
+            "submitted_at": statement.excluded.submitted_at,
+        },
+    )
 
 # Service class for handling reviews
 class ReviewService:
     # Asynchronous method to add a review to a book
     async def add_review_to_book(self, 
-                                 user_email: str,  # The email of the user adding the review.
+                                 user_uid: str,  # The UID of the user adding the review, taken from the access token.
                                  book_uid: str,  # The unique identifier of the book being reviewed.
                                  review_data: ReviewCreateModel,  # The data for the new review, using the ReviewCreateModel schema.
                                  session: AsyncSession):  # The asynchronous database session for database operations.
+        """
+        Add the review of a user to a book or, if the user already reviewed the book, edit that review.
+        Three statements, whatever the number of existing reviews: a SELECT ... FOR UPDATE of the book, which tells
+        whether the book exists and the rating of the user's current review, and locks the book until the commit
+        (serializing the writes of its reviews); the INSERT ... ON CONFLICT (user_uid, book_uid) DO UPDATE ... RETURNING
+        of the review; and the UPDATE of the rating aggregates of the book, skipped when an edit keeps the rating.
+        Neither the book nor the user is loaded.
+        Raises:
+            HTTPException: 404 if the book or the user does not exist, 500 on any other error.
+        """
         try:
             logging.info("#### Starting transaction... ####")
-            logging.info("Transaction started.")
-            book = await book_service.get_book(book_uid, session)  # Fetch the book using the book UID and database session.
-            user = await user_service.get_user_by_email(user_email, session)  # Fetch the user using the email and database session.
-
-            # Check if book exists
-            if not book:
+            result = await session.exec(
+                select(BookModel.uid, Review.rating)
+                .outerjoin(Review, and_(Review.book_uid == BookModel.uid, Review.user_uid == user_uid))
+                .where(BookModel.uid == book_uid)
+                .with_for_update(of=BookModel)
+            )
+            current = result.first()
+            if current is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Book Not Found!"  # Corrected the detail message
+                    detail="Book Not Found!"
                 )
-            
-            # Check if user exists
-            if not user:
+            previous_rating = current[1]  # None if the user has not reviewed the book yet.
+
+            try:
+                connection = await session.connection()
+                result = await session.exec(
+                    upsert_reviews(connection.dialect.name, [{**review_data.model_dump(), "user_uid": user_uid, "book_uid": book_uid}])
+                    .returning(Review),
+                    execution_options={"populate_existing": True},
+                )
+                review = result.scalars().one()
+            except IntegrityError:  # The user of the token was deleted since the token was issued.
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
-                    detail="User Not Found!"  # Corrected the detail message
+                    detail="User Not Found!"
                 )
 
-            review_data_dict = review_data.model_dump()  # Convert the review data to a dictionary.
-            new_review = Review(**review_data_dict)  # Create a new Review object using the review data.
-
-            new_review.user = user  # Associate the user with the new review.
-            new_review.book = book  # Associate the book with the new review.
+            aggregate_values = rating_change_values(previous_rating, review_data.rating)
+            if aggregate_values:
+                await session.exec(
+                    update(BookModel)
+                    .where(BookModel.uid == book_uid)
+                    .values(aggregate_values)
+                    .execution_options(synchronize_session=False)
+                )
 
-            session.add(new_review)  # Add the new review to the database session.
             await session.commit()  # Commit the transaction.
-            await session.refresh(new_review)  # Refresh the new review instance.
-            logging.info("New review added to session.")
-
+            await book_detail_cache.invalidate(book_uid)  # The cached details of the book list its reviews.
             logging.info("#### Transaction committed. ####")
-            return new_review  # Return the newly created review.
+            return review  # Return the new or edited review.
+        except HTTPException:
+            await session.rollback()  # Release the lock on the book.
+            raise
         except Exception as e:  # Handle any exceptions that occur during the process.
             logging.error(f"#### Transaction failed: {e} ####")
             await session.rollback()  # Rollback the transaction in case of error.
             logging.exception(f"---------------- LOGGING ---------------- \n {e} \n ----------------")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Oops! Something went wrong...")  # Raise an HTTPException if an error occurs, with a 500 status code and error message.
\ No newline at end of file
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Oops! Something went wrong...")  # Raise an HTTPException if an error occurs, with a 500 status code and error message.
+
+    async def get_book_reviews(self, book_uid: str, session: AsyncSession, cursor: Optional[str] = None, limit: Optional[int] = None,
+                               sort: Literal["newest", "highest"] = "newest", min_rating: Optional[int] = None, max_rating: Optional[int] = None):
+        """
+        Retrieve one page of the reviews of a book.
+        Args:
+            book_uid: Unique identifier of the book.
+            session: Database session (injected via dependency).
+            cursor: Cursor returned with the previous page (optional, must come from the same sort).
+            limit: Number of reviews per page (optional, capped by PAGE_SIZE_MAX).
+            sort: "newest" (default) or "highest" rated first, newest first among equal ratings.
+            min_rating: Lowest rating returned (optional).
+            max_rating: Highest rating returned (optional).
+        Returns:
+            Dictionary with the reviews of the page and the cursor of the next page.
+        Raises:
+            HTTPException: 404 if the book does not exist.
+        """
+        statement = select(Review).where(Review.book_uid == book_uid)
+        if min_rating is not None:
+            statement = statement.where(Review.rating >= min_rating)
+        if max_rating is not None:
+            statement = statement.where(Review.rating <= max_rating)
+        columns, types = REVIEW_SORTS[sort]
+        page = await fetch_keyset_page(session, statement, columns, cursor, limit, types=types)
+
+        # An empty first page is either a book without (matching) reviews or an unknown book.
+        if not page["items"] and not cursor:
+            book_exists = (await session.exec(select(exists().where(BookModel.uid == book_uid)))).one()
+            if not book_exists:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book Not Found!")
+        return page
+
+    async def get_latest_reviews(self, book_uids: List[uuid.UUID], session: AsyncSession, per_book: int) -> Dict[uuid.UUID, dict]:
+        """
+        Retrieve the latest reviews of several books with a single query.
+        Args:
+            book_uids: Unique identifiers of the books.
+            session: Database session (injected via dependency).
+            per_book: Number of reviews returned for every book.
+        Returns:
+            Dictionary mapping the UID of every book with reviews to its serialized latest reviews (`items`) and
+            the cursor of the following ones for GET /reviews/book/{book_uid} (`next_cursor`, None if there are no more).
+        """
+        position = func.row_number().over(
+            partition_by=Review.book_uid, order_by=(Review.created_at.desc(), Review.uid.desc())
+        ).label("position")
+        ranked = select(Review, position).where(Review.book_uid.in_(book_uids)).subquery()
+        ranked_review = aliased(Review, ranked)
+        statement = (
+            select(ranked_review)
+            .where(ranked.c.position <= per_book + 1)  # One extra row per book tells if it has more reviews.
+            .order_by(ranked.c.book_uid, ranked.c.position)
+        )
+
+        latest: Dict[uuid.UUID, dict] = {}
+        for review in (await session.exec(statement)).all():
+            page = latest.setdefault(review.book_uid, {"items": [], "next_cursor": None})
+            if len(page["items"]) < per_book:
+                page["items"].append(ReviewModel.model_validate(review, from_attributes=True))
+            else:
+                last = page["items"][-1]
+                page["next_cursor"] = encode_cursor(last.created_at, last.uid)
+        return latest
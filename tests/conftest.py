@@ -0,0 +1,38 @@
+"""
+This file configures the test mode of the application and provides the shared fixtures.
+The settings are read when src is first imported, so the environment is set here, before any test module imports it:
+two local SQLite databases (the primary and a read replica) and DB_RAISE_ON_LAZY_LOAD.
+"""
+
+import os  # Import os for setting the test environment.
+import tempfile  # Import tempfile for the local database files.
+
+DATABASE_DIR = tempfile.mkdtemp(prefix="bookie-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{DATABASE_DIR}/primary.db"
+os.environ["DATABASE_REPLICA_URLS"] = f"sqlite+aiosqlite:///{DATABASE_DIR}/replica.db"
+os.environ["DB_RAISE_ON_LAZY_LOAD"] = "true"
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ["RANKING_ENABLED"] = "false"
+os.environ["SUGGEST_ENABLED"] = "false"
+
+import pytest  # Import pytest for the fixtures.
+from sqlmodel import SQLModel  # Import SQLModel for creating the tables.
+from src.db.main import engine, replica_router  # Import the primary engine and the replica engines.
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def databases():
+    """ Empty tables on the primary and on every replica. """
+    for database in [engine, *replica_router.engines]:
+        async with database.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.drop_all)
+            await connection.run_sync(SQLModel.metadata.create_all)
+    yield
+    for database in [engine, *replica_router.engines]:
+        await database.dispose()
@@ -0,0 +1,51 @@
+"""
+Tests of the change feed served by GET /books/changes.
+"""
+
+import uuid  # Import the uuid module for the user UIDs.
+import pytest  # Import pytest for the markers and assertions.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.db.main import async_session_maker  # Import the session factory of the primary.
+from src.books.changes import get_changes  # Import the change feed.
+from src.books.schemas import BookCreateModel, UpdateBookModel  # Import the book creation and update schemas.
+from src.books.service import BookService  # Import the BookService class for book-related business logic.
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def no_safety_lag(monkeypatch):
+    monkeypatch.setattr(Config, "CHANGES_SAFETY_LAG_SECONDS", 0)
+
+
+async def changes(since=None) -> dict:
+    async with async_session_maker() as session:
+        return await get_changes(session, since)
+
+
+async def test_update_right_after_a_read_is_in_the_next_page(databases, no_safety_lag):
+    async with async_session_maker() as session:
+        books = [await BookService().create_book(BookCreateModel(title=f"Book {i}"), str(uuid.uuid4()), session) for i in range(3)]
+    page = await changes()
+    assert [book.title for book in page["books"]] == ["Book 0", "Book 1", "Book 2"]
+
+    async with async_session_maker() as session:
+        await BookService().update_book(books[0].uid, UpdateBookModel(title="Changed"), session)
+    page = await changes(page["next_cursor"])
+    assert [book.title for book in page["books"]] == ["Changed"]
+
+    page = await changes(page["next_cursor"])
+    assert page["books"] == []
+
+
+async def test_bulk_update_and_deletion_are_in_the_next_page(databases, no_safety_lag):
+    async with async_session_maker() as session:
+        books = [await BookService().create_book(BookCreateModel(title=f"Book {i}"), str(uuid.uuid4()), session) for i in range(3)]
+    page = await changes()
+
+    async with async_session_maker() as session:
+        await BookService().update_books([books[0].uid, books[1].uid], UpdateBookModel(publisher="Bulk"), session)
+        await BookService().delete_book(books[2].uid, session)
+    page = await changes(page["next_cursor"])
+    assert sorted(book.title for book in page["books"]) == ["Book 0", "Book 1"]
+    assert [deleted.uid for deleted in page["deleted"]] == [books[2].uid]
@@ -0,0 +1,37 @@
+"""
+Tests of the maintenance commands (python -m src.cli).
+"""
+
+import os  # Import os for the environment of the command.
+import sys  # Import sys for running the command with the same interpreter.
+import json  # Import json for reading the NDJSON export.
+import uuid  # Import the uuid module for the user UIDs.
+import asyncio  # Import asyncio for running the command.
+import pytest  # Import pytest for the markers and assertions.
+from src.db.main import async_session_maker  # Import the session factory of the primary.
+from src.books.schemas import BookCreateModel  # Import the BookCreateModel schema for book creation data.
+from src.books.service import BookService  # Import the BookService class for book-related business logic.
+
+pytestmark = pytest.mark.anyio
+
+
+async def run_cli(*args: str) -> bytes:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "src.cli", *args,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, env={**os.environ, "DATABASE_REPLICA_URLS": ""},
+    )
+    stdout, stderr = await process.communicate()
+    assert process.returncode == 0, stderr.decode()
+    return stdout
+
+
+async def test_export_to_standard_output_only_writes_the_rows(databases):
+    async with async_session_maker() as session:
+        await BookService().create_book(BookCreateModel(title="Exported"), str(uuid.uuid4()), session)
+
+    lines = (await run_cli("export", "books", "--format", "ndjson")).decode().splitlines()
+    assert [json.loads(line)["title"] for line in lines] == ["Exported"]
+
+    lines = (await run_cli("export", "books", "--format", "csv")).decode().splitlines()
+    assert lines[0].startswith("uid,") and len(lines) == 2
+    assert os.environ["DATABASE_URL"] not in "\n".join(lines)
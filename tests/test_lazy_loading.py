@@ -0,0 +1,51 @@
+"""
+Tests of the detection of unplanned lazy loads (DB_RAISE_ON_LAZY_LOAD, enabled in test mode).
+"""
+
+import pytest  # Import pytest for the markers and assertions.
+from sqlalchemy.orm import selectinload  # Import selectinload for the planned loads.
+from sqlmodel import select  # Import select for building SQL queries.
+from src.config import Config  # Import the Config class for accessing configuration settings.
+from src.db.main import async_session_maker  # Import the session factory of the primary.
+from src.db.models import BookModel, Review  # Import the Book and Review models.
+from src.errors import UnplannedLazyLoad  # Import the error raised on unplanned lazy loads.
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_book_with_review() -> None:
+    async with async_session_maker() as session:
+        book = BookModel(title="The Hobbit", author="Tolkien")
+        session.add(book)
+        await session.flush()
+        session.add(Review(rating=4, review_text="Good", book_uid=book.uid))
+        await session.commit()
+
+
+async def test_test_mode_raises_on_lazy_load():
+    assert Config.DB_RAISE_ON_LAZY_LOAD
+
+
+async def test_lazy_relationship_access_raises(databases):
+    await add_book_with_review()
+    async with async_session_maker() as session:
+        book = (await session.exec(select(BookModel))).one()
+        with pytest.raises(UnplannedLazyLoad):
+            await session.run_sync(lambda _: book.reviews)
+
+
+async def test_planned_load_does_not_raise(databases):
+    await add_book_with_review()
+    async with async_session_maker() as session:
+        book = (await session.exec(select(BookModel).options(selectinload(BookModel.reviews)))).one()
+        assert [review.review_text for review in book.reviews] == ["Good"]
+
+
+async def test_lazy_load_is_only_logged_outside_test_mode(databases, monkeypatch, caplog):
+    monkeypatch.setattr(Config, "DB_RAISE_ON_LAZY_LOAD", False)
+    await add_book_with_review()
+    async with async_session_maker() as session:
+        book = (await session.exec(select(BookModel))).one()
+        reviews = await session.run_sync(lambda _: book.reviews)
+    assert len(reviews) == 1
+    assert "Unplanned lazy load of BookModel.reviews" in caplog.text
@@ -0,0 +1,116 @@
+"""
+Tests of the routing of the sessions between the primary and the read replica (two local databases in test mode).
+"""
+
+import time  # Import time for the pins.
+import uuid  # Import the uuid module for the user UIDs.
+import pytest  # Import pytest for the markers and assertions.
+from starlette.requests import Request  # Import Request for the requests handed to the session dependencies.
+from sqlmodel import select  # Import select for building SQL queries.
+from src.db.main import engine, async_session_maker, get_session, get_read_session, replica_router  # Import the engines, the session dependencies and the primary session factory.
+from src.db.models import BookModel  # Import the BookModel from the database models.
+from src.books.schemas import BookCreateModel  # Import the BookCreateModel schema for book creation data.
+from src.books.service import BookService  # Import the BookService class for book-related business logic.
+from src.books.cache import book_detail_cache  # Import the book detail cache.
+
+pytestmark = pytest.mark.anyio
+
+
+def make_request(user_uid=None) -> Request:
+    """ A request whose access token, if any, belongs to `user_uid`. """
+    request = Request({"type": "http", "headers": []})
+    if user_uid is not None:
+        request.state.token_data = {"user": {"user_uid": user_uid}}
+    return request
+
+
+async def titles(session) -> list:
+    return list((await session.exec(select(BookModel.title).order_by(BookModel.title))).all())
+
+
+async def test_test_mode_has_one_replica():
+    assert len(replica_router.engines) == 1
+    assert replica_router.engines[0].url != engine.url
+
+
+async def test_writes_go_to_the_primary(databases):
+    async for session in get_session():
+        assert session.bind is engine
+        await BookService().create_book(BookCreateModel(title="Written"), str(uuid.uuid4()), session)
+
+    async with engine.connect() as connection:
+        assert (await connection.exec_driver_sql("SELECT title FROM book")).scalars().all() == ["Written"]
+    async with replica_router.engines[0].connect() as connection:
+        assert (await connection.exec_driver_sql("SELECT title FROM book")).scalars().all() == []
+
+
+async def test_reads_go_to_the_replica(databases):
+    async with replica_router.session_makers[0]() as session:
+        session.add(BookModel(title="On the replica"))
+        await session.commit()
+
+    async for session in get_read_session(make_request(str(uuid.uuid4()))):
+        assert session.bind is replica_router.engines[0]
+        assert await titles(session) == ["On the replica"]
+    async for session in get_read_session(make_request()):  # Anonymous reads too.
+        assert session.bind is replica_router.engines[0]
+
+
+async def test_reads_of_a_pinned_user_go_to_the_primary(databases):
+    async for session in get_session():
+        await BookService().create_book(BookCreateModel(title="Just written"), str(uuid.uuid4()), session)
+    user_uid = str(uuid.uuid4())
+    replica_router.pin(user_uid, time.time() + 60)
+
+    async for session in get_read_session(make_request(user_uid)):
+        assert session.bind is engine
+        assert await titles(session) == ["Just written"]
+    async for session in get_read_session(make_request(str(uuid.uuid4()))):  # Other users still read the replica.
+        assert session.bind is replica_router.engines[0]
+        assert await titles(session) == []
+
+
+async def test_expired_pin_goes_back_to_the_replica(databases):
+    user_uid = str(uuid.uuid4())
+    replica_router.pin(user_uid, time.time() - 1)
+
+    async for session in get_read_session(make_request(user_uid)):
+        assert session.bind is replica_router.engines[0]
+    assert not replica_router.is_pinned(user_uid)
+
+
+@pytest.fixture
+def empty_book_cache():
+    book_detail_cache._entries.clear()
+    yield
+    book_detail_cache._entries.clear()
+
+
+async def add_book_on(session_maker, book_uid, title) -> None:
+    async with session_maker() as session:
+        session.add(BookModel(uid=book_uid, title=title))
+        await session.commit()
+
+
+async def test_book_detail_cache_is_not_filled_from_a_lagging_replica(databases, empty_book_cache):
+    book_uid = uuid.uuid4()
+    await add_book_on(async_session_maker, book_uid, "After the write")
+    await add_book_on(replica_router.session_makers[0], book_uid, "Before the write")  # The replica lags behind.
+
+    async for session in get_read_session(make_request(str(uuid.uuid4()))):
+        assert session.bind is replica_router.engines[0]
+        detail = await BookService().get_book_detail(book_uid, session)
+    assert detail["title"] == "After the write"
+    assert (await book_detail_cache.get(str(book_uid)))["title"] == "After the write"
+
+
+async def test_pinned_user_skips_the_book_detail_cache(databases, empty_book_cache):
+    book_uid = uuid.uuid4()
+    await add_book_on(async_session_maker, book_uid, "After the write")
+    await book_detail_cache.set(str(book_uid), {"title": "Before the write"}, book_detail_cache.generation(str(book_uid)))
+    user_uid = str(uuid.uuid4())
+    replica_router.pin(user_uid, time.time() + 60)
+
+    async for session in get_read_session(make_request(user_uid)):
+        detail = await BookService().get_book_detail(book_uid, session)
+    assert detail["title"] == "After the write"
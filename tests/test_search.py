@@ -0,0 +1,88 @@
+"""
+Tests of the full-text search of the books on SQLite, served by the in-process fallback index.
+"""
+
+import uuid  # Import the uuid module for the user UIDs.
+import pytest  # Import pytest for the markers and assertions.
+from fastapi import HTTPException  # Import HTTPException for the invalid queries.
+from src.db.main import async_session_maker  # Import the session factory of the primary.
+from src.books.schemas import BookCreateModel  # Import the BookCreateModel schema for book creation data.
+from src.books.service import BookService  # Import the BookService class for book-related business logic.
+from src.books.search import fallback_search_index, parse_search_query, search_books, to_tsquery_text  # Import the search.
+
+pytestmark = pytest.mark.anyio
+
+BOOKS = [
+    ("The Hobbit", "J.R.R. Tolkien", "Allen & Unwin"),
+    ("The Silmarillion", "Tolkien", "Allen & Unwin"),
+    ("Hobbit the", "Someone", "Allen & Unwin"),
+    ("Dune", "Frank Herbert", "Chilton"),
+]
+
+
+@pytest.fixture
+async def books(databases):
+    fallback_search_index.ready = False  # Rebuilt from the fresh tables by the first search.
+    async with async_session_maker() as session:
+        for title, author, publisher in BOOKS:
+            await BookService().create_book(BookCreateModel(title=title, author=author, publisher=publisher), str(uuid.uuid4()), session)
+    yield
+    fallback_search_index.ready = False
+
+
+async def search(query: str, **kwargs) -> dict:
+    async with async_session_maker() as session:
+        return await search_books(session, query, **kwargs)
+
+
+async def search_titles(query: str) -> list:
+    return [book.title for book in (await search(query))["items"]]
+
+
+async def test_words_must_all_match(books):
+    assert sorted(await search_titles("hobbit")) == ["Hobbit the", "The Hobbit"]
+    assert await search_titles("dune herbert") == ["Dune"]
+    assert await search_titles("dune tolkien") == []
+
+
+async def test_phrase_matches_consecutive_words_in_order(books):
+    assert await search_titles('"the hobbit"') == ["The Hobbit"]
+    assert await search_titles('"hobbit the"') == ["Hobbit the"]
+    assert await search_titles('"hobbit the" someone') == ["Hobbit the"]
+
+
+async def test_prefix_matches(books):
+    assert sorted(await search_titles("tolk*")) == ["The Hobbit", "The Silmarillion"]
+    assert await search_titles("dune herb*") == ["Dune"]
+    assert await search_titles("tolk") == []  # Without the star, only whole words match.
+
+
+async def test_title_matches_rank_above_author_and_publisher_matches(books):
+    async with async_session_maker() as session:
+        await BookService().create_book(BookCreateModel(title="Allen Ginsberg", author="Nobody", publisher="City Lights"), str(uuid.uuid4()), session)
+    assert (await search_titles("allen"))[0] == "Allen Ginsberg"
+
+
+async def test_pages_list_every_match_once(books):
+    first = await search("allen", limit=2)
+    second = await search("allen", limit=2, cursor=first["next_cursor"])
+    titles = [book.title for book in first["items"] + second["items"]]
+    assert sorted(titles) == ["Hobbit the", "The Hobbit", "The Silmarillion"]
+    assert second["next_cursor"] is None
+
+
+async def test_index_follows_updates(books):
+    await search_titles("dune")  # Builds the index.
+    async with async_session_maker() as session:
+        await BookService().create_book(BookCreateModel(title="Dune Messiah", author="Frank Herbert"), str(uuid.uuid4()), session)
+    assert sorted(await search_titles("dune")) == ["Dune", "Dune Messiah"]
+
+
+async def test_query_without_words_is_rejected(books):
+    with pytest.raises(HTTPException) as error:
+        await search("!! **")
+    assert error.value.status_code == 400
+
+
+def test_tsquery_text():
+    assert to_tsquery_text(parse_search_query('"The Hobbit" tolk*')) == "(the <-> hobbit) & (tolk:*)"
@@ -0,0 +1,34 @@
+"""
+Tests of the application startup (the lifespan of src/__init__.py).
+"""
+
+import pytest  # Import pytest for the markers and assertions.
+import src.db.main  # Import the database module, to watch its init_db function.
+from src import app, life_span  # Import the application and its lifespan.
+from src.config import Config  # Import the Config class for the startup settings.
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def init_db_calls(monkeypatch):
+    calls = []
+
+    async def init_db() -> None:
+        calls.append(True)
+
+    monkeypatch.setattr(src.db.main, "init_db", init_db)
+    return calls
+
+
+async def test_startup_leaves_the_schema_to_alembic(init_db_calls):
+    async with life_span(app):
+        pass
+    assert init_db_calls == []
+
+
+async def test_startup_creates_the_tables_when_asked(init_db_calls, monkeypatch):
+    monkeypatch.setattr(Config, "DB_CREATE_ALL", True)
+    async with life_span(app):
+        pass
+    assert init_db_calls == [True]